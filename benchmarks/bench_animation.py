@@ -0,0 +1,48 @@
+"""Frame export throughput of WorkoutAnimation.render against FuncAnimation.save.
+
+Run with ``python benchmarks/bench_animation.py [n_points]``.
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import matplotlib
+import pandas as pd
+from synthetic import random_walk
+from watchml.viz import WorkoutAnimation
+from watchml.viz import WorkoutAnimationConfig
+
+matplotlib.use("Agg")
+
+if __name__ == "__main__":
+    n_points = int(sys.argv[1]) if len(sys.argv) > 1 else 3_000
+    lons, lats, elevations = random_walk(n_points)
+    route_df = pd.DataFrame(
+        {
+            "lon": lons,
+            "lat": lats,
+            "elevation": elevations,
+            "time": pd.date_range("2023-01-02", periods=n_points, freq="s"),
+        }
+    )
+    config = WorkoutAnimationConfig(fig_size=(5, 5), resolution=0.08)
+    animation = WorkoutAnimation(route_df, config)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        ani = animation.animate()
+        ani.save(Path(tmp) / "baseline.gif", writer="pillow", dpi=60)
+        seconds = time.perf_counter() - start
+        n_frames = ani._save_count or len(list(ani.new_saved_frame_seq()))
+        print(
+            f"FuncAnimation.save: {n_frames} frames in {seconds:.1f}s "
+            f"({n_frames / seconds:.1f} frames/s)"
+        )
+
+        for workers in sorted({1, os.cpu_count() or 1}):
+            stats = animation.render(Path(tmp) / "render.gif", workers=workers, dpi=60)
+            print(f"render, {workers} workers: {stats.frames_per_second:.1f} frames/s")
+        stats = animation.render(Path(tmp) / "capped.gif", fps=20, duration=5, dpi=60)
+        print(f"render, capped to 5s at 20 fps: {stats.frames} frames")
@@ -0,0 +1,48 @@
+"""Neighbour quality and build time of AnnoyNN with shape embeddings against 2-D centroids.
+
+The routes are noisy recordings of a few templates, the precision@k is the share of
+neighbours that are recordings of the same template.
+Run with ``python benchmarks/bench_annoy_nn.py``.
+"""
+import time
+
+import numpy as np
+from annoy import AnnoyIndex
+from synthetic import route_variants
+from watchml.ml import AnnoyNN
+from watchml.ml import AnnoyNNIndex
+
+K = 10
+
+
+def build_centroid_index(tracks) -> AnnoyNNIndex:
+    """The index AnnoyNN built before route embeddings, kept as the baseline."""
+    index = AnnoyIndex(2, metric="euclidean")
+    for i, track in enumerate(tracks):
+        index.add_item(i, [track.lon.mean(), track.lat.mean()])
+    index.build(100)
+    return AnnoyNNIndex(index)
+
+
+def precision(index: AnnoyNNIndex, labels: np.ndarray) -> float:
+    same = [
+        (labels[index.nns(t, K + 1)[1:]] == labels[t]).mean()
+        for t in range(len(labels))
+    ]
+    return float(np.mean(same))
+
+
+if __name__ == "__main__":
+    tracks, labels = route_variants(n_templates=40, n_variants=25)
+
+    for name, build in [
+        ("centroids, 100 trees", lambda: build_centroid_index(tracks)),
+        ("embeddings, 10 trees", lambda: AnnoyNN(tracks).build_index()),
+    ]:
+        start = time.perf_counter()
+        index = build()
+        seconds = time.perf_counter() - start
+        print(
+            f"{name:>22}: build {seconds:.2f}s | "
+            f"precision@{K} {precision(index, labels):.2f} ({len(tracks)} routes)"
+        )
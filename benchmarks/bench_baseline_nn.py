@@ -0,0 +1,37 @@
+"""Build time of the BaselineNN distance matrix against the pair-by-pair loop.
+
+Run with ``python benchmarks/bench_baseline_nn.py``.
+"""
+import time
+
+import numpy as np
+from synthetic import routes
+from watchml.ml import BaselineNN
+from watchml.ml import Distances
+
+
+def build_index_loop(nn: BaselineNN, dist) -> np.ndarray:
+    """Pair-by-pair evaluation, as BaselineNN.build_index did before."""
+    return np.array(
+        [[nn.track_dist(t1, t2, dist) for t2 in nn.tracks] for t1 in nn.tracks]
+    )
+
+
+if __name__ == "__main__":
+    for n_routes in [100, 300, 1_000]:
+        nn = BaselineNN(routes(n_routes))
+        for dist in [Distances.euclidean_series, Distances.manhatten_series]:
+            start = time.perf_counter()
+            nn.build_index(dist)
+            matrix = time.perf_counter() - start
+
+            loop = "skipped"
+            if n_routes <= 300:
+                start = time.perf_counter()
+                build_index_loop(nn, dist)
+                seconds = time.perf_counter() - start
+                loop = f"{seconds:.2f}s ({seconds / matrix:.0f}x)"
+            print(
+                f"{n_routes:>5} routes, {dist.__name__:>16}: "
+                f"matrix {matrix:>6.3f}s | loop {loop}"
+            )
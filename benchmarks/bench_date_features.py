@@ -0,0 +1,68 @@
+"""Date feature extraction against the previous add_date_components_to.
+
+Run with ``python benchmarks/bench_date_features.py [n_rows]``.
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from watchml.utils import add_date_components_to
+from watchml.utils import add_date_features
+from watchml.utils import MONTH_TIME_OF_YEAR_MAPPING
+
+
+def previous_add_date_components_to(df, date_column_name="dateComponents"):
+    """add_date_components_to before the features module."""
+    df = df.copy()
+    date_column = pd.to_datetime(df[date_column_name])
+    df["timeOfYear"] = date_column.dt.month.map(
+        lambda month: MONTH_TIME_OF_YEAR_MAPPING[month]
+    )
+    df["year"] = date_column.dt.year
+    df["month"] = date_column.dt.month
+    df["weekday"] = date_column.dt.day_of_week
+    df["weekend"] = df["weekday"].map(lambda weekday: 0 if weekday not in [5, 6] else 1)
+    return df
+
+
+def timed(name, f, n_rows):
+    start = time.perf_counter()
+    f()
+    seconds = time.perf_counter() - start
+    print(f"{name:<45} {seconds:6.2f}s  {n_rows / seconds / 1e6:5.2f} Mrows/s")
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    seconds = rng.integers(0, 5 * 365 * 86400, n_rows)
+    dates = pd.Timestamp("2019-01-01") + pd.to_timedelta(np.sort(seconds), unit="s")
+    records = pd.DataFrame(
+        {
+            # the previous version fails on mixed offsets, so there is only one
+            "startDate": dates.strftime("%Y-%m-%d %H:%M:%S +0100"),
+            "value": rng.normal(70, 10, n_rows),
+        }
+    )
+    summaries = pd.DataFrame({"dateComponents": dates.strftime("%Y-%m-%d")})
+
+    for name, df, column in [
+        ("dateComponents", summaries, "dateComponents"),
+        ("startDate", records, "startDate"),
+    ]:
+        print(f"{n_rows} {name} values")
+        timed(
+            "previous add_date_components_to",
+            lambda: previous_add_date_components_to(df, column),
+            n_rows,
+        )
+        timed(
+            "add_date_components_to", lambda: add_date_components_to(df, column), n_rows
+        )
+        target = df.copy()
+        timed(
+            "add_date_features, all features, inplace",
+            lambda: add_date_features(target, column, inplace=True),
+            n_rows,
+        )
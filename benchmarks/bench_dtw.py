@@ -0,0 +1,49 @@
+"""DTW nearest neighbours with LB_Keogh pruning against the full DTW matrix.
+
+Run with ``python benchmarks/bench_dtw.py [n_routes]``.
+"""
+import sys
+import time
+
+import numpy as np
+from synthetic import route_variants
+from watchml.ml import BaselineNN
+from watchml.ml import DTWDistance
+
+K = 10
+
+if __name__ == "__main__":
+    n_routes = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    # K + 1 recordings per template, so that all K neighbours can be recordings of
+    # the same template
+    tracks, labels = route_variants(n_templates=n_routes // (K + 1), n_variants=K + 1)
+    nn = BaselineNN(tracks, n_points=64)
+    dtw = DTWDistance(window=0.1)
+
+    pair = tracks[:2]
+    start = time.perf_counter()
+    for _ in range(10):
+        nn.track_dist(pair[0], pair[1], dtw)
+    per_pair = (time.perf_counter() - start) / 10
+    n_pairs = len(tracks) * (len(tracks) - 1) // 2
+    print(f"pair by pair (estimated): {per_pair * n_pairs:>7.2f}s")
+
+    start = time.perf_counter()
+    full = nn.build_index(dtw)
+    print(f"full matrix, batched:     {time.perf_counter() - start:>7.2f}s")
+
+    start = time.perf_counter()
+    pruned = nn.build_index(dtw, k=K)
+    seconds = time.perf_counter() - start
+    evaluated = np.isfinite(pruned.dists).mean()
+    print(
+        f"k={K} with LB_Keogh:       {seconds:>7.2f}s | "
+        f"{evaluated:.0%} of the pairs evaluated"
+    )
+
+    same = (full.nns_many(n=K) == pruned.nns_many(n=K)).all()
+    precision = (labels[pruned.nns_many(n=K + 1)[:, 1:]] == labels[:, None]).mean()
+    print(
+        f"{len(tracks)} routes: identical neighbours {same} | "
+        f"precision@{K} {precision:.2f}"
+    )
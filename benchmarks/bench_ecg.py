@@ -0,0 +1,68 @@
+"""ECG loading throughput of ECGReader against the previous per-sample parser.
+
+Run with ``python benchmarks/bench_ecg.py [n_ecgs]``.
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+from typing import Tuple
+
+from synthetic import ecg
+from watchml.file import ECGReader
+
+
+def read_ecg_loop(ecg: str) -> Tuple[List[float], dict]:
+    """The parser ECGReader used before parse_samples, kept as the baseline."""
+    data = ecg.split("\n")
+    meta_data = {}
+    for m in data[:12]:
+        if m != "" and "," in m:
+            x = m.split(",")
+            if len(x) == 3:
+                meta_data[x[0]] = x[1] + "." + x[2]
+            else:
+                meta_data[x[0]] = x[1]
+    values = []
+    for d in data[13:]:
+        if d != "":
+            values.append(float(d.replace(",", ".")))
+    return values, meta_data
+
+
+def read_dir_loop(path: Path):
+    for file in sorted(path.iterdir()):
+        with open(file, "r") as f:
+            read_ecg_loop(f.read())
+
+
+def bench(read, path: Path, n_ecgs: int) -> float:
+    start = time.perf_counter()
+    read(path)
+    return n_ecgs / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    n_ecgs = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        for i in range(n_ecgs):
+            (path / f"ecg_2023-01-02_{i}.csv").write_text(ecg(seed=i), encoding="utf-8")
+
+        results = {
+            "per-sample loop": bench(read_dir_loop, path, n_ecgs),
+            "ECGReader, 1 worker": bench(
+                lambda p: ECGReader.read_ecgs_from_dir(p, workers=1), path, n_ecgs
+            ),
+            f"ECGReader, {os.cpu_count()} workers": bench(
+                ECGReader.read_ecgs_from_dir, path, n_ecgs
+            ),
+        }
+        baseline = results["per-sample loop"]
+        for name, ecgs_per_second in results.items():
+            print(
+                f"{name:>24}: {ecgs_per_second:>8,.0f} ECGs/s | "
+                f"{ecgs_per_second / baseline:.1f}x"
+            )
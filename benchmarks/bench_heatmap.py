@@ -0,0 +1,37 @@
+"""Binning throughput of RouteHeatmap for growing numbers of route points.
+
+Run with ``python benchmarks/bench_heatmap.py``.
+"""
+import time
+
+import numpy as np
+from synthetic import routes
+from watchml.viz import RouteHeatmap
+
+if __name__ == "__main__":
+    bounds = (7.9, 48.9, 8.1, 49.1)
+    for n_routes in [100, 200, 400, 800]:
+        tracks = routes(n_routes, n_points=2_000)
+        n_points = sum(track.n_points for track in tracks)
+
+        start = time.perf_counter()
+        heatmap = RouteHeatmap(bounds, width=1024)
+        heatmap.add_routes(tracks, weight="elevation")
+        seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        counts = np.zeros((heatmap.width, heatmap.height))
+        for track in tracks:
+            counts += np.histogram2d(
+                track.lon,
+                track.lat,
+                bins=(heatmap.width, heatmap.height),
+                range=[[bounds[0], bounds[2]], [bounds[1], bounds[3]]],
+            )[0]
+        histogram_seconds = time.perf_counter() - start
+
+        print(
+            f"{n_points:>9} points: RouteHeatmap {n_points / seconds / 1e6:.1f} "
+            f"Mpoints/s, np.histogram2d per route "
+            f"{n_points / histogram_seconds / 1e6:.1f} Mpoints/s"
+        )
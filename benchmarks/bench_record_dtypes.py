@@ -0,0 +1,32 @@
+"""Memory of a record table as attribute strings and after compact_record_dtypes.
+
+Run with ``python benchmarks/bench_record_dtypes.py [n_records]``, by default
+10M records (needs several GB of RAM for the string table).
+"""
+import sys
+import time
+
+import pandas as pd
+from synthetic import record_attributes
+from watchml.file.formats import compact_record_dtypes
+
+
+def megabytes(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1024**2
+
+
+if __name__ == "__main__":
+    n_records = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    record_df = record_attributes(n_records)
+    before = megabytes(record_df)
+
+    start = time.perf_counter()
+    compact_record_dtypes(record_df, inplace=True)
+    seconds = time.perf_counter() - start
+    after = megabytes(record_df)
+
+    print(f"{n_records:,} records")
+    print(f"strings: {before:>10,.1f} MB")
+    print(f"typed:   {after:>10,.1f} MB ({before / after:.1f}x smaller)")
+    print(f"coerced in {seconds:.1f}s ({n_records / seconds:,.0f} records/s)")
+    print(record_df.dtypes.to_string())
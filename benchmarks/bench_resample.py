@@ -0,0 +1,70 @@
+"""Hourly aggregation of a record type with WatchReader.resample against pandas.
+
+The pandas baseline reads the whole record type and resamples by start date,
+without splitting records that span several buckets. Peak memory is what
+tracemalloc sees (Python and numpy allocations).
+
+Run with ``python benchmarks/bench_resample.py [n_records]``.
+"""
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from synthetic import record_attributes
+from watchml.file import CacheFormat
+from watchml.file import WatchManager
+from watchml.file import WatchReader
+from watchml.file.writer import RecordChunkWriter
+
+STEPS = "HKQuantityTypeIdentifierStepCount"
+
+
+def measure(name, f):
+    start = time.perf_counter()
+    result = f()
+    seconds = time.perf_counter() - start
+    # tracemalloc slows numpy down, memory is measured in a second run
+    tracemalloc.start()
+    f()
+    peak = tracemalloc.get_traced_memory()[1] / 1024**2
+    tracemalloc.stop()
+    print(f"{name:<22} {seconds:6.2f}s  peak {peak:8.1f} MB  {len(result)} buckets")
+    return result
+
+
+def pandas_resample(reader: WatchReader):
+    records = reader.record(STEPS, columns=["startDate", "value"])
+    return (
+        records.set_index("startDate")["value"]
+        .resample("1h")
+        .agg(["sum", "mean", "min", "max", "count"])
+    )
+
+
+if __name__ == "__main__":
+    n_records = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    record_df = record_attributes(n_records)
+    record_df["type"] = STEPS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = Path(tmp) / "cache"
+        WatchManager(
+            data_path=tmp, cache_path=cache_path, cache_format=CacheFormat.PARQUET
+        ).update_cache_info()
+        record_writer = RecordChunkWriter(cache_path, cache_format=CacheFormat.PARQUET)
+        for i in range(0, n_records, 100_000):
+            record_writer.write(record_df.iloc[i : i + 100_000])
+        record_writer.close()
+        del record_df
+        reader = WatchReader(data_path=tmp, cache_path=cache_path)
+
+        print(f"{n_records:,} records")
+        expected = measure("pandas, whole type", lambda: pandas_resample(reader))
+        hourly = measure("WatchReader.resample", lambda: reader.resample(STEPS, "1h"))
+        print(
+            "total steps:",
+            f"{expected['sum'].sum():,.0f} (pandas),",
+            f"{hourly['sum'].sum():,.0f} (resample)",
+        )
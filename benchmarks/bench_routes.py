@@ -0,0 +1,62 @@
+"""Track point extraction throughput of parse_route against the previous per-point find() parser.
+
+Run with ``python benchmarks/bench_routes.py``.
+"""
+import time
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+from synthetic import gpx
+from watchml.file.routes import parse_route
+
+
+def parse_route_find(route_root: ET.Element) -> pd.DataFrame:
+    """The parser WatchWriter used before parse_route, kept as the baseline."""
+    ns = {"gpx": "http://www.topografix.com/GPX/1/1"}
+    route_data = {
+        "lon": [],
+        "lat": [],
+        "time": [],
+        "elevation": [],
+        "speed": [],
+        "course": [],
+        "hAcc": [],
+        "vAcc": [],
+    }
+    for route in route_root.findall("gpx:trk", ns):
+        for route_segment in route.findall("gpx:trkseg", ns):
+            for route_point in route_segment.findall("gpx:trkpt", ns):
+                extension = route_point.find("gpx:extensions", ns)
+                route_data["lon"].append(float(route_point.get("lon")))
+                route_data["lat"].append(float(route_point.get("lat")))
+                route_data["elevation"].append(
+                    float(route_point.find("gpx:ele", ns).text)
+                )
+                route_data["time"].append(route_point.find("gpx:time", ns).text)
+                route_data["speed"].append(float(extension.find("gpx:speed", ns).text))
+                route_data["course"].append(
+                    float(extension.find("gpx:course", ns).text)
+                )
+                route_data["hAcc"].append(float(extension.find("gpx:hAcc", ns).text))
+                route_data["vAcc"].append(float(extension.find("gpx:vAcc", ns).text))
+    return pd.DataFrame(route_data)
+
+
+def bench(parser, route_root: ET.Element, n_points: int, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser(route_root)
+        best = min(best, time.perf_counter() - start)
+    return n_points / best
+
+
+if __name__ == "__main__":
+    for n_points in [1_000, 10_000, 50_000]:
+        route_root = ET.fromstring(gpx(n_points))
+        baseline = bench(parse_route_find, route_root, n_points)
+        vectorized = bench(parse_route, route_root, n_points)
+        print(
+            f"{n_points:>7} points: find() {baseline:>12,.0f} points/s | "
+            f"parse_route {vectorized:>12,.0f} points/s | {vectorized / baseline:.1f}x"
+        )
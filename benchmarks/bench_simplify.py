@@ -0,0 +1,21 @@
+"""Douglas-Peucker simplification time and point reduction of long routes.
+
+Run with ``python benchmarks/bench_simplify.py``.
+"""
+import time
+
+from synthetic import random_walk
+from watchml.file.routes import ROUTE_PYRAMID_TOLERANCES
+from watchml.utils.geo import simplification_tolerances
+
+if __name__ == "__main__":
+    for n_points in [10_000, 50_000, 200_000]:
+        lons, lats, _ = random_walk(n_points)
+        start = time.perf_counter()
+        tolerances = simplification_tolerances(lons, lats)
+        seconds = time.perf_counter() - start
+        levels = " | ".join(
+            f"{tolerance:g} m: {(tolerances > tolerance).sum():>6} points"
+            for tolerance in ROUTE_PYRAMID_TOLERANCES
+        )
+        print(f"{n_points:>7} points in {seconds:.2f}s -> {levels}")
@@ -0,0 +1,40 @@
+"""Thumbnail throughput of ThumbnailRenderer against WorkoutRoute.plot per route.
+
+Run with ``python benchmarks/bench_thumbnails.py [n_routes]``.
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import matplotlib
+from synthetic import routes
+from watchml.viz import ThumbnailConfig
+from watchml.viz import ThumbnailRenderer
+
+matplotlib.use("Agg")
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    n_routes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    tracks = routes(n_routes, n_points=2_000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        for route in tracks:
+            fig = route.plot(figsize=(3, 3), return_fig=True)
+            fig.savefig(Path(tmp) / f"{route.uuid}.png", dpi=100)
+        seconds = time.perf_counter() - start
+        print(
+            f"WorkoutRoute.plot: {n_routes / seconds:.1f} thumbnails/s, "
+            f"{len(plt.get_fignums())} figures left open"
+        )
+        plt.close("all")
+
+        renderer = ThumbnailRenderer(ThumbnailConfig(fig_size=(3, 3), dpi=100))
+        for run in ["first run", "up to date"]:
+            start = time.perf_counter()
+            renderer.routes(tracks, Path(tmp) / "thumbnails")
+            seconds = time.perf_counter() - start
+            print(f"ThumbnailRenderer, {run}: {n_routes / seconds:.1f} thumbnails/s")
@@ -0,0 +1,161 @@
+"""Synthetic Apple Health data for the benchmarks."""
+import numpy as np
+import pandas as pd
+
+GPX_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="Apple Health Export" xmlns="http://www.topografix.com/GPX/1/1">
+ <trk>
+  <trkseg>
+"""
+
+GPX_FOOTER = """  </trkseg>
+ </trk>
+</gpx>
+"""
+
+GPX_POINT = (
+    '   <trkpt lon="{lon:.6f}" lat="{lat:.6f}"><ele>{ele:.2f}</ele>'
+    "<time>2023-01-02T{h:02d}:{m:02d}:{s:02d}Z</time><extensions>"
+    "<speed>{speed:.2f}</speed><course>{course:.1f}</course>"
+    "<hAcc>1.5</hAcc><vAcc>1.0</vAcc></extensions></trkpt>\n"
+)
+
+
+def random_walk(n_points: int, seed: int = 0, lon: float = 8.0, lat: float = 49.0):
+    """Longitudes, latitudes and elevations of a random walk starting at lon/lat."""
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, 0.0001, size=(n_points, 2)).cumsum(axis=0)
+    elevation = 100 + rng.normal(0, 0.5, size=n_points).cumsum()
+    return lon + steps[:, 0], lat + steps[:, 1], elevation
+
+
+def gpx(n_points: int, seed: int = 0) -> str:
+    lons, lats, elevations = random_walk(n_points, seed)
+    points = "".join(
+        GPX_POINT.format(
+            lon=lon,
+            lat=lat,
+            ele=ele,
+            h=(i // 3600) % 24,
+            m=(i // 60) % 60,
+            s=i % 60,
+            speed=3 + (i % 7) / 3,
+            course=i % 360,
+        )
+        for i, (lon, lat, ele) in enumerate(zip(lons, lats, elevations))
+    )
+    return GPX_HEADER + points + GPX_FOOTER
+
+
+RECORD_TYPES = {
+    "HKQuantityTypeIdentifierHeartRate": "count/min",
+    "HKQuantityTypeIdentifierStepCount": "count",
+    "HKQuantityTypeIdentifierActiveEnergyBurned": "Cal",
+    "HKQuantityTypeIdentifierBasalEnergyBurned": "Cal",
+    "HKQuantityTypeIdentifierDistanceWalkingRunning": "km",
+}
+
+DEVICE = (
+    "<<HKDevice: 0x283e4a3f0>, name:Apple Watch, manufacturer:Apple Inc., "
+    "model:Watch, hardware:Watch6,1, software:9.1>"
+)
+
+
+def record_attributes(n_records: int, seed: int = 0) -> pd.DataFrame:
+    """A record table of attribute strings, as parsed from Export.xml."""
+    rng = np.random.default_rng(seed)
+    types = np.array(list(RECORD_TYPES))[rng.integers(0, len(RECORD_TYPES), n_records)]
+    start = pd.Timestamp("2020-01-01") + pd.to_timedelta(
+        np.sort(rng.integers(0, 3 * 365 * 24 * 3600, n_records)), unit="s"
+    )
+    start_dates = start.strftime("%Y-%m-%d %H:%M:%S +0100")
+    end_dates = (start + pd.Timedelta(seconds=60)).strftime("%Y-%m-%d %H:%M:%S +0100")
+    return pd.DataFrame(
+        {
+            "type": types,
+            "unit": pd.Series(types).map(RECORD_TYPES).to_numpy(),
+            "value": rng.uniform(0, 200, n_records).round(2).astype(str),
+            "sourceName": np.where(rng.random(n_records) < 0.7, "Watch", "iPhone"),
+            "sourceVersion": "9.1",
+            "device": DEVICE,
+            "creationDate": end_dates,
+            "startDate": start_dates,
+            "endDate": end_dates,
+        }
+    ).astype(object)
+
+
+ECG_HEADER = """Name,Marc Julian Schwarz
+Date of Birth,01.01.2000
+Recorded Date,{date} 12:00:00 +0100
+Classification,Sinus Rhythm
+Symptoms,
+Software Version,1.90
+Device,"Watch6,1"
+Sample Rate,512 hertz
+,
+Lead,Lead I
+Unit,µV
+,
+"""
+
+
+def ecg(n_samples: int = 15_360, seed: int = 0, date: str = "2023-01-02") -> str:
+    """An ECG export csv, 30 seconds at 512 Hz by default."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples) / 512
+    samples = 400 * np.sin(2 * np.pi * 1.2 * t) ** 15 + rng.normal(0, 20, n_samples)
+    return ECG_HEADER.format(date=date) + "\n".join(f"{s:.3f}" for s in samples) + "\n"
+
+
+def routes(n_routes: int, n_points: int = 500, seed: int = 0):
+    """Random walk WorkoutRoutes starting around the same place."""
+    from watchml.data import WorkoutRoute
+
+    rng = np.random.default_rng(seed)
+    tracks = []
+    for i in range(n_routes):
+        lons, lats, elevations = random_walk(
+            int(rng.integers(n_points // 2, n_points * 2)),
+            seed=seed + i,
+            lon=8.0 + rng.normal(0, 0.01),
+            lat=49.0 + rng.normal(0, 0.01),
+        )
+        route_df = pd.DataFrame({"lon": lons, "lat": lats, "elevation": elevations})
+        tracks.append(WorkoutRoute(route_df, uuid=f"route-{i}", gpx_path=""))
+    return tracks
+
+
+def route_variants(
+    n_templates: int, n_variants: int, n_points: int = 500, seed: int = 0
+):
+    """
+    Noisy recordings of the same few routes, with the template of every route.
+
+    Every second template is the previous one mirrored through its center, so the
+    two share their centroid but differ in shape.
+    """
+    from watchml.data import WorkoutRoute
+
+    rng = np.random.default_rng(seed)
+    tracks, labels = [], []
+    for template in range(n_templates):
+        if template % 2 == 0:
+            lons, lats, elevations = random_walk(n_points, seed=seed + template)
+        else:
+            # the previous route mirrored through its center has the same centroid
+            lons, lats = 2 * lons.mean() - lons, 2 * lats.mean() - lats
+        for variant in range(n_variants):
+            keep = np.sort(rng.choice(n_points, int(n_points * 0.8), replace=False))
+            route_df = pd.DataFrame(
+                {
+                    "lon": lons[keep] + rng.normal(0, 2e-5, len(keep)),
+                    "lat": lats[keep] + rng.normal(0, 2e-5, len(keep)),
+                    "elevation": elevations[keep] + rng.normal(0, 1, len(keep)),
+                }
+            )
+            tracks.append(
+                WorkoutRoute(route_df, uuid=f"route-{template}-{variant}", gpx_path="")
+            )
+            labels.append(template)
+    return tracks, np.array(labels)
@@ -1,11 +1,215 @@
+import importlib
 import logging
 import sys
 
-from .data import *
-from .file import *
-from .ml import *
-from .utils import *
-from .viz import *
+# Subpackages are imported on first attribute access, so that `import watchml`
+# doesn't pull in pandas, matplotlib or annoy.
+_SUBPACKAGES = ["data", "file", "ml", "utils", "viz"]
+
+# Public names of the subpackages, the classes, functions, constants and modules
+# their star imports define. Keep in sync when adding to a subpackage, see
+# tests/test_import.py. Later subpackages win if a name is defined twice, as with
+# the star imports this replaces.
+_EXPORTS = {
+    "data": [
+        "ECG",
+        "HealthData",
+        "HKCharacteristicTypeIdentifier",
+        "Me",
+        "objects",
+        "Record",
+        "Workout",
+        "WorkoutActivity",
+        "WorkoutEvent",
+        "WorkoutRoute",
+        "WorkoutStatistics",
+    ],
+    "file": [
+        "aggregate",
+        "block_index_path",
+        "CacheFormat",
+        "CacheState",
+        "coerce_dtypes",
+        "coerce_record_dtypes",
+        "compact_record_dtypes",
+        "EARTH_RADIUS",
+        "ECG_META",
+        "ECG_OFFSETS",
+        "ECG_SAMPLE_CHARACTERS",
+        "ECG_VALUES",
+        "ECGCache",
+        "ECGReader",
+        "ecgs",
+        "FileSystemManager",
+        "format_hk_dates",
+        "format_hk_values",
+        "formats",
+        "GPX_EXTENSIONS",
+        "GPX_NAMESPACE",
+        "GPX_TIME",
+        "GRID_CELL_COLUMNS",
+        "GRID_CELL_SIZE",
+        "haversine",
+        "LAT",
+        "LazyWorkoutRoute",
+        "loader",
+        "logger",
+        "LON",
+        "manager",
+        "offset_column",
+        "parse_hk_dates",
+        "parse_hk_offsets",
+        "parse_route",
+        "partition_files",
+        "partition_years",
+        "partitioned_record_types",
+        "partitions",
+        "read_block_index",
+        "read_blocks",
+        "reader",
+        "RECORD_CATEGORY_COLUMNS",
+        "RECORD_COLUMNS",
+        "RECORD_DATE_COLUMNS",
+        "RECORD_FINGERPRINT_KEYS",
+        "record_fingerprints",
+        "record_partition_path",
+        "record_schema",
+        "RecordBuckets",
+        "RecordChunkWriter",
+        "RecordColumns",
+        "RecordStore",
+        "RESAMPLE_STATISTICS",
+        "route_cache",
+        "route_cells",
+        "route_pyramid_path",
+        "ROUTE_PYRAMID_TOLERANCES",
+        "route_summary",
+        "ROUTE_SUMMARY_COLUMNS",
+        "RouteCache",
+        "RouteGridIndex",
+        "RouteJob",
+        "RouteResult",
+        "routes",
+        "spatial",
+        "state",
+        "store",
+        "STORE_META",
+        "TRACK_POINT_COLUMN_INDEX",
+        "TRACK_POINT_COLUMNS",
+        "TRACK_POINT_TAGS",
+        "TYPE_PARTITION",
+        "WatchLoader",
+        "WatchManager",
+        "WatchReader",
+        "WatchWriter",
+        "workout_fingerprint",
+        "WORKOUT_FINGERPRINT_KEYS",
+        "WorkoutElement",
+        "write_block_index",
+        "write_ecg_cache",
+        "write_record_type_store",
+        "write_route_file",
+        "write_route_files",
+        "write_route_pyramid",
+        "writer",
+        "YEAR_PARTITION",
+    ],
+    "ml": [
+        "AnnoyNN",
+        "AnnoyNNIndex",
+        "baseline_nns",
+        "BaselineNN",
+        "BaselineNNIndex",
+        "dist",
+        "Distances",
+        "dtw",
+        "DTWDistance",
+        "embeddings",
+        "logger",
+        "MATRIX_DISTANCES",
+        "MatrixDistance",
+        "NN",
+        "NNIndex",
+        "resample",
+        "resample_polyline",
+        "resample_track",
+        "resample_tracks",
+        "route_index",
+        "ROUTE_INDEX_ANNOY",
+        "ROUTE_INDEX_EMBEDDINGS",
+        "ROUTE_INDEX_META",
+        "RouteEmbedding",
+        "RouteSimilarityIndex",
+        "SeriesDistance",
+        "track_length",
+    ],
+    "utils": [
+        "add_date_components_to",
+        "add_date_features",
+        "BLOOD_TYPE_MAP",
+        "constants",
+        "DATE_FEATURES",
+        "date_features",
+        "features",
+        "geo",
+        "HK_DATE_COLUMNS",
+        "HK_DATE_FORMAT",
+        "HK_WORKOUT_ACTIVITY_TYPE_MAP",
+        "HK_WORKOUT_DISTANCE_KEYS",
+        "HK_WORKOUT_DISTANCE_MAP",
+        "ME_KEYS",
+        "MEDICATION_MAP",
+        "METERS_PER_DEGREE",
+        "MONTH_TIME_OF_YEAR_MAPPING",
+        "normalize",
+        "parse_local_dates",
+        "path_length",
+        "project_to_meters",
+        "SEX_MAP",
+        "simplification_tolerances",
+        "simplify_polyline",
+        "SKIN_TYPE_MAP",
+        "skip_slow_tests",
+    ],
+    "viz": [
+        "AnimationConfig",
+        "BOUNDS_PADDING",
+        "frame_schedule",
+        "heatmap",
+        "HEATMAP_STATISTICS",
+        "RenderStats",
+        "RouteHeatmap",
+        "THUMBNAIL_BATCH_SIZE",
+        "THUMBNAIL_MANIFEST",
+        "ThumbnailConfig",
+        "ThumbnailRenderer",
+        "thumbnails",
+        "workout_animation",
+        "WorkoutAnimation",
+        "WorkoutAnimationConfig",
+    ],
+}
+_NAME_TO_SUBPACKAGE = {
+    name: subpackage for subpackage, names in _EXPORTS.items() for name in names
+}
+
+__all__ = sorted(_SUBPACKAGES + list(_NAME_TO_SUBPACKAGE))
+
+
+def __getattr__(name: str):
+    if name in _SUBPACKAGES:
+        return importlib.import_module(f".{name}", __name__)
+    subpackage = _NAME_TO_SUBPACKAGE.get(name)
+    if subpackage is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{subpackage}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
 
 logging.basicConfig(stream=sys.stdout, level=logging.ERROR)
 logging.info("Imported watchml")
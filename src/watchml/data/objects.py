@@ -1,11 +1,16 @@
+from __future__ import annotations
+
 from dataclasses import dataclass
 from enum import Enum
 from typing import Any
 from typing import List
+from typing import Tuple
+from typing import TYPE_CHECKING
+
+import numpy as np
 
-import matplotlib.pyplot as plt
-import pandas as pd
-from matplotlib.dates import DateFormatter
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 class HKCharacteristicTypeIdentifier(Enum):
@@ -102,8 +107,16 @@ class WorkoutStatistics:
 
 
 class ECG:
-    def __init__(self, values: List[float], meta_data: dict, name: str):
-        self.values = values
+    """A single ECG recording.
+
+    The samples are kept as one float32 array, which may also be a read-only view
+    into the consolidated ECG cache (see ``ECGCache``).
+    """
+
+    __slots__ = ("values", "meta_data", "name", "date")
+
+    def __init__(self, values: List[float] | np.ndarray, meta_data: dict, name: str):
+        self.values = np.asarray(values, dtype=np.float32)
         self.meta_data = meta_data
         self.name = name
         self.date = self.name.split("_")[1]
@@ -122,6 +135,9 @@ class ECG:
         return self.meta_data.keys()
 
     def generate_plot(self, path: str):
+        import matplotlib.pyplot as plt
+        from matplotlib.dates import DateFormatter
+
         plt.switch_backend("Agg")
         fig, ax = plt.subplots(figsize=(20, 7))
         ax.plot(self.values)
@@ -130,11 +146,12 @@ class ECG:
         ax.set_ylabel("mV")
         ax.xaxis.set_major_formatter(DateFormatter("%H:%M:%S"))
         fig.savefig(path)
+        plt.close(fig)
 
     def to_json(self):
         return {
             "name": self.name,
-            "values": self.values,
+            "values": self.values.tolist(),
             "metadata": self.meta_data,
             "date": self.date,
         }
@@ -158,6 +175,22 @@ class WorkoutRoute:
     def end_time(self):
         return self.route_df["time"].max()
 
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """(min_lon, min_lat, max_lon, max_lat) of the route."""
+        return (self.lon.min(), self.lat.min(), self.lon.max(), self.lat.max())
+
+    @property
+    def n_points(self) -> int:
+        return len(self.route_df)
+
+    @property
+    def distance(self) -> float:
+        """Length of the route in meters."""
+        from watchml.utils.geo import path_length
+
+        return path_length(self.lon.to_numpy(), self.lat.to_numpy())
+
     @property
     def lon(self):
         return self.route_df.lon
@@ -170,18 +203,33 @@ class WorkoutRoute:
     def time(self):
         return self.route_df.time
 
-    def plot(self, figsize=(10, 10), return_fig=False):
+    def simplified(self, tolerance: float) -> WorkoutRoute:
+        """A copy of the route simplified with Douglas-Peucker (``tolerance`` in meters)."""
+        from watchml.utils.geo import simplify_polyline
+
+        rows = simplify_polyline(self.lon.to_numpy(), self.lat.to_numpy(), tolerance)
+        return WorkoutRoute(
+            self.route_df.iloc[rows].reset_index(drop=True), self.uuid, self.gpx_path
+        )
+
+    def plot(self, figsize=(10, 10), return_fig=False, tolerance: float | None = None):
+        import matplotlib.pyplot as plt
+
+        route = self.simplified(tolerance) if tolerance is not None else self
         fig, ax = plt.subplots(figsize=figsize)
-        ax.scatter(self.lon, self.lat, s=2)
+        ax.scatter(route.lon, route.lat, s=2)
         ax.set_xlabel("Longitude")
         ax.set_ylabel("Latitude")
         if return_fig:
             return fig
 
     def plot_elevation(self, figsize=(15, 4), return_fig=False):
-        self.route_df["time"] = pd.to_datetime(self.route_df.time)
+        import matplotlib.pyplot as plt
+        import pandas as pd
+        from matplotlib.dates import DateFormatter
+
         fig, ax = plt.subplots(figsize=figsize)
-        ax.plot(self.route_df.time, self.route_df.elevation)
+        ax.plot(pd.to_datetime(self.route_df.time), self.route_df.elevation)
         ax.tick_params(axis="x", rotation=45)
         timeFmt = DateFormatter("%H:%M:%S")
         ax.xaxis.set_major_formatter(timeFmt)
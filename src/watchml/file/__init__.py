@@ -1,5 +1,14 @@
+from .aggregate import *
+from .ecgs import *
 from .file import *
+from .formats import *
 from .loader import *
 from .manager import *
+from .partitions import *
 from .reader import *
+from .route_cache import *
+from .routes import *
+from .spatial import *
+from .state import *
+from .store import *
 from .writer import *
@@ -0,0 +1,223 @@
+from typing import List
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+RESAMPLE_STATISTICS = ["sum", "mean", "min", "max", "count"]
+
+# Partial aggregates per bucket: bucket numbers and the sum of the proportional
+# shares, sum of the values, count, minimum and maximum of the record pieces
+_Partial = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+def _reduce(partial: _Partial) -> _Partial:
+    """Combines the entries of partial aggregates that belong to the same bucket."""
+    buckets, shares, values, counts, minimums, maximums = partial
+    if len(buckets) == 0:
+        return partial
+    order = np.argsort(buckets, kind="stable")
+    buckets = buckets[order]
+    firsts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    return (
+        buckets[firsts],
+        np.add.reduceat(shares[order], firsts),
+        np.add.reduceat(values[order], firsts),
+        np.add.reduceat(counts[order], firsts),
+        np.minimum.reduceat(minimums[order], firsts),
+        np.maximum.reduceat(maximums[order], firsts),
+    )
+
+
+def _concat(partials: List[_Partial]) -> _Partial:
+    return tuple(np.concatenate(arrays) for arrays in zip(*partials))
+
+
+class RecordBuckets:
+    """Aggregates records into fixed-size time buckets.
+
+    Records are added in chunks (see ``WatchReader.iter_query``). Every chunk is
+    reduced to one entry per bucket right away, so memory is bounded by the number
+    of buckets and not by the number of records.
+
+    A record whose interval spans several buckets is split at the bucket borders.
+    ``sum`` adds the value of each piece proportionally to the part of the
+    interval it covers (e.g. steps or energy), so the sum over all buckets equals
+    the sum of the values. ``mean``, ``min``, ``max`` and ``count`` see the full
+    record value in every bucket the record overlaps (e.g. heart rate), records
+    without duration fall into the bucket of their start date.
+
+    Buckets are aligned to 1970-01-01 00:00 UTC, or in local wall-clock time if a
+    timezone is given.
+    """
+
+    def __init__(self, bucket: str | pd.Timedelta, tz: str | None = None):
+        """
+        Parameters
+        ----------
+        bucket : str | pd.Timedelta
+            Size of the buckets, e.g. "1min", "1h" or "1D".
+        tz : str | None, optional
+            Timezone (e.g. "Europe/Berlin") whose wall-clock time the buckets are
+            aligned to, so that daily buckets are local days, by default UTC
+        """
+        self.bucket = pd.Timedelta(bucket)
+        if self.bucket <= pd.Timedelta(0):
+            raise ValueError(f"Bucket size must be positive, got {bucket}")
+        self.tz = tz
+        self.n_records = 0
+        self._partials: List[_Partial] = []
+        self._n_partial = 0
+        self._n_merged = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"RecordBuckets(bucket={self.bucket}, tz={self.tz}, "
+            f"records={self.n_records})"
+        )
+
+    def _nanoseconds(self, dates: pd.Series) -> np.ndarray:
+        dates = pd.Series(dates)
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_convert(self.tz or "UTC").dt.tz_localize(None)
+        return dates.to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+    def add(
+        self,
+        start_dates: pd.Series,
+        end_dates: pd.Series | None,
+        values: pd.Series | np.ndarray,
+    ) -> int:
+        """
+        Adds records to the buckets.
+
+        Records without start date or with a missing or non-numeric value are
+        skipped. A missing end date or one before the start date is treated as a
+        record without duration.
+
+        Returns
+        -------
+        int
+            Number of records that were added.
+        """
+        values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(
+            dtype=np.float64
+        )
+        start = self._nanoseconds(start_dates)
+        end = start if end_dates is None else self._nanoseconds(end_dates)
+        nat = np.iinfo(np.int64).min
+        valid = (start != nat) & ~np.isnan(values)
+        start, end, values = start[valid], end[valid], values[valid]
+        end = np.where(end == nat, start, np.maximum(end, start))
+
+        size = self.bucket.value
+        first = start // size
+        last = np.where(end > start, (end - 1) // size, first)
+        split = last > first
+        buckets, shares, piece_values = first[~split], values[~split], values[~split]
+        if split.any():
+            # only the records spanning several buckets are expanded into pieces
+            start, end, values = start[split], end[split], values[split]
+            n_pieces = last[split] - first[split] + 1
+            records = np.repeat(np.arange(len(start)), n_pieces)
+            piece_starts = np.repeat(np.cumsum(n_pieces) - n_pieces, n_pieces)
+            pieces = first[split][records] + np.arange(len(records)) - piece_starts
+            overlap = np.minimum(end[records], (pieces + 1) * size) - np.maximum(
+                start[records], pieces * size
+            )
+            duration = (end - start)[records]
+            buckets = np.concatenate([buckets, pieces])
+            shares = np.concatenate([shares, values[records] * overlap / duration])
+            piece_values = np.concatenate([piece_values, values[records]])
+
+        partial = _reduce(
+            (
+                buckets,
+                shares,
+                piece_values,
+                np.ones(len(buckets), dtype=np.int64),
+                piece_values,
+                piece_values,
+            )
+        )
+        self._partials.append(partial)
+        self._n_partial += len(partial[0])
+        # Partials of consecutive chunks mostly cover different buckets. They are
+        # merged once they have doubled since the last merge, which keeps merging
+        # linear in the number of entries.
+        if self._n_partial > max(1_000_000, 2 * self._n_merged):
+            self._merge()
+        self.n_records += int(valid.sum())
+        return int(valid.sum())
+
+    def add_records(self, records: pd.DataFrame) -> int:
+        """Adds a record table with startDate, value and optionally endDate."""
+        end_dates = records["endDate"] if "endDate" in records else None
+        return self.add(records["startDate"], end_dates, records["value"])
+
+    def _merge(self) -> _Partial:
+        if not self._partials:
+            empty = np.array([], dtype=np.float64)
+            return (
+                np.array([], dtype=np.int64),
+                empty,
+                empty,
+                np.array([], dtype=np.int64),
+                empty,
+                empty,
+            )
+        if len(self._partials) > 1:
+            self._partials = [_reduce(_concat(self._partials))]
+            self._n_partial = self._n_merged = len(self._partials[0][0])
+        return self._partials[0]
+
+    def to_frame(
+        self, statistics: List[str] | None = None, fill: bool = True
+    ) -> pd.DataFrame:
+        """
+        The aggregates as a table with one row per bucket.
+
+        Parameters
+        ----------
+        statistics : List[str] | None, optional
+            Columns to compute out of ``RESAMPLE_STATISTICS``, by default all
+        fill : bool, optional
+            Include the empty buckets between the first and the last one, with
+            a sum and count of 0, by default True
+
+        Returns
+        -------
+        pd.DataFrame
+            Indexed by the start of the buckets, in UTC or as naive local times
+            if a timezone was given.
+        """
+        statistics = statistics if statistics is not None else RESAMPLE_STATISTICS
+        unknown = set(statistics) - set(RESAMPLE_STATISTICS)
+        if unknown:
+            raise ValueError(
+                f"Unknown statistics {sorted(unknown)}, use {RESAMPLE_STATISTICS}"
+            )
+
+        buckets, shares, values, counts, minimums, maximums = self._merge()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            columns = {
+                "sum": shares,
+                "mean": values / counts,
+                "min": minimums,
+                "max": maximums,
+                "count": counts,
+            }
+        df = pd.DataFrame({statistic: columns[statistic] for statistic in statistics})
+        df.index = buckets
+        if fill and len(buckets):
+            df = df.reindex(np.arange(buckets[0], buckets[-1] + 1))
+            for statistic in ["sum", "count"]:
+                if statistic in df:
+                    df[statistic] = df[statistic].fillna(0)
+            if "count" in df:
+                df["count"] = df["count"].astype(np.int64)
+
+        index = pd.to_datetime(df.index.to_numpy(dtype=np.int64) * self.bucket.value)
+        df.index = index if self.tz else index.tz_localize("UTC")
+        df.index.name = "bucket"
+        return df
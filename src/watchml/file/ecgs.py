@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Iterator
+from typing import List
+
+import numpy as np
+from watchml.data import ECG
+
+ECG_VALUES = "values.npy"
+ECG_OFFSETS = "offsets.npy"
+ECG_META = "meta.json"
+
+
+def write_ecg_cache(ecg_cache_path: Path, ecgs: List[ECG]):
+    """
+    Writes ECGs as one consolidated binary cache.
+
+    The samples of all recordings are concatenated into a single ``float32`` array
+    (``values.npy``). ``offsets.npy`` holds ``len(ecgs) + 1`` positions into it, so
+    the samples of ECG ``i`` are ``values[offsets[i]:offsets[i + 1]]``. Names and
+    metadata are kept as a table in ``meta.json``.
+
+    Parameters
+    ----------
+    ecg_cache_path : Path
+        Folder of the ECG cache, replaced as a whole.
+    ecgs : List[ECG]
+        The ECGs to cache.
+    """
+    tmp_path = ecg_cache_path.with_name(f".{ecg_cache_path.name}.tmp")
+    if tmp_path.exists():
+        shutil.rmtree(tmp_path)
+    tmp_path.mkdir(parents=True)
+
+    offsets = np.zeros(len(ecgs) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(ecg.values) for ecg in ecgs])
+    values = np.empty(offsets[-1], dtype=np.float32)
+    for i, ecg in enumerate(ecgs):
+        values[offsets[i] : offsets[i + 1]] = ecg.values
+
+    np.save(tmp_path / ECG_VALUES, values)
+    np.save(tmp_path / ECG_OFFSETS, offsets)
+    with open(tmp_path / ECG_META, "w") as f:
+        json.dump(
+            {
+                "names": [ecg.name for ecg in ecgs],
+                "meta_data": [ecg.meta_data for ecg in ecgs],
+            },
+            f,
+        )
+
+    if ecg_cache_path.exists():
+        shutil.rmtree(ecg_cache_path)
+    os.replace(tmp_path, ecg_cache_path)
+
+
+class ECGCache:
+    """Memory-mapped access to the consolidated ECG cache.
+
+    Opening the cache reads the offsets and the metadata table, the samples are
+    mapped and only paged in for the ECGs that are used. The values of the
+    returned ECGs are read-only views into the mapped array.
+    """
+
+    def __init__(self, ecg_cache_path: Path | str):
+        self.path = Path(ecg_cache_path)
+        with open(self.path / ECG_META, "r") as f:
+            meta = json.load(f)
+        self.names: List[str] = meta["names"]
+        self.meta_data: List[dict] = meta["meta_data"]
+        self.offsets = np.load(self.path / ECG_OFFSETS)
+        self.values = np.load(self.path / ECG_VALUES, mmap_mode="r")
+
+    @staticmethod
+    def exists(ecg_cache_path: Path | str) -> bool:
+        return (Path(ecg_cache_path) / ECG_META).exists()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __repr__(self) -> str:
+        return f"ECGCache({self.path}, ecgs={len(self)})"
+
+    def __getitem__(self, i: int) -> ECG:
+        if not -len(self) <= i < len(self):
+            raise IndexError(f"ECG {i} out of range for {len(self)} ECGs")
+        i = i % len(self)
+        return ECG(
+            self.values[self.offsets[i] : self.offsets[i + 1]],
+            self.meta_data[i],
+            self.names[i],
+        )
+
+    def __iter__(self) -> Iterator[ECG]:
+        return (self[i] for i in range(len(self)))
@@ -4,6 +4,9 @@ from typing import List
 
 import pandas as pd
 
+from .formats import CacheFormat
+from .formats import coerce_dtypes
+
 
 class FileSystemManager:
     """Class to manage file system operations."""
@@ -24,9 +27,32 @@ class FileSystemManager:
                 os.mkdir(path)
 
     @staticmethod
-    def to_processed(path: Path | str, df: pd.DataFrame, name: str):
+    def processed_path(
+        path: Path | str, name: str, cache_format: CacheFormat = CacheFormat.CSV
+    ) -> Path:
+        """
+        Returns the path of a processed file.
+
+        Parameters
+        ----------
+        path : Path | str
+            Path to the folder.
+        name : str
+            Name of the file without suffix.
+        cache_format : CacheFormat, optional
+            Format of the file, by default CacheFormat.CSV
+        """
+        return Path(path) / f"{name}{cache_format.suffix}"
+
+    @staticmethod
+    def to_processed(
+        path: Path | str,
+        df: pd.DataFrame,
+        name: str,
+        cache_format: CacheFormat = CacheFormat.CSV,
+    ):
         """
-        Writes a DataFrame to a csv file.
+        Writes a DataFrame to a csv or parquet file.
 
         Parameters
         ----------
@@ -36,8 +62,40 @@ class FileSystemManager:
             DataFrame to write.
         name : str
             Name of the file.
+        cache_format : CacheFormat, optional
+            Format to write the file in, by default CacheFormat.CSV
+        """
+        file_path = FileSystemManager.processed_path(path, name, cache_format)
+        if cache_format == CacheFormat.PARQUET:
+            coerce_dtypes(df).to_parquet(file_path, index=False, compression="zstd")
+        else:
+            df.to_csv(file_path, index=False)
+
+    @staticmethod
+    def read_processed(
+        path: Path | str,
+        name: str,
+        cache_format: CacheFormat = CacheFormat.CSV,
+        columns: List[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Reads a DataFrame written by ``to_processed``.
+
+        Parameters
+        ----------
+        path : Path | str
+            Path to the folder.
+        name : str
+            Name of the file.
+        cache_format : CacheFormat, optional
+            Format the file was written in, by default CacheFormat.CSV
+        columns : List[str] | None, optional
+            Only read these columns, by default all columns are read.
         """
-        df.to_csv(path / f"{name}.csv", index=False)
+        file_path = FileSystemManager.processed_path(path, name, cache_format)
+        if cache_format == CacheFormat.PARQUET:
+            return pd.read_parquet(file_path, columns=columns)
+        return pd.read_csv(file_path, usecols=columns)
 
     @staticmethod
     def delete_files_in(path: Path | str):
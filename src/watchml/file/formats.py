@@ -0,0 +1,281 @@
+import re
+from dataclasses import fields
+from enum import Enum
+
+import numpy as np
+import pandas as pd
+from watchml.data import Record
+from watchml.utils.constants import HK_DATE_COLUMNS
+from watchml.utils.constants import HK_DATE_FORMAT
+
+RECORD_COLUMNS = [field.name for field in fields(Record)]
+RECORD_DATE_COLUMNS = ["creationDate", "startDate", "endDate"]
+RECORD_CATEGORY_COLUMNS = ["type", "unit", "sourceName", "sourceVersion", "device"]
+
+
+class CacheFormat(Enum):
+    """File formats the cache can be written in.
+
+    CSV keeps every value as text and is readable by any tool. PARQUET stores
+    numeric and datetime columns natively in a compressed, columnar layout and
+    requires ``pyarrow``.
+    """
+
+    CSV = "csv"
+    PARQUET = "parquet"
+
+    @property
+    def suffix(self) -> str:
+        return f".{self.value}"
+
+
+def coerce_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts the string columns of an export table to their native types.
+
+    Known date columns are parsed to UTC datetimes, columns that are entirely
+    numeric become numbers and everything else is stored as text.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame with the raw attribute strings of an export table.
+
+    Returns
+    -------
+    pd.DataFrame
+        A copy of the DataFrame with coerced columns.
+    """
+    df = df.copy()
+    for column in df.columns:
+        if df[column].dtype != object and not pd.api.types.is_string_dtype(df[column]):
+            continue
+        if column in HK_DATE_COLUMNS:
+            df[column] = pd.to_datetime(df[column], utc=True)
+            continue
+        try:
+            df[column] = pd.to_numeric(df[column])
+        except (ValueError, TypeError):
+            df[column] = df[column].map(lambda x: x if pd.isna(x) else str(x))
+    return df
+
+
+def record_schema(record_type: str | None = None):
+    """
+    Arrow schema of a record table.
+
+    ``value`` is numeric for quantity types and text for everything else (e.g.
+    category types like sleep analysis). Passing no record type returns the
+    schema for a table mixing several record types.
+
+    Parameters
+    ----------
+    record_type : str | None, optional
+        The record type the table holds, by default None
+
+    Returns
+    -------
+    pa.Schema
+        The schema all chunks of the record table are written with.
+    """
+    import pyarrow as pa
+
+    is_quantity = record_type is not None and record_type.startswith(
+        "HKQuantityTypeIdentifier"
+    )
+    timestamp = pa.timestamp("us", tz="UTC")
+    return pa.schema(
+        [
+            ("type", pa.string()),
+            ("unit", pa.string()),
+            ("value", pa.float64() if is_quantity else pa.string()),
+            ("sourceName", pa.string()),
+            ("sourceVersion", pa.string()),
+            ("device", pa.string()),
+            ("creationDate", timestamp),
+            ("startDate", timestamp),
+            ("endDate", timestamp),
+        ]
+    )
+
+
+def offset_column(date_column: str) -> str:
+    """Column holding the UTC offsets of a date column, see ``compact_record_dtypes``."""
+    return f"{date_column}Offset"
+
+
+def _offset_minutes(offsets: pd.Series) -> pd.Series:
+    """Minutes east of UTC of categorical offsets like "+0100"."""
+    offset_minutes = {
+        offset: (1 if offset[0] == "+" else -1)
+        * (int(offset[1:3]) * 60 + int(offset[3:5]))
+        for offset in offsets.cat.categories
+    }
+    return pd.to_timedelta(offsets.map(offset_minutes).astype(float), unit="min")
+
+
+def parse_hk_offsets(dates: pd.Series) -> pd.Series:
+    """The UTC offsets (e.g. "+0100") of HealthKit date strings as a categorical."""
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return pd.Series(None, index=dates.index, dtype="category")
+    offsets = dates.astype(object).str[-5:].astype("category")
+    invalid = [
+        offset
+        for offset in offsets.cat.categories
+        if not re.fullmatch(r"[+-]\d{4}", offset)
+    ]
+    return offsets.cat.remove_categories(invalid) if invalid else offsets
+
+
+def parse_hk_dates(dates: pd.Series) -> pd.Series:
+    """
+    Parses HealthKit date strings (e.g. "2023-01-01 10:00:00 +0100") to UTC datetimes.
+
+    Already parsed dates are only converted to UTC.
+    """
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return (
+            dates.dt.tz_convert("UTC") if dates.dt.tz else dates.dt.tz_localize("UTC")
+        )
+
+    dates = dates.astype(object)
+    lengths = dates.str.len()
+    if not (lengths.isna() | (lengths == len("2023-01-01 10:00:00 +0100"))).all():
+        return pd.to_datetime(dates, format=HK_DATE_FORMAT, utc=True)
+
+    # Parsing "%z" for every row is slow. An export only has a handful of distinct
+    # offsets, so the local time and the offset are parsed separately.
+    local = pd.to_datetime(dates.str[:19], format="%Y-%m-%d %H:%M:%S")
+    return (local - _offset_minutes(parse_hk_offsets(dates))).dt.tz_localize("UTC")
+
+
+def format_hk_dates(dates: pd.Series, offsets: pd.Series | None = None) -> pd.Series:
+    """
+    Formats parsed dates back to HealthKit date strings, strings are kept as is.
+
+    Parameters
+    ----------
+    dates : pd.Series
+        Parsed dates or HealthKit date strings.
+    offsets : pd.Series | None, optional
+        UTC offsets (e.g. "+0100") to write the dates in the local time of, as
+        returned by ``parse_hk_offsets``. Dates without an offset are written in
+        UTC, by default all are.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    if dates.dt.tz is None:
+        dates = dates.dt.tz_localize("UTC")
+    if offsets is None or offsets.isna().all():
+        return dates.dt.strftime(HK_DATE_FORMAT)
+
+    offsets = offsets.astype("category")
+    local = dates.dt.tz_localize(None) + _offset_minutes(offsets).fillna(
+        pd.Timedelta(0)
+    )
+    formatted = local.dt.strftime("%Y-%m-%d %H:%M:%S ") + offsets.astype(object).fillna(
+        "+0000"
+    )
+    return formatted.where(dates.notna())
+
+
+def format_hk_values(values: pd.Series) -> pd.Series:
+    """
+    Formats parsed values back to their attribute strings, strings are kept as is.
+
+    Numbers are written as short as possible, so that "62" stays "62" and not "62.0".
+    """
+    if not pd.api.types.is_float_dtype(values):
+        return values
+    codes, uniques = pd.factorize(values)
+    formatted = np.array(
+        [np.format_float_positional(value, trim="-") for value in uniques] + [None],
+        dtype=object,
+    )
+    return pd.Series(formatted[codes], index=values.index)
+
+
+def compact_record_dtypes(
+    record_df: pd.DataFrame, inplace: bool = False, keep_offsets: bool = False
+) -> pd.DataFrame:
+    """
+    Converts a record table of attribute strings to a compact, typed layout.
+
+    Dates become UTC datetimes and the low-cardinality text columns (type, unit,
+    source, source version and device) become categoricals. ``value`` becomes a
+    float if all values are numeric. Tables holding category types (e.g. sleep
+    analysis), whose values are text, keep ``value`` as a categorical instead.
+    Columns that are missing or already converted are skipped.
+
+    Parameters
+    ----------
+    record_df : pd.DataFrame
+        Record table with (a subset of) the columns of ``watchml.data.Record``.
+    inplace : bool, optional
+        Convert the columns of the given table instead of a copy, by default False
+    keep_offsets : bool, optional
+        Keep the UTC offsets of the date strings in categorical
+        ``<date column>Offset`` columns (see ``offset_column``), so the dates can be
+        written back in their local time with ``format_hk_dates``, by default False
+
+    Returns
+    -------
+    pd.DataFrame
+        The record table with converted columns.
+    """
+    if not inplace:
+        record_df = record_df.copy()
+
+    for column in RECORD_DATE_COLUMNS:
+        if column in record_df.columns:
+            if keep_offsets and offset_column(column) not in record_df.columns:
+                record_df[offset_column(column)] = parse_hk_offsets(record_df[column])
+            record_df[column] = parse_hk_dates(record_df[column])
+
+    for column in RECORD_CATEGORY_COLUMNS:
+        if column in record_df.columns and record_df[column].dtype != "category":
+            record_df[column] = record_df[column].astype("category")
+
+    if "value" in record_df.columns and not pd.api.types.is_numeric_dtype(
+        record_df["value"]
+    ):
+        values = pd.to_numeric(record_df["value"], errors="coerce")
+        if values.isna().sum() == record_df["value"].isna().sum():
+            record_df["value"] = values
+        elif record_df["value"].dtype != "category":
+            record_df["value"] = record_df["value"].astype("category")
+
+    return record_df
+
+
+def coerce_record_dtypes(
+    record_df: pd.DataFrame, record_type: str | None = None
+) -> pd.DataFrame:
+    """
+    Converts a record table to the dtypes of ``record_schema(record_type)``.
+
+    Parameters
+    ----------
+    record_df : pd.DataFrame
+        Record table with the columns of ``watchml.data.Record``.
+    record_type : str | None, optional
+        The record type the table holds, by default None
+
+    Returns
+    -------
+    pd.DataFrame
+        A copy of the record table with coerced columns.
+    """
+    record_df = record_df.copy()
+    for column in RECORD_DATE_COLUMNS:
+        record_df[column] = parse_hk_dates(record_df[column])
+    for column in RECORD_CATEGORY_COLUMNS + ["value"]:
+        if record_df[column].dtype == "category":
+            record_df[column] = record_df[column].astype(object)
+    if record_type is not None and record_type.startswith("HKQuantityTypeIdentifier"):
+        record_df["value"] = pd.to_numeric(record_df["value"], errors="coerce")
+    elif pd.api.types.is_numeric_dtype(record_df["value"]):
+        record_df["value"] = record_df["value"].map(
+            lambda x: x if pd.isna(x) else str(x)
+        )
+    return record_df
@@ -1,5 +1,6 @@
 import xml.etree.ElementTree as ET
 from pathlib import Path
+from typing import Iterator
 
 
 class WatchLoader:
@@ -11,3 +12,37 @@ class WatchLoader:
         tree = ET.parse(self.data_path / "Export.xml")
         root = tree.getroot()
         return root
+
+    def iter_export_elements(self) -> Iterator[ET.Element]:
+        """
+        Incrementally parses Export.xml and yields elements as they are completed.
+
+        The first element yielded is the ``HealthData`` root (without children), so
+        that its attributes (e.g. ``locale``) are available. After that every
+        top-level element (``Record``, ``Workout``, ``ActivitySummary``, ...) is
+        yielded once it has been fully parsed and is cleared and detached from the
+        root as soon as the consumer asks for the next one. Peak memory is therefore
+        bounded by the largest single top-level element, not by the export size.
+
+        Yields
+        ------
+        ET.Element
+            The root element, followed by every completed top-level element.
+        """
+        context = ET.iterparse(self.data_path / "Export.xml", events=("start", "end"))
+        root = None
+        depth = 0
+
+        for event, elem in context:
+            if event == "start":
+                depth += 1
+                if root is None:
+                    root = elem
+                    yield root
+                continue
+
+            depth -= 1
+            if depth == 1:
+                yield elem
+                elem.clear()
+                root.remove(elem)
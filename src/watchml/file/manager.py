@@ -4,16 +4,28 @@ from datetime import datetime as dt
 from pathlib import Path
 
 from .file import FileSystemManager
+from .formats import CacheFormat
 from .loader import WatchLoader
+from .state import CacheState
 from .writer import WatchWriter
 
 
 class WatchManager:
     def __init__(
-        self, data_path: Path | str, cache_path: Path | str | None = None
+        self,
+        data_path: Path | str,
+        cache_path: Path | str | None = None,
+        cache_format: CacheFormat = CacheFormat.CSV,
+        route_workers: int | None = None,
     ) -> None:
         self.loader = WatchLoader(data_path=data_path, cache_path=cache_path)
-        self.writer = WatchWriter(data_path=data_path, cache_path=cache_path)
+        self.writer = WatchWriter(
+            data_path=data_path,
+            cache_path=cache_path,
+            cache_format=cache_format,
+            route_workers=route_workers,
+        )
+        self.cache_format = cache_format
         self.data_path = Path(data_path)
         self.cache_path = (
             Path(cache_path) if cache_path is not None else data_path / "cache"
@@ -24,19 +36,82 @@ class WatchManager:
         FileSystemManager.delete_files_in(self.cache_path / "routes")
         FileSystemManager.delete_files_in(self.cache_path / "workout_metadata_entry")
 
-    def update_cache_info(self):
+    def load_cache_state(self) -> CacheState:
+        """
+        Reads the incremental update state of the existing cache.
+
+        Returns an empty state, which forces a full rebuild, if there is no cache
+        yet or it was written in a different format.
+        """
+        cache_info_path = self.cache_path / "cache.json"
+        if not cache_info_path.exists():
+            return CacheState()
+
+        with open(cache_info_path, "r") as f:
+            content = json.load(f)
+        if content.get("format", CacheFormat.CSV.value) != self.cache_format.value:
+            return CacheState()
+        return CacheState.from_dict(content)
+
+    def update_cache_info(self, cache_state: CacheState | None = None):
         if not self.cache_path.exists():
             self.writer.scaffold_folder_structure()
 
+        cache_state = cache_state if cache_state is not None else CacheState()
         with open(self.cache_path / "cache.json", "w") as f:
             content = {
                 "last_updated": dt.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "format": self.cache_format.value,
+                **cache_state.to_dict(),
             }
             f.write(json.dumps(content))
 
-    def reload_data(self, root: ET.Element = None):
+    def reload_data(
+        self,
+        root: ET.Element = None,
+        streaming: bool = True,
+        incremental: bool = True,
+        record_store: bool = False,
+        route_index: bool = False,
+    ):
+        """
+        Rebuilds the cache from Export.xml.
+
+        Parameters
+        ----------
+        root : ET.Element, optional
+            An already parsed export root. If given, it is written as is.
+        streaming : bool, optional
+            Whether to parse Export.xml incrementally instead of loading the whole
+            tree into memory, by default True
+        incremental : bool, optional
+            Whether to only add records and workouts that are not cached yet. Only
+            applies to streaming reloads; falls back to a full rebuild if the cache
+            has no state from a previous run, by default True
+        record_store : bool, optional
+            Whether to also write the memory-mapped record store read by
+            ``WatchReader.record_store``, by default False
+        route_index : bool, optional
+            Whether to also update the route similarity index read by
+            ``WatchReader.route_index``, by default False
+        """
         self.writer.scaffold_folder_structure()
 
+        if root is None and streaming:
+            print("Streaming Export.xml file...")
+            cache_state = self.load_cache_state() if incremental else None
+            # Clear the state first, an interrupted update then triggers a full rebuild
+            self.update_cache_info()
+            cache_state = self.writer.write_all_streaming(
+                self.loader.iter_export_elements(), cache_state=cache_state
+            )
+            self.update_cache_info(cache_state)
+            if record_store:
+                self.writer.write_record_store()
+            if route_index:
+                self.update_route_index()
+            return
+
         if root is None:
             print("Reading Export.xml file...")
             root = self.loader.load_export_root()
@@ -45,3 +120,20 @@ class WatchManager:
         # self.delete_old_data()
 
         self.writer.write_all(root=root)
+        if record_store:
+            self.writer.write_record_store()
+        if route_index:
+            self.update_route_index()
+
+    def update_route_index(self):
+        """
+        Adds the routes of new workouts to the route similarity index (see
+        ``RouteSimilarityIndex``) and removes the routes of deleted workouts.
+        """
+        from watchml.ml import RouteSimilarityIndex
+
+        from .reader import WatchReader
+
+        reader = WatchReader(data_path=self.data_path, cache_path=self.cache_path)
+        added = RouteSimilarityIndex(self.cache_path).update(reader)
+        print(f"Added {added} routes to the route index")
@@ -0,0 +1,165 @@
+import io
+import json
+import os
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+
+from .formats import CacheFormat
+
+TYPE_PARTITION = "type"
+YEAR_PARTITION = "year"
+
+
+def record_partition_path(
+    records_path: Path, record_type: str, year: int | str | None = None
+) -> Path:
+    """
+    Folder of a record partition in the hive style ``type=<type>/year=<year>`` layout.
+
+    Parameters
+    ----------
+    records_path : Path
+        The records folder of the cache.
+    record_type : str
+        The record type.
+    year : int | str | None, optional
+        The year of the records' ``startDate``. If not given, the folder of the
+        whole record type is returned.
+    """
+    path = records_path / f"{TYPE_PARTITION}={record_type}"
+    if year is not None:
+        path = path / f"{YEAR_PARTITION}={year}"
+    return path
+
+
+def _partition_value(name: str) -> str:
+    return name.split("=", 1)[1]
+
+
+def partitioned_record_types(records_path: Path) -> List[str]:
+    """Record types with at least one partition in the records folder."""
+    if not records_path.exists():
+        return []
+    return sorted(
+        _partition_value(name)
+        for name in os.listdir(records_path)
+        if name.startswith(f"{TYPE_PARTITION}=")
+    )
+
+
+def partition_years(records_path: Path, record_type: str) -> List[int]:
+    """Years with records of the given type."""
+    type_path = record_partition_path(records_path, record_type)
+    if not type_path.exists():
+        return []
+    return sorted(
+        int(_partition_value(name))
+        for name in os.listdir(type_path)
+        if name.startswith(f"{YEAR_PARTITION}=")
+    )
+
+
+def partition_files(
+    records_path: Path,
+    record_type: str,
+    cache_format: CacheFormat = CacheFormat.CSV,
+    years: List[int] | None = None,
+) -> List[Path]:
+    """
+    Files of a record type, ordered by year and part.
+
+    Only the partitions of the given years are listed, so the files of other
+    years are never touched.
+
+    Parameters
+    ----------
+    records_path : Path
+        The records folder of the cache.
+    record_type : str
+        The record type.
+    cache_format : CacheFormat, optional
+        Format the records were written in, by default CacheFormat.CSV
+    years : List[int] | None, optional
+        Only list files of these years, by default all years.
+    """
+    files = []
+    for year in partition_years(records_path, record_type):
+        if years is not None and year not in years:
+            continue
+        year_path = record_partition_path(records_path, record_type, year)
+        files.extend(
+            year_path / name
+            for name in sorted(os.listdir(year_path))
+            if name.endswith(cache_format.suffix)
+        )
+    return files
+
+
+def block_index_path(part_file: Path) -> Path:
+    """Path of the sidecar block index of a part file."""
+    return part_file.with_suffix(".index.json")
+
+
+def write_block_index(part_file: Path, blocks: List[dict]):
+    """
+    Writes the sidecar block index of a part file.
+
+    Parameters
+    ----------
+    part_file : Path
+        The part file the blocks were appended to.
+    blocks : List[dict]
+        One entry per block with its number of ``rows``, the ``min_start`` and
+        ``max_start`` of its start dates and either its ``row_group`` (parquet)
+        or its byte ``offset`` and ``length`` (csv).
+    """
+    with open(block_index_path(part_file), "w") as f:
+        json.dump({"blocks": blocks}, f)
+
+
+def read_block_index(part_file: Path) -> List[dict] | None:
+    """Reads the sidecar block index of a part file, None if it has none."""
+    index_path = block_index_path(part_file)
+    if not index_path.exists():
+        return None
+    with open(index_path, "r") as f:
+        return json.load(f)["blocks"]
+
+
+def read_blocks(
+    part_file: Path,
+    blocks: List[dict],
+    cache_format: CacheFormat = CacheFormat.CSV,
+    columns: List[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Reads only the given blocks of a part file.
+
+    Parameters
+    ----------
+    part_file : Path
+        The part file.
+    blocks : List[dict]
+        Entries of the part file's block index.
+    cache_format : CacheFormat, optional
+        Format of the part file, by default CacheFormat.CSV
+    columns : List[str] | None, optional
+        Only read these columns, by default all columns are read.
+    """
+    if cache_format == CacheFormat.PARQUET:
+        import pyarrow.parquet as pq
+
+        return (
+            pq.ParquetFile(part_file)
+            .read_row_groups([block["row_group"] for block in blocks], columns=columns)
+            .to_pandas()
+        )
+
+    with open(part_file, "rb") as f:
+        content = [f.readline()]
+        for block in blocks:
+            f.seek(block["offset"])
+            content.append(f.read(block["length"]))
+    return pd.read_csv(io.BytesIO(b"".join(content)), usecols=columns)
@@ -1,48 +1,137 @@
+import csv
+import json
 import logging
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
 from pathlib import Path
+from typing import Dict
+from typing import Iterator
 from typing import List
 from typing import Tuple
+from typing import TYPE_CHECKING
 
+import numpy as np
 import pandas as pd
-from watchml import ECG
-from watchml import WorkoutRoute
+from pandas.api.types import union_categoricals
+from watchml.data import ECG
+from watchml.utils.geo import simplify_polyline
+
+from .aggregate import RecordBuckets
+from .ecgs import ECGCache
+from .file import FileSystemManager
+from .formats import CacheFormat
+from .formats import compact_record_dtypes
+from .formats import RECORD_COLUMNS
+from .partitions import partition_files
+from .partitions import partition_years
+from .partitions import partitioned_record_types
+from .partitions import read_block_index
+from .partitions import read_blocks
+from .route_cache import LazyWorkoutRoute
+from .route_cache import RouteCache
+from .routes import route_pyramid_path
+from .routes import ROUTE_PYRAMID_TOLERANCES
+from .routes import ROUTE_SUMMARY_COLUMNS
+from .spatial import EARTH_RADIUS
+from .spatial import haversine
+from .spatial import RouteGridIndex
+from .store import RecordStore
+
+if TYPE_CHECKING:
+    from watchml.ml import RouteSimilarityIndex
 
 logger = logging.getLogger(__name__)
 
+# Lines made up only of these characters are samples, everything before is metadata
+ECG_SAMPLE_CHARACTERS = b'0123456789.,-+" \r'
+
 
 class ECGReader:
     @staticmethod
-    def read_ecg_from_file(path: str) -> ECG:
-        with open(path, "r") as f:
-            ecg = f.read()
-            values, meta_data = ECGReader.read_ecg(ecg)
-            name = str(path).split("/")[-1].replace(".csv", "")
-        return ECG(values, meta_data, name)
+    def read_ecg_from_file(path: str | Path) -> ECG:
+        with open(path, "rb") as f:
+            values, meta_data = ECGReader.read_ecg(f.read())
+        return ECG(values, meta_data, Path(path).stem)
 
     @staticmethod
-    def read_ecg(ecg) -> Tuple[List[float], dict]:
-        data = ecg.split("\n")
-        m_data = data[:12]
+    def _split_header(ecg: bytes) -> Tuple[List[str], bytes]:
+        """Splits an ECG file into its metadata lines and the block of samples."""
+        position = 0
+        header = []
+        while position < len(ecg):
+            end = ecg.find(b"\n", position)
+            end = len(ecg) if end == -1 else end
+            line = ecg[position:end].strip()
+            # a sample ends with a digit, optionally followed by a closing quote
+            if (line[-1:].isdigit() or line[-2:-1].isdigit()) and not line.translate(
+                None, ECG_SAMPLE_CHARACTERS
+            ):
+                break
+            header.append(line.decode("utf-8"))
+            position = end + 1
+        return header, ecg[position:]
+
+    @staticmethod
+    def parse_samples(samples: bytes) -> np.ndarray:
+        """
+        Decodes a block of one sample per line into a float32 array.
+
+        Samples may use a point or a comma as decimal separator.
+        """
+        if b'"' in samples:
+            samples = samples.replace(b'"', b"")
+        if b"," in samples:
+            samples = samples.replace(b",", b".")
+        return np.array(samples.split(), dtype=np.float32)
+
+    @staticmethod
+    def read_ecg(ecg: str | bytes) -> Tuple[np.ndarray, dict]:
+        if isinstance(ecg, str):
+            ecg = ecg.encode("utf-8")
+        header, samples = ECGReader._split_header(ecg)
+
         meta_data = {}
-        for m in m_data:
-            if (
-                m != "" and "," in m
-            ):  # makes sure that the row isnt empty and that it is a key,value pair
-                x = m.split(",")
-                if len(x) == 3:  # if commas were used instead of points for floats
-                    meta_data[x[0]] = x[1] + "." + x[2]
-                else:
-                    meta_data[x[0]] = x[1]
+        for x in csv.reader(header):
+            # makes sure that the row isnt empty and that it is a key,value pair
+            if len(x) == 3:  # if commas were used instead of points for floats
+                meta_data[x[0]] = x[1] + "." + x[2]
+            elif len(x) >= 2:
+                meta_data[x[0]] = x[1]
 
-        data = data[13:]
+        return ECGReader.parse_samples(samples), meta_data
 
-        values = []
-        for d in data:
-            if d != "":
-                values.append(float(d.replace(",", ".")))
+    @staticmethod
+    def read_ecgs_from_dir(path: str | Path, workers: int | None = None) -> List[ECG]:
+        """
+        Reads all ECG csv files of a folder, parsing them in a process pool.
 
-        return values, meta_data
+        Parameters
+        ----------
+        path : str | Path
+            Folder with the ECG csv files, e.g. ``electrocardiograms``.
+        workers : int | None, optional
+            Number of worker processes. ``None`` uses all cpus and ``1`` reads the
+            files in the current process, by default None
+
+        Returns
+        -------
+        List[ECG]
+            The ECGs, ordered by file name.
+        """
+        files = sorted(file for file in Path(path).iterdir() if file.suffix == ".csv")
+        workers = workers if workers is not None else os.cpu_count() or 1
+        if workers <= 1 or len(files) <= 1:
+            return [ECGReader.read_ecg_from_file(file) for file in files]
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(
+                executor.map(
+                    ECGReader.read_ecg_from_file,
+                    files,
+                    chunksize=max(1, len(files) // (workers * 4)),
+                )
+            )
 
 
 class WatchReader:
@@ -52,76 +141,611 @@ class WatchReader:
             Path(cache_path) if cache_path is not None else data_path / "cache"
         )
 
+    @cached_property
+    def cache_info(self) -> dict:
+        """
+        The content of cache.json, read once per reader.
+
+        Call ``refresh`` after the cache was rewritten, e.g. in another format.
+        """
+        cache_info_path = self.cache_path / "cache.json"
+        if not cache_info_path.exists():
+            return {}
+        with open(cache_info_path, "r") as f:
+            return json.load(f)
+
+    @cached_property
+    def cache_format(self) -> CacheFormat:
+        # Caches written before the format was recorded are csv
+        return CacheFormat(self.cache_info.get("format", CacheFormat.CSV.value))
+
+    def refresh(self):
+        """Forgets the cache info read so far, it is read again on next use."""
+        self.__dict__.pop("cache_info", None)
+        self.__dict__.pop("cache_format", None)
+
+    def _read(
+        self, name: str, path: Path | None = None, columns: List[str] | None = None
+    ) -> pd.DataFrame:
+        return FileSystemManager.read_processed(
+            path=path if path is not None else self.cache_path,
+            name=name,
+            cache_format=self.cache_format,
+            columns=columns,
+        )
+
     @property
     def metadata(self):
-        return pd.read_csv(self.cache_path / "metadata.csv")
+        return self._read("metadata")
 
     @property
     def record_types(self):
-        return [file.split(".")[0] for file in os.listdir(self.cache_path / "records")]
+        return partitioned_record_types(self.cache_path / "records")
 
-    def ecgs(self):
+    def record_years(self, record_type: str) -> List[int]:
+        return partition_years(self.cache_path / "records", record_type)
+
+    def ecgs(self, workers: int | None = None) -> List[ECG]:
+        """
+        All ECGs, read from the ECG cache if it was written, otherwise parsed from
+        the csv files in ``electrocardiograms``.
+        """
         logger.info("Reading ECGs")
-        ecg_filenames = os.listdir(self.data_path / "electrocardiograms")
-        ecgs = []
-        for file in ecg_filenames:
-            with open(self.data_path / "electrocardiograms" / file, "r") as f:
-                ecg = f.read()
-                logger.debug(f"Reading ECG {file}")
-                name = file.split(".")[0]
-                values, meta_data = ECGReader.ecg_data(ecg)
-            ecgs.append(ECG(values, meta_data, name))
-        return ecgs
-
-    def activity_summary(self):
+        if ECGCache.exists(self.cache_path / "ecgs"):
+            return list(ECGCache(self.cache_path / "ecgs"))
+        return ECGReader.read_ecgs_from_dir(
+            self.data_path / "electrocardiograms", workers=workers
+        )
+
+    def activity_summary(self, columns: List[str] | None = None):
         logger.info("Reading activity summary dataframe")
-        return pd.read_csv(self.cache_path / "activity_summary.csv")
+        return self._read("activity_summary", columns=columns)
 
-    def workouts(self):
+    def workouts(self, columns: List[str] | None = None):
         logger.info("Reading workouts dataframe")
-        return pd.read_csv(self.cache_path / "workouts.csv")
+        return self._read("workouts", columns=columns)
 
-    def workout_events(self):
+    def workout_events(self, columns: List[str] | None = None):
         logger.info("Reading workout events dataframe")
-        return pd.read_csv(self.cache_path / "workout_events.csv")
+        return self._read("workout_events", columns=columns)
+
+    def routes_meta(self, columns: List[str] | None = None, written: bool = False):
+        """
+        The routes of all workouts.
 
-    def routes_meta(self):
+        Parameters
+        ----------
+        columns : List[str] | None, optional
+            Columns to read, by default all columns
+        written : bool, optional
+            Only keep routes whose points were written to the cache, routes that
+            failed to parse are dropped, by default False
+        """
         logger.info("Reading routes meta dataframe")
-        return pd.read_csv(self.cache_path / "routes_meta.csv")
+        routes_meta = self._read("routes_meta", columns=columns)
+        if not written or "workout_uuid" not in routes_meta:
+            return routes_meta
+        if "points" in routes_meta:
+            is_written = routes_meta["points"].notna()
+        else:
+            # caches written before the route summaries only have the files
+            cache_format = self.cache_format
+            is_written = routes_meta["workout_uuid"].map(
+                lambda uuid: FileSystemManager.processed_path(
+                    self.cache_path / "routes", str(uuid), cache_format
+                ).exists()
+            )
+        return routes_meta.loc[is_written].reset_index(drop=True)
 
-    def route(self, workout_id: str):
+    def route(
+        self,
+        workout_id: str,
+        columns: List[str] | None = None,
+        tolerance: float | None = None,
+    ):
+        """
+        The track points of a workout route.
+
+        Parameters
+        ----------
+        workout_id : str
+            Uuid of the workout.
+        columns : List[str] | None, optional
+            Columns to read, by default all columns
+        tolerance : float | None, optional
+            Douglas-Peucker tolerance in meters to simplify the route with. The
+            coarsest precomputed level within the tolerance is read and simplified
+            further if needed, by default the full route is read.
+        """
         logger.debug(f"Reading route for workout {workout_id}")
-        return pd.read_csv(self.cache_path / "routes" / f"{workout_id}.csv")
+        if tolerance is None:
+            return self._read(
+                workout_id, path=self.cache_path / "routes", columns=columns
+            )
 
-    def routes(self) -> List[WorkoutRoute]:
+        levels = [t for t in ROUTE_PYRAMID_TOLERANCES if t <= tolerance]
+        pyramid_path = self.cache_path / "route_pyramid"
+        path = self.cache_path / "routes"
+        if levels and route_pyramid_path(pyramid_path, levels[-1]).exists():
+            path = route_pyramid_path(pyramid_path, levels[-1])
+        route_df = self._read(workout_id, path=path, columns=_with_coordinates(columns))
+        route_df = route_df.iloc[
+            simplify_polyline(route_df["lon"], route_df["lat"], tolerance)
+        ].reset_index(drop=True)
+        return route_df if columns is None else route_df[columns]
+
+    def routes(self, max_resident: int = 32) -> List[LazyWorkoutRoute]:
+        """
+        Lazy handles to all workout routes.
+
+        Only routes_meta is read, the points of a route are read when they are
+        first used and at most ``max_resident`` routes are kept in memory at once
+        (see ``RouteCache``). Start and end time, bounds, number of points and
+        distance come from routes_meta. Routes that failed to parse are skipped.
+        """
         logger.info("Reading routes")
-        routes = []
-        for row in self.routes_meta().itertuples():
-            route_df = self.route(row.workout_uuid)
-            route = WorkoutRoute(
-                route_df=route_df, uuid=row.workout_uuid, gpx_path=row.path
+        route_cache = RouteCache(self.route, max_routes=max_resident)
+        routes_meta = self.routes_meta(written=True)
+        if "workout_uuid" not in routes_meta:
+            return []
+        summary_columns = [c for c in ROUTE_SUMMARY_COLUMNS if c in routes_meta]
+        return [
+            LazyWorkoutRoute(
+                uuid=row["workout_uuid"],
+                gpx_path=row["path"],
+                summary={column: row[column] for column in summary_columns},
+                route_cache=route_cache,
+            )
+            for row in routes_meta.to_dict("records")
+        ]
+
+    def route_grid(self) -> RouteGridIndex:
+        """The grid index over the points of all routes, see ``RouteGridIndex``."""
+        return RouteGridIndex.load(self.cache_path, cache_format=self.cache_format)
+
+    def _route_points_in(
+        self, candidates: pd.DataFrame, inside, columns: List[str] | None
+    ) -> Dict[str, pd.DataFrame]:
+        routes = {}
+        for workout_uuid, ranges in candidates.groupby("workout_uuid", sort=True):
+            route_df = self.route(workout_uuid, columns=columns)
+            rows = np.unique(
+                np.concatenate(
+                    [np.arange(r.start, r.stop) for r in ranges.itertuples()]
+                )
             )
-            routes.append(route)
+            points = route_df.iloc[rows]
+            points = points[inside(points["lon"].to_numpy(), points["lat"].to_numpy())]
+            if len(points):
+                routes[workout_uuid] = points
         return routes
 
+    def routes_in_bbox(
+        self,
+        min_lon: float,
+        min_lat: float,
+        max_lon: float,
+        max_lat: float,
+        columns: List[str] | None = None,
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        The points of all routes that lie within a bounding box.
+
+        Only the routes that have points in a grid cell overlapping the box are
+        read (see ``RouteGridIndex``).
+
+        Parameters
+        ----------
+        min_lon, min_lat, max_lon, max_lat : float
+            The bounding box in degrees.
+        columns : List[str] | None, optional
+            Route columns to read, ``lon`` and ``lat`` are always read, by default
+            all columns
+
+        Returns
+        -------
+        Dict[str, pd.DataFrame]
+            The points inside the box by workout uuid, routes without points inside
+            are left out.
+        """
+        candidates = self.route_grid().in_bbox(min_lon, min_lat, max_lon, max_lat)
+        return self._route_points_in(
+            candidates,
+            lambda lon, lat: (lon >= min_lon)
+            & (lon <= max_lon)
+            & (lat >= min_lat)
+            & (lat <= max_lat),
+            columns=_with_coordinates(columns),
+        )
+
+    def routes_near(
+        self,
+        lon: float,
+        lat: float,
+        radius: float,
+        columns: List[str] | None = None,
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        The points of all routes within ``radius`` meters of a location.
+
+        Like ``routes_in_bbox``, only routes with points in grid cells around the
+        location are read.
+        """
+        lat_delta = np.degrees(radius / EARTH_RADIUS)
+        lon_delta = lat_delta / max(np.cos(np.radians(lat)), 1e-12)
+        candidates = self.route_grid().in_bbox(
+            lon - lon_delta, lat - lat_delta, lon + lon_delta, lat + lat_delta
+        )
+        return self._route_points_in(
+            candidates,
+            lambda lons, lats: haversine(lon, lat, lons, lats) <= radius,
+            columns=_with_coordinates(columns),
+        )
+
     def workout_metadata_entry(self, workout_id: str):
         logger.debug(f"Reading workout metadata entry for workout {workout_id}")
-        return pd.read_csv(
-            self.cache_path / "workout_metadata_entry" / f"{workout_id}.csv"
-        )
+        return self._read(workout_id, path=self.cache_path / "workout_metadata_entries")
 
     def workout_statistics(self, workout_id: str):
         logger.debug(f"Reading workout statistics for workout {workout_id}")
-        return pd.read_csv(self.cache_path / "workout_statistics" / f"{workout_id}.csv")
+        return self._read(workout_id, path=self.cache_path / "workout_statistics")
 
     def records(self):
         logger.info("Reading records")
         records = []
-        for file in os.listdir(self.cache_path / "records"):
-            logger.debug(f"Reading record {file}")
-            records.append(pd.read_csv(self.cache_path / "records" / file))
+        for record_type in self.record_types:
+            logger.debug(f"Reading record {record_type}")
+            records.append(self.record(record_type))
         return records
 
-    def record(self, record_type: str):
+    def record_store(self) -> RecordStore:
+        """
+        Lazy, memory-mapped access to the records of every type.
+
+        The store is written by ``WatchManager.reload_data(record_store=True)``.
+        """
+        return RecordStore(self.cache_path / "record_store")
+
+    def route_index(self, **kwargs) -> "RouteSimilarityIndex":
+        """
+        The route similarity index of the cache, see ``RouteSimilarityIndex``.
+
+        The index is updated by ``WatchManager.reload_data(route_index=True)``,
+        keyword arguments are passed to ``RouteSimilarityIndex``.
+        """
+        from watchml.ml import RouteSimilarityIndex
+
+        return RouteSimilarityIndex(self.cache_path, **kwargs)
+
+    def route_heatmap(self, **kwargs) -> "RouteHeatmap":
+        """
+        A heatmap of the points of all routes, see ``RouteHeatmap.from_reader``.
+
+        Keyword arguments are passed to ``RouteHeatmap.from_reader``.
+        """
+        from watchml.viz import RouteHeatmap
+
+        return RouteHeatmap.from_reader(self, **kwargs)
+
+    def record(
+        self,
+        record_type: str,
+        columns: List[str] | None = None,
+        years: List[int] | None = None,
+    ):
+        """
+        Reads the records of a type as a typed table (see ``compact_record_dtypes``).
+
+        Parameters
+        ----------
+        record_type : str
+            The record type, e.g. HKQuantityTypeIdentifierHeartRate.
+        columns : List[str] | None, optional
+            Only read these columns, by default all columns are read.
+        years : List[int] | None, optional
+            Only read records that started in these years. Partitions of other
+            years are skipped without being opened, by default all years.
+        """
         logger.debug(f"Reading record {record_type}")
-        return pd.read_csv(self.cache_path / "records" / f"{record_type}.csv")
+        files = partition_files(
+            self.cache_path / "records",
+            record_type,
+            cache_format=self.cache_format,
+            years=years,
+        )
+        if not files:
+            return pd.DataFrame(columns=columns or RECORD_COLUMNS)
+        records = pd.concat(
+            [
+                self._read(file.stem, path=file.parent, columns=columns)
+                for file in files
+            ],
+            ignore_index=True,
+        )
+        return compact_record_dtypes(records, inplace=True)
+
+    def query(
+        self,
+        record_type: str,
+        start: str | pd.Timestamp | None = None,
+        end: str | pd.Timestamp | None = None,
+        sources: List[str] | None = None,
+        devices: List[str] | None = None,
+        columns: List[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Reads the records of a type that started within a time window.
+
+        Only the year partitions overlapping the window are listed and, within
+        them, only the blocks whose start date range overlaps the window are
+        read, so the amount of data read scales with the window and not with the
+        whole history.
+
+        Parameters
+        ----------
+        record_type : str
+            The record type, e.g. HKQuantityTypeIdentifierHeartRate.
+        start : str | pd.Timestamp | None, optional
+            Inclusive start of the window, naive times are taken as UTC, by
+            default unbounded.
+        end : str | pd.Timestamp | None, optional
+            Exclusive end of the window, naive times are taken as UTC, by default
+            unbounded.
+        sources : List[str] | None, optional
+            Only keep records with one of these source names, by default all.
+        devices : List[str] | None, optional
+            Only keep records whose device description contains one of these
+            strings (e.g. "Apple Watch"), by default all.
+        columns : List[str] | None, optional
+            Only return these columns, by default all columns.
+
+        Returns
+        -------
+        pd.DataFrame
+            The matching records, ordered by start date.
+        """
+        chunks = list(
+            self._query_chunks(
+                record_type, start, end, sources, devices, columns, chunk_rows=None
+            )
+        )
+        if not chunks:
+            return pd.DataFrame(columns=columns or RECORD_COLUMNS)
+
+        records = _concat_records(chunks)
+        order = records["startDate"].argsort(kind="stable")
+        records = records.iloc[order].reset_index(drop=True)
+        return records[columns] if columns is not None else records
+
+    def iter_query(
+        self,
+        record_type: str,
+        start: str | pd.Timestamp | None = None,
+        end: str | pd.Timestamp | None = None,
+        sources: List[str] | None = None,
+        devices: List[str] | None = None,
+        columns: List[str] | None = None,
+        chunk_rows: int | None = 500_000,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Reads the records of ``query`` in chunks, to process them with bounded memory.
+
+        Chunks hold the blocks of one part file, batched to about ``chunk_rows``
+        rows. They are ordered by year but, unlike ``query``, their rows are not
+        sorted by start date. See ``query`` for the other parameters.
+
+        Parameters
+        ----------
+        chunk_rows : int | None, optional
+            Number of rows to read at once. Part files written without a block
+            index are always read at once. ``None`` reads every part file at
+            once, by default 500_000.
+
+        Yields
+        ------
+        pd.DataFrame
+            The matching records of a chunk.
+        """
+        for records in self._query_chunks(
+            record_type, start, end, sources, devices, columns, chunk_rows
+        ):
+            if len(records):
+                yield records[columns] if columns is not None else records
+
+    def _query_chunks(
+        self,
+        record_type: str,
+        start: str | pd.Timestamp | None,
+        end: str | pd.Timestamp | None,
+        sources: List[str] | None,
+        devices: List[str] | None,
+        columns: List[str] | None,
+        chunk_rows: int | None,
+    ) -> Iterator[pd.DataFrame]:
+        start = _utc_timestamp(start)
+        end = _utc_timestamp(end)
+        years = None
+        if start is not None or end is not None:
+            # Partitions use the UTC year of the start date, the end is exclusive
+            years = [
+                year
+                for year in self.record_years(record_type)
+                if (start is None or year >= start.year)
+                and (end is None or year <= (end - pd.Timedelta(1)).year)
+            ]
+
+        read_columns = None
+        if columns is not None:
+            filter_columns = ["startDate"]
+            filter_columns += ["sourceName"] if sources is not None else []
+            filter_columns += ["device"] if devices is not None else []
+            read_columns = list(dict.fromkeys(columns + filter_columns))
+
+        # resolved once, not per block batch
+        cache_format = self.cache_format
+        for part_file in partition_files(
+            self.cache_path / "records",
+            record_type,
+            cache_format=cache_format,
+            years=years,
+        ):
+            blocks = read_block_index(part_file)
+            if blocks is None:
+                chunks = [
+                    self._read(
+                        part_file.stem, path=part_file.parent, columns=read_columns
+                    )
+                ]
+            else:
+                blocks = [
+                    block
+                    for block in blocks
+                    if (start is None or pd.Timestamp(block["max_start"]) >= start)
+                    and (end is None or pd.Timestamp(block["min_start"]) < end)
+                ]
+                chunks = (
+                    read_blocks(part_file, batch, cache_format, read_columns)
+                    for batch in _block_batches(blocks, chunk_rows)
+                )
+            for records in chunks:
+                records = compact_record_dtypes(records, inplace=True)
+                yield _filter_records(records, start, end, sources, devices)
+
+    def resample(
+        self,
+        record_type: str,
+        bucket: str | pd.Timedelta,
+        statistics: List[str] | None = None,
+        start: str | pd.Timestamp | None = None,
+        end: str | pd.Timestamp | None = None,
+        sources: List[str] | None = None,
+        devices: List[str] | None = None,
+        tz: str | None = None,
+        fill: bool = True,
+        chunk_rows: int | None = 500_000,
+    ) -> pd.DataFrame:
+        """
+        Aggregates the values of a record type per time bucket.
+
+        The records are read chunk by chunk (see ``iter_query``) and reduced to
+        one entry per bucket, records spanning several buckets are split (see
+        ``RecordBuckets``).
+
+        Parameters
+        ----------
+        record_type : str
+            The record type, e.g. HKQuantityTypeIdentifierStepCount.
+        bucket : str | pd.Timedelta
+            Size of the buckets, e.g. "1min", "1h" or "1D".
+        statistics : List[str] | None, optional
+            Any of sum, mean, min, max and count, by default all of them.
+        tz : str | None, optional
+            Timezone whose wall-clock time the buckets are aligned to, by default
+            UTC.
+        fill : bool, optional
+            Include empty buckets between the first and the last one, by default
+            True
+
+        See ``query`` for the other parameters.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per bucket, indexed by the start of the bucket.
+        """
+        logger.debug(f"Resampling record {record_type} to {bucket} buckets")
+        buckets = RecordBuckets(bucket, tz=tz)
+        for records in self.iter_query(
+            record_type,
+            start=start,
+            end=end,
+            sources=sources,
+            devices=devices,
+            columns=["startDate", "endDate", "value"],
+            chunk_rows=chunk_rows,
+        ):
+            buckets.add_records(records)
+        return buckets.to_frame(statistics, fill=fill)
+
+
+def _block_batches(blocks: List[dict], chunk_rows: int | None) -> Iterator[List[dict]]:
+    """Consecutive blocks of about ``chunk_rows`` rows, all blocks if it is None."""
+    batch, rows = [], 0
+    for block in blocks:
+        batch.append(block)
+        rows += block["rows"]
+        if chunk_rows is not None and rows >= chunk_rows:
+            yield batch
+            batch, rows = [], 0
+    if batch:
+        yield batch
+
+
+def _concat_records(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenates compacted record chunks, keeping their categorical columns.
+
+    Every chunk is compacted on its own and has its own categories, which
+    ``pd.concat`` would turn back into plain columns.
+    """
+    if len(chunks) > 1:
+        for column in chunks[0].columns:
+            dtypes = [chunk[column].dtype for chunk in chunks]
+            if any(dtype != "category" for dtype in dtypes):
+                continue
+            if len({dtype.categories.dtype for dtype in dtypes}) == 1:
+                categories = union_categoricals(
+                    [chunk[column] for chunk in chunks]
+                ).categories
+                chunks = [
+                    chunk.assign(
+                        **{column: chunk[column].cat.set_categories(categories)}
+                    )
+                    for chunk in chunks
+                ]
+            else:
+                # e.g. source versions that are only numbers in some years
+                chunks = [
+                    chunk.assign(**{column: chunk[column].astype(object)})
+                    for chunk in chunks
+                ]
+    records = pd.concat(chunks, ignore_index=True)
+    # columns that were compacted differently per chunk (e.g. a value column that
+    # is only numeric in some years) are converted once more
+    return compact_record_dtypes(records, inplace=True)
+
+
+def _filter_records(
+    records: pd.DataFrame,
+    start: pd.Timestamp | None,
+    end: pd.Timestamp | None,
+    sources: List[str] | None,
+    devices: List[str] | None,
+) -> pd.DataFrame:
+    start_dates = records["startDate"]
+    mask = pd.Series(True, index=records.index)
+    if start is not None:
+        mask &= start_dates >= start
+    if end is not None:
+        mask &= start_dates < end
+    if sources is not None:
+        mask &= records["sourceName"].isin(sources)
+    if devices is not None:
+        device = records["device"].astype(str)
+        matches_device = pd.Series(False, index=records.index)
+        for d in devices:
+            matches_device |= device.str.contains(d, regex=False)
+        mask &= matches_device
+    return records.loc[mask]
+
+
+def _utc_timestamp(time: str | pd.Timestamp | None) -> pd.Timestamp | None:
+    if time is None:
+        return None
+    time = pd.Timestamp(time)
+    return time.tz_localize("UTC") if time.tzinfo is None else time.tz_convert("UTC")
+
+
+def _with_coordinates(columns: List[str] | None) -> List[str] | None:
+    if columns is None:
+        return None
+    return ["lon", "lat", *[c for c in columns if c not in ("lon", "lat")]]
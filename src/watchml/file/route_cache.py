@@ -0,0 +1,98 @@
+from collections import OrderedDict
+from typing import Callable
+from typing import Tuple
+
+import pandas as pd
+from watchml.data import WorkoutRoute
+
+
+class RouteCache:
+    """Keeps the points of the most recently used routes in memory.
+
+    Routes are read with ``load_route`` on first access. Once more than
+    ``max_routes`` routes are resident, the least recently used one is dropped.
+    """
+
+    def __init__(
+        self, load_route: Callable[[str], pd.DataFrame], max_routes: int = 32
+    ) -> None:
+        self.load_route = load_route
+        self.max_routes = max_routes
+        self._routes: OrderedDict[str, pd.DataFrame] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def __contains__(self, workout_uuid: str) -> bool:
+        return workout_uuid in self._routes
+
+    def get(self, workout_uuid: str) -> pd.DataFrame:
+        if workout_uuid in self._routes:
+            self._routes.move_to_end(workout_uuid)
+            return self._routes[workout_uuid]
+
+        route_df = self.load_route(workout_uuid)
+        self._routes[workout_uuid] = route_df
+        while len(self._routes) > self.max_routes:
+            self._routes.popitem(last=False)
+        return route_df
+
+
+class LazyWorkoutRoute(WorkoutRoute):
+    """A WorkoutRoute whose points are only read when they are used.
+
+    The summary written to routes_meta at cache time (see ``route_summary``)
+    answers ``start_time``, ``end_time``, ``bounds``, ``n_points`` and ``distance``
+    without reading the points. The points are held by a shared ``RouteCache``.
+    """
+
+    def __init__(
+        self, uuid: str, gpx_path: str, summary: dict, route_cache: RouteCache
+    ) -> None:
+        self.uuid = uuid
+        self.gpx_path = gpx_path
+        self.summary = summary
+        self.route_cache = route_cache
+
+    @property
+    def route_df(self) -> pd.DataFrame:
+        return self.route_cache.get(self.uuid)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.uuid in self.route_cache
+
+    def _summary(self, key: str):
+        value = self.summary.get(key)
+        return None if pd.isna(value) else value
+
+    @property
+    def start_time(self):
+        if self._summary("start_time") is None:
+            return super().start_time
+        return pd.Timestamp(self.summary["start_time"])
+
+    @property
+    def end_time(self):
+        if self._summary("end_time") is None:
+            return super().end_time
+        return pd.Timestamp(self.summary["end_time"])
+
+    @property
+    def bounds(self) -> Tuple[float, float, float, float]:
+        keys = ["min_lon", "min_lat", "max_lon", "max_lat"]
+        if any(self._summary(key) is None for key in keys):
+            return super().bounds
+        return tuple(float(self.summary[key]) for key in keys)
+
+    @property
+    def n_points(self) -> int:
+        if self._summary("points") is None:
+            return super().n_points
+        return int(self.summary["points"])
+
+    @property
+    def distance(self) -> float:
+        if self._summary("distance") is None:
+            return super().distance
+        return float(self.summary["distance"])
@@ -0,0 +1,281 @@
+import logging
+import os
+import xml.etree.ElementTree as ET
+from concurrent.futures import as_completed
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+from watchml.utils.geo import path_length
+from watchml.utils.geo import simplification_tolerances
+
+from .file import FileSystemManager
+from .formats import CacheFormat
+from .spatial import route_cells
+
+logger = logging.getLogger(__name__)
+
+GPX_NAMESPACE = {"gpx": "http://www.topografix.com/GPX/1/1"}
+
+GPX_TIME = f"{{{GPX_NAMESPACE['gpx']}}}time"
+GPX_EXTENSIONS = f"{{{GPX_NAMESPACE['gpx']}}}extensions"
+
+# Numeric track point columns and the GPX tags they are read from
+TRACK_POINT_COLUMNS = ["lon", "lat", "elevation", "speed", "course", "hAcc", "vAcc"]
+TRACK_POINT_TAGS = ["lon", "lat", "ele", "speed", "course", "hAcc", "vAcc"]
+TRACK_POINT_COLUMN_INDEX = {
+    f"{{{GPX_NAMESPACE['gpx']}}}{tag}": i for i, tag in enumerate(TRACK_POINT_TAGS)
+}
+LON, LAT = 0, 1
+
+# Douglas-Peucker tolerances in meters of the precomputed route levels
+ROUTE_PYRAMID_TOLERANCES = [2.0, 10.0, 50.0]
+
+# Summary of every route, stored in routes_meta
+ROUTE_SUMMARY_COLUMNS = [
+    "start_time",
+    "end_time",
+    "min_lon",
+    "min_lat",
+    "max_lon",
+    "max_lat",
+    "points",
+    "distance",
+]
+
+# (path to the gpx file, uuid of the workout the route belongs to)
+RouteJob = Tuple[Path, str]
+
+
+@dataclass
+class RouteResult:
+    workout_uuid: str
+    gpx_path: str
+    points: int = 0
+    error: str | None = None
+    cells: pd.DataFrame | None = None
+    summary: dict | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _parse_times(times: np.ndarray) -> pd.Series:
+    try:
+        # GPX times are UTC ISO strings ending in "Z", numpy parses them without the "Z"
+        parsed = np.char.rstrip(times.astype(str), "Z").astype("datetime64[ns]")
+        return pd.Series(parsed).dt.tz_localize("UTC")
+    except ValueError:
+        return pd.Series(pd.to_datetime(times, utc=True))
+
+
+def parse_route(route_root: ET.Element) -> pd.DataFrame:
+    """
+    Extracts all track points of a parsed GPX file.
+
+    All points are collected in a single pass into preallocated arrays. Each
+    point's children are visited once instead of being looked up one by one,
+    missing elements (e.g. points without ``extensions``) become NaN.
+
+    Parameters
+    ----------
+    route_root : ET.Element
+        Root of the GPX file.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per track point with lon, lat, time, elevation, speed, course,
+        hAcc and vAcc columns. Time is a UTC datetime column.
+    """
+    route_points = list(route_root.iter(f"{{{GPX_NAMESPACE['gpx']}}}trkpt"))
+    n_points = len(route_points)
+
+    values = np.full((len(TRACK_POINT_COLUMNS), n_points), np.nan)
+    times = np.full(n_points, "NaT", dtype=object)
+
+    for i, route_point in enumerate(route_points):
+        values[LON, i] = route_point.get("lon", "nan")
+        values[LAT, i] = route_point.get("lat", "nan")
+        for child in route_point:
+            if child.tag == GPX_TIME:
+                times[i] = child.text
+            elif child.tag == GPX_EXTENSIONS:
+                # contains information about speed, course and accuracy
+                for extension in child:
+                    column = TRACK_POINT_COLUMN_INDEX.get(extension.tag)
+                    if column is not None:
+                        values[column, i] = extension.text
+            else:
+                column = TRACK_POINT_COLUMN_INDEX.get(child.tag)
+                if column is not None:
+                    values[column, i] = child.text
+
+    route_df = pd.DataFrame(dict(zip(TRACK_POINT_COLUMNS, values)))
+    route_df.insert(2, "time", _parse_times(times))
+    return route_df
+
+
+def route_summary(route_df: pd.DataFrame) -> dict:
+    """
+    Start and end time, bounds, number of points and length in meters of a route.
+
+    Times are UTC ISO strings, all values are None for a route without points.
+    """
+    if len(route_df) == 0:
+        return {column: None for column in ROUTE_SUMMARY_COLUMNS} | {"points": 0}
+
+    times = route_df["time"]
+    return {
+        "start_time": times.min().isoformat() if times.notna().any() else None,
+        "end_time": times.max().isoformat() if times.notna().any() else None,
+        "min_lon": route_df["lon"].min(),
+        "min_lat": route_df["lat"].min(),
+        "max_lon": route_df["lon"].max(),
+        "max_lat": route_df["lat"].max(),
+        "points": len(route_df),
+        "distance": path_length(route_df["lon"], route_df["lat"]),
+    }
+
+
+def route_pyramid_path(pyramid_path: Path, tolerance: float) -> Path:
+    """Folder of the routes simplified with ``tolerance`` meters."""
+    return pyramid_path / f"{tolerance:g}m"
+
+
+def write_route_pyramid(
+    route_df: pd.DataFrame,
+    workout_uuid: str,
+    pyramid_path: Path,
+    cache_format: CacheFormat,
+    tolerances: List[float] = ROUTE_PYRAMID_TOLERANCES,
+):
+    """
+    Writes simplified versions of a route, one per tolerance.
+
+    Douglas-Peucker runs once for all levels (see ``simplification_tolerances``).
+    """
+    point_tolerances = simplification_tolerances(route_df["lon"], route_df["lat"])
+    for tolerance in tolerances:
+        level_path = route_pyramid_path(pyramid_path, tolerance)
+        level_path.mkdir(parents=True, exist_ok=True)
+        FileSystemManager.to_processed(
+            path=level_path,
+            df=route_df[point_tolerances > tolerance],
+            name=workout_uuid,
+            cache_format=cache_format,
+        )
+
+
+def write_route_file(
+    gpx_path: Path,
+    workout_uuid: str,
+    routes_path: Path,
+    cache_format: CacheFormat,
+    pyramid_path: Path | None = None,
+) -> RouteResult:
+    """
+    Parses a single GPX file and writes its track points to the routes cache.
+
+    Errors are returned as part of the result instead of being raised, so that a
+    single corrupt file doesn't abort writing the other routes. The result also
+    holds the grid cells of the route for the ``RouteGridIndex`` and its
+    ``route_summary``. If a ``pyramid_path`` is given, the simplified levels of the
+    route are written too.
+    """
+    try:
+        route_df = parse_route(ET.parse(gpx_path).getroot())
+        result = RouteResult(
+            workout_uuid=workout_uuid,
+            gpx_path=str(gpx_path),
+            points=len(route_df),
+            cells=route_cells(route_df["lon"], route_df["lat"]),
+            summary=route_summary(route_df),
+        )
+        FileSystemManager.to_processed(
+            path=routes_path,
+            df=route_df,
+            name=workout_uuid,
+            cache_format=cache_format,
+        )
+        if pyramid_path is not None:
+            write_route_pyramid(route_df, workout_uuid, pyramid_path, cache_format)
+    except Exception as e:
+        return RouteResult(
+            workout_uuid=workout_uuid,
+            gpx_path=str(gpx_path),
+            error=f"{type(e).__name__}: {e}",
+        )
+    return result
+
+
+def write_route_files(
+    jobs: List[RouteJob],
+    routes_path: Path,
+    cache_format: CacheFormat = CacheFormat.CSV,
+    workers: int | None = None,
+    pyramid_path: Path | None = None,
+) -> List[RouteResult]:
+    """
+    Writes the routes of many workouts, parsing the GPX files in a process pool.
+
+    Parameters
+    ----------
+    jobs : List[RouteJob]
+        GPX path and workout uuid of every route to write.
+    routes_path : Path
+        Folder the route files are written to.
+    cache_format : CacheFormat, optional
+        Format of the route files, by default CacheFormat.CSV
+    workers : int | None, optional
+        Number of worker processes. ``None`` uses all cpus and ``1`` parses the
+        routes in the current process, by default None
+    pyramid_path : Path | None, optional
+        Folder to write the simplified levels of the routes to (see
+        ``write_route_pyramid``), by default no levels are written
+
+    Returns
+    -------
+    List[RouteResult]
+        One result per job, in the order of the jobs.
+    """
+    workers = workers if workers is not None else os.cpu_count() or 1
+    results: List[RouteResult | None] = [None] * len(jobs)
+
+    if workers <= 1 or len(jobs) <= 1:
+        for i, (gpx_path, workout_uuid) in enumerate(jobs):
+            results[i] = write_route_file(
+                gpx_path, workout_uuid, routes_path, cache_format, pyramid_path
+            )
+            _log_progress(results[i], i + 1, len(jobs))
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                write_route_file,
+                gpx_path,
+                workout_uuid,
+                routes_path,
+                cache_format,
+                pyramid_path,
+            ): i
+            for i, (gpx_path, workout_uuid) in enumerate(jobs)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            results[i] = future.result()
+            _log_progress(results[i], done, len(jobs))
+    return results
+
+
+def _log_progress(result: RouteResult, done: int, total: int):
+    if result.ok:
+        logger.info(f"Wrote route {done}/{total} ({result.gpx_path})")
+    else:
+        logger.error(f"Failed route {done}/{total} ({result.gpx_path}): {result.error}")
@@ -0,0 +1,172 @@
+import json
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from .file import FileSystemManager
+from .formats import CacheFormat
+
+# Side length of a grid cell in degrees, about 1.1 km of latitude
+GRID_CELL_SIZE = 0.01
+GRID_CELL_COLUMNS = ["cell_x", "cell_y", "start", "stop"]
+EARTH_RADIUS = 6_371_000.0
+
+
+def route_cells(
+    lon: np.ndarray, lat: np.ndarray, cell_size: float = GRID_CELL_SIZE
+) -> pd.DataFrame:
+    """
+    Grid cells a route passes through, with the points inside each.
+
+    Consecutive points in the same cell form one run, a route that enters a cell
+    several times has several rows for it.
+
+    Parameters
+    ----------
+    lon : np.ndarray
+        Longitudes of the route points.
+    lat : np.ndarray
+        Latitudes of the route points.
+    cell_size : float, optional
+        Side length of a cell in degrees, by default GRID_CELL_SIZE
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per run with the ``cell_x`` and ``cell_y`` of the cell and the
+        ``start`` and ``stop`` (exclusive) positions of the points in the route.
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    valid = ~(np.isnan(lon) | np.isnan(lat))
+    cell_x = np.floor(np.where(valid, lon, 0) / cell_size).astype(np.int64)
+    cell_y = np.floor(np.where(valid, lat, 0) / cell_size).astype(np.int64)
+
+    # a run ends where the cell changes or an invalid point interrupts it
+    changes = np.flatnonzero(
+        (np.diff(cell_x) != 0) | (np.diff(cell_y) != 0) | (np.diff(valid) != 0)
+    )
+    starts = np.concatenate([[0], changes + 1]) if len(lon) else np.array([], int)
+    stops = np.concatenate([changes + 1, [len(lon)]]) if len(lon) else starts
+    runs = valid[starts]
+    return pd.DataFrame(
+        {
+            "cell_x": cell_x[starts][runs],
+            "cell_y": cell_y[starts][runs],
+            "start": starts[runs],
+            "stop": stops[runs],
+        }
+    )
+
+
+def haversine(lon1, lat1, lon2, lat2) -> np.ndarray:
+    """Great-circle distance in meters."""
+    lon1, lat1, lon2, lat2 = map(np.radians, [lon1, lat1, lon2, lat2])
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+
+def _cell_keys(cell_x: np.ndarray, cell_y: np.ndarray) -> np.ndarray:
+    # sorting by key sorts by cell_x first, the cells of one column are contiguous
+    return (np.asarray(cell_x, dtype=np.int64) << 32) + (
+        np.asarray(cell_y, dtype=np.int64) + 2**31
+    )
+
+
+class RouteGridIndex:
+    """A uniform grid over the points of all cached routes.
+
+    Every row maps a grid cell to a workout uuid and the range of route points in
+    that cell (see ``route_cells``). The rows are sorted by cell, so the rows of
+    the cells of a bounding box are found by binary search.
+    """
+
+    def __init__(self, cells: pd.DataFrame, cell_size: float = GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        keys = _cell_keys(cells["cell_x"], cells["cell_y"])
+        order = np.argsort(keys, kind="stable")
+        self.cells = cells.iloc[order].reset_index(drop=True)
+        self.keys = keys[order]
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    @property
+    def workout_uuids(self) -> List[str]:
+        return sorted(self.cells["workout_uuid"].unique())
+
+    @staticmethod
+    def empty(cell_size: float = GRID_CELL_SIZE) -> "RouteGridIndex":
+        return RouteGridIndex(
+            pd.DataFrame(columns=["workout_uuid", *GRID_CELL_COLUMNS]).astype(
+                {column: np.int64 for column in GRID_CELL_COLUMNS}
+            ),
+            cell_size=cell_size,
+        )
+
+    def updated(
+        self, route_cells: dict, keep_uuids: List[str] | None = None
+    ) -> "RouteGridIndex":
+        """
+        A new index with the cells of the given routes replaced or added.
+
+        Parameters
+        ----------
+        route_cells : dict
+            Cells (see ``route_cells``) of new or rewritten routes by workout uuid.
+        keep_uuids : List[str] | None, optional
+            If given, routes of other workouts are dropped, by default None
+        """
+        cells = self.cells[~self.cells["workout_uuid"].isin(route_cells)]
+        if keep_uuids is not None:
+            cells = cells[cells["workout_uuid"].isin(keep_uuids)]
+        new_cells = [
+            df.assign(workout_uuid=uuid)[["workout_uuid", *GRID_CELL_COLUMNS]]
+            for uuid, df in route_cells.items()
+        ]
+        return RouteGridIndex(
+            pd.concat([cells, *new_cells], ignore_index=True), self.cell_size
+        )
+
+    def in_bbox(
+        self, min_lon: float, min_lat: float, max_lon: float, max_lat: float
+    ) -> pd.DataFrame:
+        """
+        Rows of all cells that overlap the bounding box.
+
+        The points of the returned ranges are candidates, they lie in a cell that
+        overlaps the box but not necessarily in the box itself.
+        """
+        x_min, x_max = np.floor(np.array([min_lon, max_lon]) / self.cell_size)
+        y_min, y_max = np.floor(np.array([min_lat, max_lat]) / self.cell_size)
+        cell_xs = np.arange(int(x_min), int(x_max) + 1)
+        firsts = np.searchsorted(self.keys, _cell_keys(cell_xs, int(y_min)), "left")
+        lasts = np.searchsorted(self.keys, _cell_keys(cell_xs, int(y_max)), "right")
+        rows = [np.arange(first, last) for first, last in zip(firsts, lasts)]
+        return self.cells.iloc[np.concatenate(rows) if rows else []]
+
+    def save(self, cache_path: Path, cache_format: CacheFormat = CacheFormat.CSV):
+        FileSystemManager.to_processed(
+            path=cache_path, df=self.cells, name="route_grid", cache_format=cache_format
+        )
+        with open(cache_path / "route_grid.json", "w") as f:
+            json.dump({"cell_size": self.cell_size}, f)
+
+    @staticmethod
+    def load(
+        cache_path: Path, cache_format: CacheFormat = CacheFormat.CSV
+    ) -> "RouteGridIndex":
+        """Loads the index of a cache, or an empty index if it has none."""
+        if not (cache_path / "route_grid.json").exists():
+            return RouteGridIndex.empty()
+        with open(cache_path / "route_grid.json", "r") as f:
+            cell_size = json.load(f)["cell_size"]
+        cells = FileSystemManager.read_processed(
+            path=cache_path, name="route_grid", cache_format=cache_format
+        )
+        return RouteGridIndex(cells.astype({"workout_uuid": str}), cell_size)
@@ -0,0 +1,95 @@
+import hashlib
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Dict
+from typing import List
+
+import pandas as pd
+
+RECORD_FINGERPRINT_KEYS = [
+    "sourceName",
+    "device",
+    "creationDate",
+    "startDate",
+    "endDate",
+    "value",
+]
+WORKOUT_FINGERPRINT_KEYS = [
+    "workoutActivityType",
+    "sourceName",
+    "creationDate",
+    "startDate",
+    "endDate",
+]
+
+
+@dataclass
+class CacheState:
+    """Bookkeeping stored in cache.json to update the cache incrementally.
+
+    ``record_high_water_marks`` maps each record type to the latest
+    ``creationDate`` and ``startDate`` (UTC, ISO formatted) that were written and
+    the ``boundaryRecords``, fingerprints of the records created at the latest
+    ``creationDate``. Creation dates only have a resolution of seconds, records
+    created later within the same second are told apart by their fingerprint.
+    ``workout_fingerprints`` maps a fingerprint of each written workout to the
+    uuid its files were written under.
+    """
+
+    record_high_water_marks: Dict[str, dict] = field(default_factory=dict)
+    workout_fingerprints: Dict[str, str] = field(default_factory=dict)
+
+    @staticmethod
+    def from_dict(content: dict) -> "CacheState":
+        return CacheState(
+            record_high_water_marks=content.get("record_high_water_marks", {}),
+            workout_fingerprints=content.get("workout_fingerprints", {}),
+        )
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.record_high_water_marks and not self.workout_fingerprints
+
+
+def workout_fingerprint(workout_attrib: dict) -> str:
+    """
+    Fingerprint identifying a workout across exports.
+
+    Parameters
+    ----------
+    workout_attrib : dict
+        Attributes of a ``Workout`` element as found in Export.xml.
+
+    Returns
+    -------
+    str
+        Hex digest of the attributes that don't change between exports.
+    """
+    key = "|".join(workout_attrib.get(k, "") for k in WORKOUT_FINGERPRINT_KEYS)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def record_fingerprints(record_df: pd.DataFrame) -> List[str]:
+    """
+    Fingerprints identifying records across exports.
+
+    Parameters
+    ----------
+    record_df : pd.DataFrame
+        Records with the attributes of ``Record`` elements as found in Export.xml.
+
+    Returns
+    -------
+    List[str]
+        Hex digest of the attributes of each record.
+    """
+    keys = record_df.reindex(columns=RECORD_FINGERPRINT_KEYS).astype(object)
+    keys = keys.where(keys.notna(), "")
+    return [
+        hashlib.sha1("|".join(map(str, row)).encode("utf-8")).hexdigest()
+        for row in keys.itertuples(index=False)
+    ]
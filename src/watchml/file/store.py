@@ -0,0 +1,188 @@
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from .formats import compact_record_dtypes
+from .formats import RECORD_COLUMNS
+from .formats import RECORD_DATE_COLUMNS
+
+STORE_META = "meta.json"
+
+
+def write_record_type_store(
+    store_path: Path, record_type: str, record_df: pd.DataFrame
+):
+    """
+    Writes the records of one type as memory-mappable column arrays.
+
+    Every column is stored as a ``.npy`` file in ``store_path/<record_type>``: dates
+    as UTC ``datetime64[ns]``, numeric values as ``float64`` and categoricals as
+    ``int32`` codes whose categories are kept in ``meta.json``. Rows are sorted by
+    start date.
+
+    Parameters
+    ----------
+    store_path : Path
+        Folder of the record store.
+    record_type : str
+        The record type.
+    record_df : pd.DataFrame
+        All records of the type.
+    """
+    record_df = compact_record_dtypes(record_df.reindex(columns=RECORD_COLUMNS))
+    record_df = record_df.sort_values("startDate", kind="stable")
+
+    tmp_path = store_path / f".{record_type}.tmp"
+    if tmp_path.exists():
+        shutil.rmtree(tmp_path)
+    tmp_path.mkdir(parents=True)
+
+    columns = {}
+    for column in RECORD_COLUMNS:
+        series = record_df[column]
+        if column in RECORD_DATE_COLUMNS:
+            values = series.dt.tz_localize(None).to_numpy(dtype="datetime64[ns]")
+            columns[column] = {"kind": "datetime"}
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            values = series.cat.codes.to_numpy(dtype=np.int32)
+            columns[column] = {
+                "kind": "category",
+                "categories": [str(c) for c in series.cat.categories],
+            }
+        else:
+            values = series.to_numpy(dtype=np.float64)
+            columns[column] = {"kind": "float"}
+        np.save(tmp_path / f"{column}.npy", values)
+
+    with open(tmp_path / STORE_META, "w") as f:
+        json.dump({"rows": len(record_df), "columns": columns}, f)
+
+    type_path = store_path / record_type
+    if type_path.exists():
+        shutil.rmtree(type_path)
+    os.replace(tmp_path, type_path)
+
+
+class RecordColumns:
+    """Memory-mapped columns of one record type.
+
+    Nothing is read until a column is accessed, and then only the pages that are
+    touched are loaded by the OS. Since the files are mapped read-only, several
+    processes reading the same store share the page cache. Slicing returns a
+    pandas DataFrame of just the selected rows.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path / STORE_META, "r") as f:
+            self.meta = json.load(f)
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.meta["rows"]
+
+    def __repr__(self) -> str:
+        return f"RecordColumns({self.path.name}, rows={len(self)})"
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.meta["columns"])
+
+    def array(self, column: str) -> np.ndarray:
+        """The raw memory-mapped array of a column (codes for categoricals)."""
+        if column not in self._arrays:
+            self._arrays[column] = np.load(self.path / f"{column}.npy", mmap_mode="r")
+        return self._arrays[column]
+
+    def _materialize(self, column: str, rows: slice | np.ndarray) -> pd.Series:
+        values = np.asarray(self.array(column)[rows])
+        column_meta = self.meta["columns"][column]
+        if column_meta["kind"] == "datetime":
+            return pd.Series(values).dt.tz_localize("UTC")
+        if column_meta["kind"] == "category":
+            return pd.Series(
+                pd.Categorical.from_codes(values, column_meta["categories"])
+            )
+        return pd.Series(values)
+
+    def to_pandas(
+        self, rows: slice | np.ndarray = slice(None), columns: List[str] | None = None
+    ) -> pd.DataFrame:
+        """
+        Materializes the given rows and columns as a DataFrame.
+
+        Parameters
+        ----------
+        rows : slice | np.ndarray, optional
+            Rows to materialize, by default all rows.
+        columns : List[str] | None, optional
+            Columns to materialize, by default all columns.
+        """
+        columns = columns if columns is not None else self.columns
+        return pd.DataFrame(
+            {column: self._materialize(column, rows) for column in columns}
+        )
+
+    def __getitem__(self, rows: slice | np.ndarray) -> pd.DataFrame:
+        return self.to_pandas(rows)
+
+    def between(
+        self,
+        start: pd.Timestamp | str | None = None,
+        end: pd.Timestamp | str | None = None,
+        columns: List[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Materializes the records that started within ``[start, end)``.
+
+        The rows are found by binary search on the sorted start dates, so only
+        the pages of the selected rows are read.
+        """
+        start_dates = self.array("startDate")
+        first = 0 if start is None else _search(start_dates, start)
+        last = len(self) if end is None else _search(start_dates, end)
+        return self.to_pandas(slice(first, last), columns=columns)
+
+
+def _search(start_dates: np.ndarray, time: pd.Timestamp | str) -> int:
+    time = pd.Timestamp(time)
+    time = time.tz_convert("UTC").tz_localize(None) if time.tzinfo else time
+    return int(np.searchsorted(start_dates, np.datetime64(time, "ns"), side="left"))
+
+
+class RecordStore:
+    """Lazy, memory-mapped access to all record types of a cache.
+
+    Opening the store only lists the record types, the columns of a type are
+    mapped on first access.
+    """
+
+    def __init__(self, store_path: Path | str):
+        self.store_path = Path(store_path)
+        self._types: Dict[str, RecordColumns] = {}
+
+    @property
+    def record_types(self) -> List[str]:
+        if not self.store_path.exists():
+            return []
+        return sorted(
+            name
+            for name in os.listdir(self.store_path)
+            if (self.store_path / name / STORE_META).exists()
+        )
+
+    def __contains__(self, record_type: str) -> bool:
+        return (self.store_path / record_type / STORE_META).exists()
+
+    def __getitem__(self, record_type: str) -> RecordColumns:
+        if record_type not in self._types:
+            if record_type not in self:
+                raise KeyError(f"Record type {record_type} not found in record store")
+            self._types[record_type] = RecordColumns(self.store_path / record_type)
+        return self._types[record_type]
@@ -1,18 +1,298 @@
+import logging
+import os
+import shutil
 import xml.etree.ElementTree as ET
 from pathlib import Path
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Tuple
 from uuid import uuid4
 
 import pandas as pd
 
+from .ecgs import ECGCache
+from .ecgs import write_ecg_cache
 from .file import FileSystemManager
+from .formats import CacheFormat
+from .formats import coerce_record_dtypes
+from .formats import compact_record_dtypes
+from .formats import format_hk_dates
+from .formats import format_hk_values
+from .formats import offset_column
+from .formats import parse_hk_dates
+from .formats import RECORD_COLUMNS
+from .formats import RECORD_DATE_COLUMNS
+from .formats import record_schema
+from .partitions import partition_files
+from .partitions import partitioned_record_types
+from .partitions import record_partition_path
+from .partitions import write_block_index
+from .reader import ECGReader
+from .routes import ROUTE_SUMMARY_COLUMNS
+from .routes import RouteResult
+from .routes import write_route_files
+from .spatial import RouteGridIndex
+from .state import CacheState
+from .state import record_fingerprints
+from .state import workout_fingerprint
+from .store import write_record_type_store
+
+logger = logging.getLogger(__name__)
 
 WorkoutElement = ET.Element
 
 
+class RecordChunkWriter:
+    """Buffers records and appends them to the partitioned record dataset in chunks.
+
+    Records are written to ``records/type=<type>/year=<year>/part-<n>`` files. Each
+    chunk is grouped by type and year once and every partition is appended in the
+    same pass. Every run starts a new part per partition, so a partition is never
+    rewritten.
+
+    Parquet files can't be appended to once closed, so their writers stay open
+    while records arrive. At most ``max_open_files`` are open at once, the least
+    recently appended one is closed and its partition continues in a new part.
+
+    Every appended chunk is a block sorted by ``startDate``. The row or byte range
+    and the ``startDate`` range of each block are written to a sidecar index next
+    to the part file, which lets readers skip blocks outside a time window.
+    """
+
+    def __init__(
+        self,
+        cache_path: Path,
+        chunk_size: int = 100_000,
+        cache_format: CacheFormat = CacheFormat.CSV,
+        high_water_marks: Dict[str, dict] | None = None,
+        max_open_files: int = 64,
+    ):
+        self.records_path = cache_path / "records"
+        self.chunk_size = chunk_size
+        self.cache_format = cache_format
+        self.max_open_files = max_open_files
+        self.buffer: List[dict] = []
+        # Part file of each partition written in this run
+        self.part_files: Dict[Tuple[str, str], Path] = {}
+        # Open parquet writers per file, the least recently appended one first
+        self.parquet_writers = {}
+        # Blocks appended to each part file, written to its sidecar index on close
+        self.block_indexes: Dict[Path, List[dict]] = {}
+        # Records created up to these marks are already in the cache and are skipped
+        self.previous_high_water_marks = dict(high_water_marks or {})
+        self.high_water_marks = dict(high_water_marks or {})
+
+    def reset(self):
+        """Removes record files of a previous run."""
+        if self.records_path.exists():
+            shutil.rmtree(self.records_path)
+        self.records_path.mkdir(parents=True)
+
+    def add(self, record_attrib: dict):
+        self.buffer.append(record_attrib)
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def _part_file(self, record_type: str, year: str) -> Path:
+        if (record_type, year) not in self.part_files:
+            partition_path = record_partition_path(self.records_path, record_type, year)
+            partition_path.mkdir(parents=True, exist_ok=True)
+            part = len(
+                [
+                    name
+                    for name in os.listdir(partition_path)
+                    if name.endswith(self.cache_format.suffix)
+                ]
+            )
+            self.part_files[(record_type, year)] = FileSystemManager.processed_path(
+                partition_path, f"part-{part:05d}", self.cache_format
+            )
+        return self.part_files[(record_type, year)]
+
+    def _append(
+        self,
+        path: Path,
+        df: pd.DataFrame,
+        record_type: str,
+        start_dates: pd.Series,
+    ):
+        blocks = self.block_indexes.setdefault(path, [])
+        block = {
+            "rows": len(df),
+            "min_start": start_dates.min().isoformat(),
+            "max_start": start_dates.max().isoformat(),
+        }
+
+        if self.cache_format == CacheFormat.PARQUET:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            schema = record_schema(record_type)
+            table = pa.Table.from_pandas(
+                coerce_record_dtypes(df[RECORD_COLUMNS], record_type),
+                schema=schema,
+                preserve_index=False,
+            )
+            parquet_writer = self.parquet_writers.pop(path, None)
+            if parquet_writer is None:
+                while len(self.parquet_writers) >= self.max_open_files:
+                    self._close_file(next(iter(self.parquet_writers)))
+                parquet_writer = pq.ParquetWriter(path, schema, compression="zstd")
+            self.parquet_writers[path] = parquet_writer
+            # One row group per block, so blocks can be read by row group index
+            parquet_writer.write_table(table, row_group_size=len(df))
+            block["row_group"] = len(blocks)
+        else:
+            # typed tables are written as the attribute strings of the export
+            df = df.assign(
+                value=format_hk_values(df["value"]),
+                **{
+                    column: format_hk_dates(df[column], df.get(offset_column(column)))
+                    for column in RECORD_DATE_COLUMNS
+                },
+            )[RECORD_COLUMNS]
+            if not path.exists():
+                df.head(0).to_csv(path, index=False)
+            block["offset"] = path.stat().st_size
+            df.to_csv(path, mode="a", header=False, index=False)
+            block["length"] = path.stat().st_size - block["offset"]
+
+        blocks.append(block)
+
+    def _new_records(
+        self, record_type: str, record_df: pd.DataFrame, start_dates: pd.Series
+    ) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        Drops records that are already cached and advances the high-water marks.
+
+        Records created in the second of the previous mark are only dropped if
+        their fingerprint is one of the mark's ``boundaryRecords``.
+
+        Returns the new records and their start dates.
+        """
+        creation_dates = parse_hk_dates(record_df["creationDate"]).fillna(start_dates)
+
+        previous = self.previous_high_water_marks.get(record_type)
+        if previous is not None:
+            previous_creation = pd.Timestamp(previous["creationDate"])
+            is_new = creation_dates > previous_creation
+            at_mark = creation_dates == previous_creation
+            # marks written without boundary records count the whole second as cached
+            if "boundaryRecords" in previous and at_mark.any():
+                cached = set(previous["boundaryRecords"])
+                is_new[at_mark] = [
+                    fingerprint not in cached
+                    for fingerprint in record_fingerprints(record_df.loc[at_mark])
+                ]
+            record_df = record_df.loc[is_new]
+            start_dates = start_dates.loc[is_new]
+            creation_dates = creation_dates.loc[is_new]
+
+        if record_df.empty:
+            return record_df, start_dates
+
+        latest_creation, latest_start = creation_dates.max(), start_dates.max()
+        boundary = record_fingerprints(record_df.loc[creation_dates == latest_creation])
+        marks = self.high_water_marks.get(record_type)
+        if marks is not None:
+            marked_creation = pd.Timestamp(marks["creationDate"])
+            if marked_creation > latest_creation:
+                latest_creation, boundary = marked_creation, marks.get(
+                    "boundaryRecords"
+                )
+            elif marked_creation == latest_creation and "boundaryRecords" in marks:
+                boundary = marks["boundaryRecords"] + boundary
+            elif marked_creation == latest_creation:
+                boundary = None
+            latest_start = max(latest_start, pd.Timestamp(marks["startDate"]))
+        self.high_water_marks[record_type] = {
+            "creationDate": latest_creation.isoformat(),
+            "startDate": latest_start.isoformat(),
+        }
+        if boundary is not None:
+            self.high_water_marks[record_type]["boundaryRecords"] = boundary
+        return record_df, start_dates
+
+    def write(self, record_df: pd.DataFrame):
+        """
+        Appends every type and year partition of a record table in a single pass.
+
+        The table may hold attribute strings or be typed by ``compact_record_dtypes``.
+        CSV files keep the local time of the dates if the typed table kept their
+        offsets (``keep_offsets``). Partitions use the UTC year of the start date.
+        """
+        offset_columns = [
+            offset_column(column)
+            for column in RECORD_DATE_COLUMNS
+            if offset_column(column) in record_df
+        ]
+        record_df = record_df.reindex(columns=RECORD_COLUMNS + offset_columns)
+        start_dates = parse_hk_dates(record_df["startDate"])
+        years = start_dates.dt.year.rename("year")
+        for (record_type, year), partition_df in record_df.groupby(
+            [record_df["type"], years], sort=False, observed=True
+        ):
+            partition_df, partition_start_dates = self._new_records(
+                record_type, partition_df, start_dates.loc[partition_df.index]
+            )
+            if partition_df.empty:
+                continue
+            order = partition_start_dates.argsort(kind="stable")
+            self._append(
+                self._part_file(record_type, year),
+                partition_df.iloc[order],
+                record_type,
+                partition_start_dates.iloc[order],
+            )
+
+    def flush(self):
+        if self.buffer:
+            self.write(pd.DataFrame(self.buffer))
+        self.buffer = []
+
+    def _close_file(self, path: Path):
+        """Finalizes a part file, later records of its partition go to a new part."""
+        parquet_writer = self.parquet_writers.pop(path, None)
+        if parquet_writer is not None:
+            parquet_writer.close()
+        write_block_index(path, self.block_indexes.pop(path))
+        self.part_files = {
+            partition: part_file
+            for partition, part_file in self.part_files.items()
+            if part_file != path
+        }
+
+    def close(self, flush: bool = True):
+        """
+        Finalizes all open files.
+
+        Parameters
+        ----------
+        flush : bool, optional
+            Write the buffered records first. Without it they are dropped, e.g. if
+            the stream of records failed, by default True
+        """
+        if flush:
+            self.flush()
+        self.buffer = []
+        for path in list(self.block_indexes):
+            self._close_file(path)
+
+
 class WatchWriter:
-    def __init__(self, data_path: str | Path, cache_path: str | Path | None = None):
+    def __init__(
+        self,
+        data_path: str | Path,
+        cache_path: str | Path | None = None,
+        cache_format: CacheFormat = CacheFormat.CSV,
+        route_workers: int | None = None,
+    ):
         self.data_path = Path(data_path)
         self.cache_path = Path(cache_path) if cache_path else Path(data_path) / "cache"
+        self.cache_format = cache_format
+        self.route_workers = route_workers
+        self.route_results: List[RouteResult] = []
 
     def scaffold_folder_structure(self):
         paths = [
@@ -28,27 +308,74 @@ class WatchWriter:
             FileSystemManager.scaffold_paths(paths)
 
     def write_record_files(self, record_df: pd.DataFrame):
-        unique_record_types = record_df["type"].unique()
-        for record_type in unique_record_types:
-            record_sub_df = record_df.loc[record_df["type"] == record_type]
-            FileSystemManager.to_processed(
-                path=self.cache_path / "records", df=record_sub_df, name=record_type
+        record_writer = RecordChunkWriter(
+            self.cache_path, cache_format=self.cache_format
+        )
+        record_writer.reset()
+        record_writer.write(record_df)
+        record_writer.close()
+
+    def write_record_store(self):
+        """
+        Writes the memory-mapped record store (see ``RecordStore``) from the record files.
+
+        The store is built one record type at a time, so only the records of a
+        single type are held in memory.
+        """
+        records_path = self.cache_path / "records"
+        for record_type in partitioned_record_types(records_path):
+            record_df = pd.concat(
+                [
+                    FileSystemManager.read_processed(
+                        path=file.parent, name=file.stem, cache_format=self.cache_format
+                    )
+                    for file in partition_files(
+                        records_path, record_type, cache_format=self.cache_format
+                    )
+                ],
+                ignore_index=True,
             )
+            write_record_type_store(
+                self.cache_path / "record_store", record_type, record_df
+            )
+
+    def write_ecg_cache(self, workers: int | None = None):
+        """
+        Parses the ECG csv files once and writes them as one binary cache (see ``ECGCache``).
 
-    def write_full_record_file(self, record_df: pd.DataFrame):
-        record_df.to_csv(self.cache_path / "records.csv", index=False)
+        The cache is only rewritten if the set of ECG files changed since it was
+        last written.
+        """
+        ecg_path = self.data_path / "electrocardiograms"
+        ecg_cache_path = self.cache_path / "ecgs"
+        if not ecg_path.exists():
+            return
 
-    def _write_workout_event_file_for(self, workout, workout_id: str):
+        names = sorted(
+            file.stem for file in ecg_path.iterdir() if file.suffix == ".csv"
+        )
+        if ECGCache.exists(ecg_cache_path) and ECGCache(ecg_cache_path).names == names:
+            logger.info("ECG cache is up to date")
+            return
+
+        logger.info(f"Writing {len(names)} ECGs to the ECG cache")
+        write_ecg_cache(
+            ecg_cache_path, ECGReader.read_ecgs_from_dir(ecg_path, workers=workers)
+        )
+
+    def _workout_event_attributes_for(self, workout, workout_id: str) -> List[dict]:
         events = workout.findall("WorkoutEvent")
-        event_attributes = []
         for event in events:
             event.attrib["workout_uuid"] = workout_id
-        event_attribs = [event.attrib for event in events]
-        event_attributes.extend(event_attribs)
+        return [dict(event.attrib) for event in events]
 
+    def write_workout_events(self, event_attributes: List[dict]):
         events_df = pd.DataFrame(event_attributes)
         FileSystemManager.to_processed(
-            path=self.cache_path, df=events_df, name="workout_events"
+            path=self.cache_path,
+            df=events_df,
+            name="workout_events",
+            cache_format=self.cache_format,
         )
 
     def _write_statistics_file_for(self, workout, workout_id: str):
@@ -59,6 +386,7 @@ class WatchWriter:
             path=self.cache_path / "workout_statistics",
             df=statistic_df,
             name=workout_id,
+            cache_format=self.cache_format,
         )
 
     def _write_meta_data_entry_file_for(self, workout, workout_id: str):
@@ -72,114 +400,240 @@ class WatchWriter:
             path=self.cache_path / "workout_metadata_entries",
             df=metadata_entry_df,
             name=workout_id,
+            cache_format=self.cache_format,
         )
 
-    def _write_route_files_for(self, route_root, workout_id: str):
-        ns = {"gpx": "http://www.topografix.com/GPX/1/1"}
-        routes = route_root.findall("gpx:trk", ns)
-
-        route_data = {
-            "lon": [],
-            "lat": [],
-            "time": [],
-            "elevation": [],
-            "speed": [],
-            "course": [],
-            "hAcc": [],
-            "vAcc": [],
-        }
-
-        for route in routes:
-            route_segments = route.findall("gpx:trkseg", ns)
-            for route_segment in route_segments:
-                route_points = route_segment.findall("gpx:trkpt", ns)
-                for route_point in route_points:
-                    elevation = route_point.find("gpx:ele", ns).text
-                    time = route_point.find("gpx:time", ns).text
-
-                    # contains information about speed, course and acceleration
-                    extension = route_point.find("gpx:extensions", ns)
-
-                    lon = route_point.get("lon")
-                    lat = route_point.get("lat")
-                    speed = extension.find("gpx:speed", ns).text
-                    course = extension.find("gpx:course", ns).text
-                    hAcc = extension.find("gpx:hAcc", ns).text
-                    vAcc = extension.find("gpx:vAcc", ns).text
-
-                    route_data["lon"].append(float(lon))
-                    route_data["lat"].append(float(lat))
-                    route_data["elevation"].append(float(elevation))
-                    route_data["time"].append(time)
-                    route_data["speed"].append(float(speed))
-                    route_data["course"].append(float(course))
-                    route_data["hAcc"].append(float(hAcc))
-                    route_data["vAcc"].append(float(vAcc))
-
-        route_df = pd.DataFrame(route_data)
-        FileSystemManager.to_processed(
-            path=self.cache_path / "routes", df=route_df, name=workout_id
+    def write_route_files(self, route_attributes: List[dict]) -> List[RouteResult]:
+        """
+        Writes the track points of all given routes to the routes folder.
+
+        GPX files are parsed in parallel across ``route_workers`` processes, next to
+        the full route the simplified levels of ``ROUTE_PYRAMID_TOLERANCES`` are
+        written to the route_pyramid folder. A
+        route that fails to parse is reported in its result and logged, the other
+        routes are still written.
+
+        Parameters
+        ----------
+        route_attributes : List[dict]
+            Route attributes with the ``path`` and ``workout_uuid`` of each route.
+
+        Returns
+        -------
+        List[RouteResult]
+            One result per route with a file reference, in the given order.
+        """
+        jobs = [
+            (
+                self.data_path / route_attrib["path"][1:],
+                str(route_attrib["workout_uuid"]),
+            )
+            for route_attrib in route_attributes
+            if "path" in route_attrib
+        ]
+        self.route_results = write_route_files(
+            jobs,
+            routes_path=self.cache_path / "routes",
+            cache_format=self.cache_format,
+            workers=self.route_workers,
+            pyramid_path=self.cache_path / "route_pyramid",
         )
-
-    def write_workout_files(self, root: ET.Element):
-        workout_attributes = []
-        route_attributes = []
-        workouts = root.findall("Workout")
-
-        for workout in workouts:
-            # Generate unique id for each workout to be able to join workouts with events, routes, etc.
+        failed = [result for result in self.route_results if not result.ok]
+        if failed:
+            logger.error(f"{len(failed)} of {len(jobs)} routes could not be written")
+        return self.route_results
+
+    def write_route_grid(self, route_attributes: List[dict]):
+        """
+        Adds the routes written last by ``write_route_files`` to the route grid index.
+
+        Routes of workouts that are not in ``route_attributes`` anymore are removed
+        from the index.
+        """
+        grid = RouteGridIndex.load(self.cache_path, cache_format=self.cache_format)
+        grid = grid.updated(
+            {r.workout_uuid: r.cells for r in self.route_results if r.ok},
+            keep_uuids=[str(r["workout_uuid"]) for r in route_attributes],
+        )
+        grid.save(self.cache_path, cache_format=self.cache_format)
+
+    def _write_workout(
+        self,
+        workout: WorkoutElement,
+        workout_id: str | None = None,
+        write_files: bool = True,
+    ) -> Tuple[dict, List[dict], List[dict]]:
+        """
+        Writes the statistics and metadata entries of a single workout.
+
+        Routes are only collected in the returned route attributes, they are
+        written in one batch by ``write_route_files``.
+
+        Parameters
+        ----------
+        workout : WorkoutElement
+            The workout element.
+        workout_id : str | None, optional
+            Uuid to write the workout under, by default a new one is generated.
+        write_files : bool, optional
+            Whether to write the per workout files. Already cached workouts only
+            contribute their attributes, by default True
+
+        Returns
+        -------
+        Tuple[dict, List[dict], List[dict]]
+            The workout attributes, its route attributes and its event attributes.
+        """
+        # Generate unique id for each workout to be able to join workouts with events, routes, etc.
+        if workout_id is None:
             workout_id = uuid4()
-            workout.attrib["uuid"] = workout_id
-            workout_attributes.append(workout.attrib)
+        workout.attrib["uuid"] = workout_id
 
-            self._write_workout_event_file_for(workout, workout_id)
+        event_attribs = self._workout_event_attributes_for(workout, workout_id)
 
-            routes = workout.findall("WorkoutRoute")
+        routes = workout.findall("WorkoutRoute")
 
-            for route in routes:
-                route.attrib["workout_uuid"] = workout_id
-                file_ref = route.find("FileReference")
-                if file_ref is not None:
-                    route_path = file_ref.attrib["path"]
-                    route.attrib["path"] = route_path
-                    route_path = self.data_path / route_path[1:]
-                    route_tree = ET.parse(route_path)
-                    route_root = route_tree.getroot()
-
-                    self._write_route_files_for(route_root, workout_id)
+        for route in routes:
+            route.attrib["workout_uuid"] = workout_id
+            file_ref = route.find("FileReference")
+            if file_ref is not None:
+                route.attrib["path"] = file_ref.attrib["path"]
 
-            route_attribs = [route.attrib for route in routes]
-            route_attributes.extend(route_attribs)
+        route_attribs = [dict(route.attrib) for route in routes]
 
+        if write_files:
             self._write_statistics_file_for(workout, workout_id)
             self._write_meta_data_entry_file_for(workout, workout_id)
 
+        return dict(workout.attrib), route_attribs, event_attribs
+
+    def _remove_stale_workout_files(self, workout_uuids: Iterable[str]):
+        """
+        Removes the routes, route pyramid levels, statistics and metadata entries of
+        workouts that are not in ``workout_uuids``, e.g. deleted workouts.
+        """
+        workout_uuids = set(workout_uuids)
+        pyramid_path = self.cache_path / "route_pyramid"
+        folders = [
+            self.cache_path / "routes",
+            self.cache_path / "workout_statistics",
+            self.cache_path / "workout_metadata_entries",
+        ]
+        if pyramid_path.exists():
+            folders += [level for level in pyramid_path.iterdir() if level.is_dir()]
+        stale = 0
+        for folder in folders:
+            if not folder.exists():
+                continue
+            for file in folder.iterdir():
+                if (
+                    file.suffix == self.cache_format.suffix
+                    and file.stem not in workout_uuids
+                ):
+                    file.unlink()
+                    stale += 1
+        if stale:
+            logger.info(
+                f"Removed {stale} files of workouts that are not cached anymore"
+            )
+
+    def _with_route_summaries(self, routes_meta_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Adds the ``route_summary`` columns to the routes meta table.
+
+        Summaries of routes written last by ``write_route_files`` come from their
+        results, routes that were not rewritten keep the summary of the previous
+        routes meta table.
+        """
+        if "workout_uuid" not in routes_meta_df:
+            return routes_meta_df
+
+        summaries = {
+            r.workout_uuid: r.summary for r in self.route_results if r.ok and r.summary
+        }
+        previous_path = FileSystemManager.processed_path(
+            self.cache_path, "routes_meta", self.cache_format
+        )
+        if previous_path.exists():
+            previous_df = FileSystemManager.read_processed(
+                self.cache_path, "routes_meta", cache_format=self.cache_format
+            )
+            if set(ROUTE_SUMMARY_COLUMNS) <= set(previous_df.columns):
+                previous_df = previous_df.astype({"workout_uuid": str})
+                for row in previous_df[
+                    ["workout_uuid", *ROUTE_SUMMARY_COLUMNS]
+                ].to_dict("records"):
+                    summaries.setdefault(row.pop("workout_uuid"), row)
+
+        summary_df = pd.DataFrame.from_dict(
+            summaries, orient="index", columns=ROUTE_SUMMARY_COLUMNS
+        ).reindex(routes_meta_df["workout_uuid"].astype(str))
+        summary_df.index = routes_meta_df.index
+        return pd.concat([routes_meta_df, summary_df], axis=1)
+
+    def _write_workout_tables(
+        self,
+        workout_attributes: List[dict],
+        route_attributes: List[dict],
+        event_attributes: List[dict],
+    ):
         workouts_df = pd.DataFrame(workout_attributes)
-        routes_meta_df = pd.DataFrame(route_attributes)
+        routes_meta_df = self._with_route_summaries(pd.DataFrame(route_attributes))
 
         FileSystemManager.to_processed(
-            path=self.cache_path, df=workouts_df, name="workouts"
+            path=self.cache_path,
+            df=workouts_df,
+            name="workouts",
+            cache_format=self.cache_format,
         )
         FileSystemManager.to_processed(
-            path=self.cache_path, df=routes_meta_df, name="routes_meta"
+            path=self.cache_path,
+            df=routes_meta_df,
+            name="routes_meta",
+            cache_format=self.cache_format,
+        )
+        self.write_workout_events(event_attributes)
+
+    def write_workout_files(self, root: ET.Element):
+        workout_attributes = []
+        route_attributes = []
+        event_attributes = []
+
+        for workout in root.findall("Workout"):
+            workout_attrib, route_attribs, event_attribs = self._write_workout(workout)
+            workout_attributes.append(workout_attrib)
+            route_attributes.extend(route_attribs)
+            event_attributes.extend(event_attribs)
+
+        self.write_route_files(route_attributes)
+        self.write_route_grid(route_attributes)
+
+        self._write_workout_tables(
+            workout_attributes, route_attributes, event_attributes
         )
 
     def _load_full_record_df(self, root: ET.Element) -> pd.DataFrame:
         records = root.findall("Record")
         record_attribs = [record.attrib for record in records]
         record_df = pd.DataFrame(record_attribs)
-        return record_df
+        return compact_record_dtypes(record_df, inplace=True, keep_offsets=True)
 
     def write_metadata(self, root: ET.Element):
-        locale = root.attrib["locale"]
-        metadata_node = root.find("Me").attrib
-        export_date = root.find("ExportDate").attrib["value"]
+        self._write_metadata(
+            locale=root.attrib["locale"],
+            me_attrib=root.find("Me").attrib,
+            export_date=root.find("ExportDate").attrib["value"],
+        )
 
-        metadata_df = pd.DataFrame(metadata_node, index=[0])
+    def _write_metadata(self, locale: str, me_attrib: dict, export_date: str):
+        metadata_df = pd.DataFrame(me_attrib, index=[0])
         metadata_df["locale"] = locale
         metadata_df["export_date"] = export_date
         FileSystemManager.to_processed(
-            path=self.cache_path, df=metadata_df, name="metadata"
+            path=self.cache_path,
+            df=metadata_df,
+            name="metadata",
+            cache_format=self.cache_format,
         )
 
     def write_activity_summary(self, root: ET.Element):
@@ -188,9 +642,15 @@ class WatchWriter:
             activity_summary_node.attrib
             for activity_summary_node in activity_summary_nodes
         ]
+        self._write_activity_summary(activity_summary_attributes)
+
+    def _write_activity_summary(self, activity_summary_attributes: List[dict]):
         activity_summary_df = pd.DataFrame(activity_summary_attributes)
         FileSystemManager.to_processed(
-            path=self.cache_path, df=activity_summary_df, name="activity_summary"
+            path=self.cache_path,
+            df=activity_summary_df,
+            name="activity_summary",
+            cache_format=self.cache_format,
         )
 
     def write_all(self, root: ET.Element):
@@ -198,5 +658,117 @@ class WatchWriter:
         self.write_activity_summary(root)
         full_record_df = self._load_full_record_df(root)
         self.write_record_files(full_record_df)
-        self.write_full_record_file(full_record_df)
         self.write_workout_files(root)
+        self.write_ecg_cache()
+
+    def write_all_streaming(
+        self,
+        elements: Iterable[ET.Element],
+        chunk_size: int = 100_000,
+        cache_state: CacheState | None = None,
+    ) -> CacheState:
+        """
+        Writes the cache from a stream of top-level Export.xml elements.
+
+        Elements are dispatched to their writers as they arrive, so the whole
+        export never has to be held in memory. Records are buffered and appended
+        to the per-type record files every ``chunk_size`` records.
+
+        If the state of a previous run is given, the cache is updated
+        incrementally: only records created after the high-water mark of their
+        type are appended and only workouts with an unknown fingerprint get their
+        routes, statistics and metadata entries written. The files of workouts that
+        are not in the export anymore are removed. The small tables (workouts,
+        routes meta, events, activity summary, metadata) are always rewritten in
+        full.
+
+        Parameters
+        ----------
+        elements : Iterable[ET.Element]
+            Elements as produced by ``WatchLoader.iter_export_elements``.
+        chunk_size : int, optional
+            Number of records to buffer before appending them to disk, by default 100_000
+        cache_state : CacheState | None, optional
+            State of the existing cache, by default None which rebuilds the cache
+            from scratch.
+
+        Returns
+        -------
+        CacheState
+            The state of the cache after writing. Workouts whose route could not
+            be written are left out, so the next run writes them again.
+        """
+        incremental = cache_state is not None and not cache_state.is_empty
+        cache_state = cache_state if incremental else CacheState()
+
+        record_writer = RecordChunkWriter(
+            self.cache_path,
+            chunk_size=chunk_size,
+            cache_format=self.cache_format,
+            high_water_marks=cache_state.record_high_water_marks,
+        )
+        if not incremental:
+            record_writer.reset()
+
+        locale = None
+        me_attrib = {}
+        export_date = None
+        activity_summary_attributes = []
+        workout_attributes = []
+        route_attributes = []
+        event_attributes = []
+        new_route_attributes = []
+        workout_fingerprints = {}
+
+        try:
+            for elem in elements:
+                if elem.tag == "HealthData":
+                    locale = elem.attrib.get("locale")
+                elif elem.tag == "Record":
+                    record_writer.add(dict(elem.attrib))
+                elif elem.tag == "Workout":
+                    fingerprint = workout_fingerprint(elem.attrib)
+                    known_id = cache_state.workout_fingerprints.get(fingerprint)
+                    workout_attrib, route_attribs, event_attribs = self._write_workout(
+                        elem, workout_id=known_id, write_files=known_id is None
+                    )
+                    workout_fingerprints[fingerprint] = str(workout_attrib["uuid"])
+                    if known_id is None:
+                        new_route_attributes.extend(route_attribs)
+                    workout_attributes.append(workout_attrib)
+                    route_attributes.extend(route_attribs)
+                    event_attributes.extend(event_attribs)
+                elif elem.tag == "ActivitySummary":
+                    activity_summary_attributes.append(dict(elem.attrib))
+                elif elem.tag == "Me":
+                    me_attrib = dict(elem.attrib)
+                elif elem.tag == "ExportDate":
+                    export_date = elem.attrib.get("value")
+        except BaseException:
+            # close the open part files so they stay readable, the buffered records
+            # are dropped
+            record_writer.close(flush=False)
+            raise
+        record_writer.close()
+        self.write_route_files(new_route_attributes)
+        self.write_route_grid(route_attributes)
+        self._write_metadata(locale, me_attrib, export_date)
+        self._write_activity_summary(activity_summary_attributes)
+        self._write_workout_tables(
+            workout_attributes, route_attributes, event_attributes
+        )
+        self._remove_stale_workout_files(
+            str(workout_attrib["uuid"]) for workout_attrib in workout_attributes
+        )
+        self.write_ecg_cache()
+
+        # workouts whose route failed are not remembered, so the next run retries them
+        failed_uuids = {r.workout_uuid for r in self.route_results if not r.ok}
+        return CacheState(
+            record_high_water_marks=record_writer.high_water_marks,
+            workout_fingerprints={
+                fingerprint: workout_id
+                for fingerprint, workout_id in workout_fingerprints.items()
+                if workout_id not in failed_uuids
+            },
+        )
@@ -1,2 +1,6 @@
 from .baseline_nns import *
 from .dist import *
+from .dtw import *
+from .embeddings import *
+from .resample import *
+from .route_index import *
@@ -1,11 +1,24 @@
+import json
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict
 from typing import List
 from typing import Protocol
+from typing import TYPE_CHECKING
 
-import pandas as pd
+import numpy as np
 from watchml.data import WorkoutRoute
 
 from .dist import Distances
+from .dist import MatrixDistance
 from .dist import SeriesDistance
+from .dtw import DTWDistance
+from .embeddings import RouteEmbedding
+from .resample import resample_track
+from .resample import resample_tracks
+
+if TYPE_CHECKING:
+    from annoy import AnnoyIndex
 
 
 class NNIndex(Protocol):
@@ -19,60 +32,273 @@ class NN(Protocol):
 
 
 class AnnoyNNIndex(NNIndex):
-    from annoy import AnnoyIndex
-
-    def __init__(self, index: AnnoyIndex):
+    def __init__(
+        self,
+        index: "AnnoyIndex",
+        embedding: RouteEmbedding | None = None,
+        metric: str = "euclidean",
+    ):
         self.index = index
+        self.embedding = embedding if embedding is not None else RouteEmbedding()
+        self.metric = metric
 
     def nns(self, t, n=3) -> List[int]:
         return self.index.get_nns_by_item(t, n)
 
+    def nns_by_track(self, track: WorkoutRoute, n: int = 3) -> List[int]:
+        """Nearest neighbours of a route that is not part of the index."""
+        return self.index.get_nns_by_vector(self.embedding.embed(track).tolist(), n)
+
+    def save(self, path: str | Path):
+        """
+        Saves the index to ``path`` and its embedding settings next to it as json.
+        """
+        path = Path(path)
+        self.index.save(str(path))
+        with open(path.with_suffix(".json"), "w") as f:
+            json.dump({"metric": self.metric, "embedding": asdict(self.embedding)}, f)
+
+    @staticmethod
+    def load(path: str | Path) -> "AnnoyNNIndex":
+        """
+        Loads an index written by ``save``.
+
+        The index file is memory-mapped, so loading is fast and several processes
+        can share it.
+        """
+        from annoy import AnnoyIndex
+
+        path = Path(path)
+        with open(path.with_suffix(".json"), "r") as f:
+            meta = json.load(f)
+        embedding = RouteEmbedding(**meta["embedding"])
+        index = AnnoyIndex(embedding.dimension, metric=meta["metric"])
+        index.load(str(path))
+        return AnnoyNNIndex(index, embedding=embedding, metric=meta["metric"])
+
 
 class AnnoyNN(NN):
-    def __init__(self, tracks: List[WorkoutRoute]):
+    """Approximate nearest neighbours of tracks by their shape embedding.
+
+    Every track is embedded with ``embedding`` (see ``RouteEmbedding``) and the
+    vectors are indexed with Annoy.
+    """
+
+    def __init__(
+        self,
+        tracks: List[WorkoutRoute],
+        embedding: RouteEmbedding | None = None,
+        n_trees: int = 10,
+    ):
         self.tracks = tracks
+        self.embedding = embedding if embedding is not None else RouteEmbedding()
+        self.n_trees = n_trees
 
-    def build_index(self) -> NNIndex:
+    def build_index(self) -> AnnoyNNIndex:
         from annoy import AnnoyIndex
 
-        index = AnnoyIndex(2, metric="euclidean")
-        for i, track in enumerate(self.tracks):
-            index.add_item(i, [track.lon.mean(), track.lat.mean()])
-        index.build(100)
-        return AnnoyNNIndex(index)
+        index = AnnoyIndex(self.embedding.dimension, metric="euclidean")
+        for i, vector in enumerate(self.embedding.embed_many(self.tracks)):
+            index.add_item(i, vector.tolist())
+        index.build(self.n_trees)
+        return AnnoyNNIndex(index, embedding=self.embedding)
 
 
 class BaselineNNIndex(NNIndex):
-    def __init__(self, dists):
+    """Nearest neighbours from a precomputed distance matrix.
+
+    The distances are either a dense ``(n, n)`` matrix or a condensed matrix of
+    length ``n * (n - 1) / 2`` that only holds the pairs ``i < j`` row by row
+    (the layout of ``scipy.spatial.distance.squareform``), which halves the
+    memory. Like ``AnnoyNNIndex``, a track is its own nearest neighbour.
+    """
+
+    def __init__(self, dists: np.ndarray):
         self.dists = dists
+        if dists.ndim == 1:
+            self.n_tracks = int(round((1 + np.sqrt(1 + 8 * len(dists))) / 2))
+            if self.n_tracks * (self.n_tracks - 1) // 2 != len(dists):
+                raise ValueError(f"{len(dists)} is not a condensed matrix length")
+        else:
+            self.n_tracks = len(dists)
+
+    @property
+    def condensed(self) -> bool:
+        return self.dists.ndim == 1
+
+    def rows(self, ts: np.ndarray) -> np.ndarray:
+        """Distances from the tracks ``ts`` to all tracks, shape ``(len(ts), n)``."""
+        ts = np.asarray(ts, dtype=np.int64)
+        if not self.condensed:
+            return self.dists[ts]
+
+        n = self.n_tracks
+        i = np.minimum(ts[:, None], np.arange(n)[None, :])
+        j = np.maximum(ts[:, None], np.arange(n)[None, :])
+        positions = i * n - i * (i + 1) // 2 + j - i - 1
+        rows = np.zeros(positions.shape)
+        pairs = i != j
+        rows[pairs] = self.dists[positions[pairs]]
+        return rows
 
     def nns(self, t, n=3) -> List[int]:
-        vals = []
-        for k, v in self.dists.items():
-            i, _ = k
-            if i == t:
-                vals.append(v)
-        return pd.DataFrame(vals).sort_values(by=0).index.values[:n]
+        return self.nns_many(n=n, ts=[t])[0].tolist()
+
+    def nns_many(
+        self,
+        n: int = 3,
+        ts: List[int] | np.ndarray | None = None,
+        batch_size: int = 1024,
+    ) -> np.ndarray:
+        """
+        Nearest neighbours of many tracks at once.
+
+        Selects the ``n`` closest tracks of every row with ``np.argpartition`` and
+        only sorts those, which is linear instead of ``n log n`` in the number of
+        tracks.
+
+        Parameters
+        ----------
+        n : int, optional
+            Number of neighbours per track, by default 3
+        ts : List[int] | np.ndarray | None, optional
+            Tracks to query, by default all tracks
+        batch_size : int, optional
+            Number of rows of the distance matrix to process at once, by default 1024
+
+        Returns
+        -------
+        np.ndarray
+            Array of shape ``(len(ts), min(n, n_tracks))`` with the indices of the
+            neighbours of each track, closest first.
+        """
+        ts = np.arange(self.n_tracks) if ts is None else np.asarray(ts, dtype=np.int64)
+        n = min(n, self.n_tracks)
+        nns = np.empty((len(ts), n), dtype=np.int64)
+        if n == 0:
+            return nns
+
+        for start in range(0, len(ts), batch_size):
+            rows = self.rows(ts[start : start + batch_size])
+            if n < self.n_tracks:
+                candidates = np.argpartition(rows, n - 1, axis=1)[:, :n]
+            else:
+                candidates = np.broadcast_to(np.arange(self.n_tracks), rows.shape)
+            order = np.argsort(
+                np.take_along_axis(rows, candidates, axis=1), axis=1, kind="stable"
+            )
+            nns[start : start + batch_size] = np.take_along_axis(
+                candidates, order, axis=1
+            )
+        return nns
+
+
+# Series distances that have a vectorized counterpart for whole distance matrices
+MATRIX_DISTANCES: Dict[SeriesDistance, MatrixDistance] = {
+    Distances.euclidean_series: Distances.euclidean_matrix,
+    Distances.manhatten_series: Distances.manhatten_matrix,
+}
 
 
 class BaselineNN(NN):
-    def __init__(self, tracks: List[WorkoutRoute]):
+    """Exact nearest neighbours of tracks by their point-wise distance.
+
+    Every track is resampled to ``n_points`` points equally spaced along its
+    length, so that tracks with a different number of points can be compared
+    point by point.
+    """
+
+    def __init__(self, tracks: List[WorkoutRoute], n_points: int = 64):
         self.tracks = tracks
+        self.n_points = n_points
 
     def track_dist(
         self, track1: WorkoutRoute, track2: WorkoutRoute, dist: SeriesDistance
     ) -> float:
-        df1 = track1.track_df
-        df2 = track2.track_df
-        return (
-            dist(df1["lon"], df2["lon"]).fillna(0.01).sum()
-            + dist(df1["lat"], df2["lat"]).fillna(0.01).sum()
+        points1 = resample_track(track1, n_points=self.n_points)
+        points2 = resample_track(track2, n_points=self.n_points)
+        if isinstance(dist, DTWDistance):
+            return dist(points1, points2)
+        return float(
+            dist(points1[:, 0], points2[:, 0]).sum()
+            + dist(points1[:, 1], points2[:, 1]).sum()
+        )
+
+    def build_index(
+        self,
+        dist: SeriesDistance | DTWDistance = Distances.euclidean_series,
+        block_size: int = 256,
+        condensed: bool = False,
+        k: int | None = None,
+    ) -> BaselineNNIndex:
+        """
+        Computes the distances between all pairs of tracks.
+
+        Euclidean and Manhattan distances are computed as a blocked matrix
+        operation over the resampled tracks. DTW distances are computed between
+        one track and many others at once, any other ``dist`` is evaluated pair by
+        pair with ``track_dist`` and is assumed to be symmetric.
+
+        Parameters
+        ----------
+        dist : SeriesDistance, optional
+            Point-wise distance, by default ``Distances.euclidean_series``
+        block_size : int, optional
+            Number of tracks per block of the distance matrix, by default 256
+        condensed : bool, optional
+            Whether to only store the upper triangle of the distance matrix, by
+            default False
+        k : int | None, optional
+            Only for ``DTWDistance``: compute just the distances needed for the
+            ``k`` nearest neighbours of every track (including itself) and prune
+            the others with LB_Keogh lower bounds. Pruned distances are ``inf``, so
+            the index answers queries for up to ``k`` neighbours. By default all
+            distances are computed.
+        """
+        n = len(self.tracks)
+        if isinstance(dist, DTWDistance):
+            return self._build_dtw_index(dist, condensed=condensed, k=k)
+
+        if dist not in MATRIX_DISTANCES:
+            pairs = zip(*np.triu_indices(n, k=1))
+            upper = np.array(
+                [
+                    self.track_dist(self.tracks[i], self.tracks[j], dist)
+                    for i, j in pairs
+                ]
+            )
+            return BaselineNNIndex(upper if condensed else _squareform(upper, n))
+
+        points = resample_tracks(self.tracks, n_points=self.n_points)
+        points = points.reshape(n, 2 * self.n_points)
+        # Centering does not change the distances but reduces the cancellation in
+        # the matrix product of the euclidean distance for nearby tracks
+        points = points - points.mean(axis=0)
+        pairwise = Distances.pairwise_condensed if condensed else Distances.pairwise
+        return BaselineNNIndex(
+            pairwise(points, dist=MATRIX_DISTANCES[dist], block_size=block_size)
         )
 
-    def build_index(self, dist=Distances.euclidean_series) -> BaselineNNIndex:
-        dists = {}
-        for i, track1 in enumerate(self.tracks):
-            for j, track2 in enumerate(self.tracks):
-                d = self.track_dist(track1, track2, dist)
-                dists[(i, j)] = d
-        return BaselineNNIndex(dists)
+    def _build_dtw_index(
+        self, dist: DTWDistance, condensed: bool, k: int | None
+    ) -> BaselineNNIndex:
+        n = len(self.tracks)
+        points = resample_tracks(self.tracks, n_points=self.n_points)
+        if k is not None:
+            if condensed:
+                raise ValueError("A pruned DTW index can not be condensed")
+            dists = np.empty((n, n))
+            for i in range(n):
+                dists[i] = dist.knn(points[i], points, k)
+            return BaselineNNIndex(dists)
+
+        upper = np.concatenate(
+            [dist.batch(points[i], points[i + 1 :]) for i in range(n)] or [[]]
+        )
+        return BaselineNNIndex(upper if condensed else _squareform(upper, n))
+
+
+def _squareform(upper: np.ndarray, n: int) -> np.ndarray:
+    dists = np.zeros((n, n))
+    dists[np.triu_indices(n, k=1)] = upper
+    return dists + dists.T
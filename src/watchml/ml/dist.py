@@ -1,10 +1,14 @@
 from typing import Callable
 
+import numpy as np
 import pandas as pd
 
 
 SeriesDistance = Callable[[pd.Series, pd.Series], pd.Series]
 
+# Maps arrays of shape (m, d) and (k, d) to the (m, k) matrix of distances
+MatrixDistance = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
 
 class Distances:
     @staticmethod
@@ -22,3 +26,87 @@ class Distances:
     @staticmethod
     def manhatten_series(s1: pd.Series, s2: pd.Series) -> pd.Series:
         return Distances._manhatten(s1, s2)
+
+    @staticmethod
+    def euclidean_matrix(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Summed squared differences between every row of ``x`` and every row of ``y``.
+
+        This is ``euclidean_series`` summed over the row, computed with a single
+        matrix product.
+        """
+        dists = (
+            np.einsum("ij,ij->i", x, x)[:, None]
+            + np.einsum("ij,ij->i", y, y)[None, :]
+            - 2 * x @ y.T
+        )
+        return np.maximum(dists, 0, out=dists)
+
+    @staticmethod
+    def manhatten_matrix(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Summed absolute differences between every row of ``x`` and every row of ``y``."""
+        return np.abs(x[:, None, :] - y[None, :, :]).sum(axis=2)
+
+    @staticmethod
+    def pairwise(
+        x: np.ndarray,
+        dist: MatrixDistance = euclidean_matrix,
+        block_size: int = 256,
+    ) -> np.ndarray:
+        """
+        Full distance matrix between all rows of ``x``, computed in blocks.
+
+        Only ``block_size x block_size`` pairs are computed at once, which bounds
+        the memory of the intermediate arrays independently of ``len(x)``.
+
+        Parameters
+        ----------
+        x : np.ndarray
+            Array of shape ``(n, d)``.
+        dist : MatrixDistance, optional
+            Distance between blocks of rows, by default ``Distances.euclidean_matrix``
+        block_size : int, optional
+            Number of rows per block, by default 256
+
+        Returns
+        -------
+        np.ndarray
+            Symmetric ``(n, n)`` distance matrix.
+        """
+        n = len(x)
+        dists = np.empty((n, n))
+        for i in range(0, n, block_size):
+            for j in range(i, n, block_size):
+                block = dist(x[i : i + block_size], x[j : j + block_size])
+                dists[i : i + block_size, j : j + block_size] = block
+                dists[j : j + block_size, i : i + block_size] = block.T
+        # Rounding of the matrix product can leave tiny non-zero self distances
+        np.fill_diagonal(dists, 0)
+        return dists
+
+    @staticmethod
+    def pairwise_condensed(
+        x: np.ndarray,
+        dist: MatrixDistance = euclidean_matrix,
+        block_size: int = 256,
+    ) -> np.ndarray:
+        """
+        Condensed distance matrix between all rows of ``x``, computed in blocks.
+
+        Like ``pairwise``, but only the ``n * (n - 1) / 2`` distances of the pairs
+        ``i < j`` are stored, row by row.
+        """
+        n = len(x)
+        dists = np.empty(n * (n - 1) // 2)
+        for i in range(0, n, block_size):
+            rows = np.hstack(
+                [
+                    dist(x[i : i + block_size], x[j : j + block_size])
+                    for j in range(i, n, block_size)
+                ]
+            )
+            for r in range(len(rows)):
+                row = i + r
+                offset = row * n - row * (row + 1) // 2
+                dists[offset : offset + n - row - 1] = rows[r, r + 1 :]
+        return dists
@@ -0,0 +1,119 @@
+import math
+from typing import Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class DTWDistance:
+    """Dynamic time warping distance between tracks of equal length.
+
+    Tracks are arrays of shape ``(n_points, d)``, e.g. the ``(lon, lat)`` points of
+    tracks resampled with ``resample_tracks``. The cost of matching two points is
+    their squared euclidean distance, so with ``window=0`` the distance equals the
+    ``Distances.euclidean_matrix`` distance of the flattened tracks.
+
+    The warping path is restricted to a Sakoe-Chiba band of ``window * n_points``
+    points around the diagonal, and nearest neighbour searches skip candidates
+    whose LB_Keogh lower bound is already larger than the k-th best distance.
+
+    Parameters
+    ----------
+    window : float, optional
+        Width of the Sakoe-Chiba band as a share of the track length, by default 0.1
+    """
+
+    def __init__(self, window: float = 0.1):
+        self.window = window
+
+    def __repr__(self) -> str:
+        return f"DTWDistance(window={self.window})"
+
+    def band(self, n_points: int) -> int:
+        return math.ceil(self.window * n_points)
+
+    def __call__(self, x: np.ndarray, y: np.ndarray) -> float:
+        return float(self.batch(x, y[None])[0])
+
+    def batch(self, x: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """
+        DTW distances from ``x`` to every track of ``ys``.
+
+        The dynamic program runs over the cells of the band once, each step is
+        vectorized over all tracks of ``ys``.
+
+        Parameters
+        ----------
+        x : np.ndarray
+            Track of shape ``(n_points, d)``.
+        ys : np.ndarray
+            Tracks of shape ``(m, n_points, d)``.
+
+        Returns
+        -------
+        np.ndarray
+            The ``m`` distances.
+        """
+        n = len(x)
+        w = self.band(n)
+        # costs[:, i, j] matches point i of x with point j of a track of ys
+        costs = ((x[None, :, None, :] - ys[:, None, :, :]) ** 2).sum(axis=3)
+        dists = np.full((len(ys), n + 1, n + 1), np.inf)
+        dists[:, 0, 0] = 0
+        for i in range(1, n + 1):
+            for j in range(max(1, i - w), min(n, i + w) + 1):
+                previous = np.minimum(
+                    np.minimum(dists[:, i - 1, j - 1], dists[:, i - 1, j]),
+                    dists[:, i, j - 1],
+                )
+                dists[:, i, j] = costs[:, i - 1, j - 1] + previous
+        return dists[:, n, n]
+
+    def envelope(self, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Lower and upper envelope of ``x`` within the band, per dimension."""
+        w = self.band(len(x))
+        padded = np.pad(x, ((w, w), (0, 0)), mode="edge")
+        windows = sliding_window_view(padded, 2 * w + 1, axis=0)
+        return windows.min(axis=2), windows.max(axis=2)
+
+    def lb_keogh(self, x: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """
+        LB_Keogh lower bounds of the DTW distances from ``x`` to every track of ``ys``.
+
+        Every point of a track is matched to some point of ``x`` within the band,
+        so its distance to the envelope of ``x`` never exceeds its matching cost.
+        """
+        lower, upper = self.envelope(x)
+        above = np.maximum(ys - upper, 0)
+        below = np.maximum(lower - ys, 0)
+        return (above**2 + below**2).sum(axis=(1, 2))
+
+    def knn(
+        self, x: np.ndarray, ys: np.ndarray, k: int, batch_size: int = 32
+    ) -> np.ndarray:
+        """
+        DTW distances from ``x`` to the tracks of ``ys`` needed for its ``k`` nearest.
+
+        Candidates are evaluated in batches in the order of their lower bounds.
+        Once the lower bound of the next candidate exceeds the k-th best distance
+        found so far, no remaining candidate can be closer and the search stops.
+
+        Returns
+        -------
+        np.ndarray
+            The distances to all tracks of ``ys``, ``inf`` for pruned tracks. The
+            ``k`` smallest entries are exact.
+        """
+        bounds = self.lb_keogh(x, ys)
+        order = np.argsort(bounds, kind="stable")
+        dists = np.full(len(ys), np.inf)
+        kth_best = np.inf
+        for start in range(0, len(ys), batch_size):
+            candidates = order[start : start + batch_size]
+            candidates = candidates[bounds[candidates] <= kth_best]
+            if len(candidates) == 0:
+                break
+            dists[candidates] = self.batch(x, ys[candidates])
+            if 0 < k <= len(ys):
+                kth_best = np.partition(dists, k - 1)[k - 1]
+        return dists
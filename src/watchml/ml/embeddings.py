@@ -0,0 +1,88 @@
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+from watchml.data import WorkoutRoute
+from watchml.utils.geo import METERS_PER_DEGREE
+
+from .resample import track_length
+
+
+@dataclass
+class RouteEmbedding:
+    """Turns a route into a fixed-length vector describing its shape.
+
+    The vector is the concatenation of
+
+    - the route resampled to ``n_points`` points equally spaced along its length,
+    - its start and end point,
+    - its bounding box,
+    - its length and
+    - its elevation resampled to ``n_elevation`` points along its length.
+
+    Positions are projected to kilometers (sinusoidal projection) and elevations
+    are given in kilometers as well, so that euclidean distances between
+    embeddings are meaningful. Each group of features is scaled by its weight.
+    """
+
+    n_points: int = 16
+    n_elevation: int = 8
+    shape_weight: float = 1.0
+    endpoint_weight: float = 1.0
+    bbox_weight: float = 1.0
+    length_weight: float = 1.0
+    elevation_weight: float = 1.0
+
+    @property
+    def dimension(self) -> int:
+        return 2 * self.n_points + 4 + 4 + 1 + self.n_elevation
+
+    def embed(self, track: WorkoutRoute) -> np.ndarray:
+        """
+        Embeds a single route.
+
+        Returns
+        -------
+        np.ndarray
+            ``float32`` vector of length ``dimension``. Routes without valid points
+            are embedded as zeros.
+        """
+        lon = track.lon.to_numpy(dtype=np.float64)
+        lat = track.lat.to_numpy(dtype=np.float64)
+        if "elevation" in track.route_df:
+            elevation = track.route_df["elevation"].to_numpy(dtype=np.float64)
+        else:
+            elevation = np.zeros(len(lon))
+        valid = ~(np.isnan(lon) | np.isnan(lat))
+        lon, lat, elevation = lon[valid], lat[valid], elevation[valid]
+        if len(lon) == 0:
+            return np.zeros(self.dimension, dtype=np.float32)
+
+        km_per_degree = METERS_PER_DEGREE / 1000
+        x = lon * np.cos(np.radians(lat)) * km_per_degree
+        y = lat * km_per_degree
+        length = track_length(lon, lat) / 1000
+        positions = np.linspace(0, length[-1], self.n_points)
+        elevation_positions = np.linspace(0, length[-1], self.n_elevation)
+        elevation = np.nan_to_num(elevation, nan=np.nanmean(elevation))
+
+        features = [
+            self.shape_weight
+            * np.column_stack(
+                [np.interp(positions, length, x), np.interp(positions, length, y)]
+            ).ravel(),
+            self.endpoint_weight * np.array([x[0], y[0], x[-1], y[-1]]),
+            self.bbox_weight * np.array([x.min(), y.min(), x.max(), y.max()]),
+            self.length_weight * np.array([length[-1]]),
+            self.elevation_weight
+            * np.interp(elevation_positions, length, elevation)
+            / 1000,
+        ]
+        return np.nan_to_num(np.concatenate(features)).astype(np.float32)
+
+    def embed_many(self, tracks: List[WorkoutRoute]) -> np.ndarray:
+        """Embeds all routes into an array of shape ``(len(tracks), dimension)``."""
+        vectors = np.empty((len(tracks), self.dimension), dtype=np.float32)
+        for i, track in enumerate(tracks):
+            vectors[i] = self.embed(track)
+        return vectors
@@ -0,0 +1,67 @@
+from typing import List
+
+import numpy as np
+from watchml.data import WorkoutRoute
+from watchml.utils.geo import project_to_meters
+
+
+def track_length(lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+    """
+    Cumulative length of a track in meters at every point.
+
+    Uses the equirectangular projection of ``project_to_meters``.
+    """
+    x, y = project_to_meters(lon, lat)
+    length = np.zeros(len(x))
+    length[1:] = np.hypot(np.diff(x), np.diff(y)).cumsum()
+    return length
+
+
+def resample_polyline(lon: np.ndarray, lat: np.ndarray, n_points: int) -> np.ndarray:
+    """
+    Resamples a track to ``n_points`` points equally spaced along its length.
+
+    Parameters
+    ----------
+    lon : np.ndarray
+        Longitudes of the track.
+    lat : np.ndarray
+        Latitudes of the track.
+    n_points : int
+        Number of points of the resampled track.
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape ``(n_points, 2)`` with the longitude and latitude of every
+        resampled point. A track without valid points is all NaN.
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    valid = ~(np.isnan(lon) | np.isnan(lat))
+    lon, lat = lon[valid], lat[valid]
+
+    if len(lon) == 0:
+        return np.full((n_points, 2), np.nan)
+    length = track_length(lon, lat)
+    if length[-1] == 0:
+        return np.tile([lon[0], lat[0]], (n_points, 1))
+
+    positions = np.linspace(0, length[-1], n_points)
+    return np.column_stack(
+        [np.interp(positions, length, lon), np.interp(positions, length, lat)]
+    )
+
+
+def resample_track(track: WorkoutRoute, n_points: int = 64) -> np.ndarray:
+    return resample_polyline(
+        track.lon.to_numpy(), track.lat.to_numpy(), n_points=n_points
+    )
+
+
+def resample_tracks(tracks: List[WorkoutRoute], n_points: int = 64) -> np.ndarray:
+    """Resamples all tracks into one array of shape ``(len(tracks), n_points, 2)``."""
+    resampled = np.empty((len(tracks), n_points, 2))
+    for i, track in enumerate(tracks):
+        resampled[i] = resample_track(track, n_points=n_points)
+    return resampled
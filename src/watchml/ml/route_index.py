@@ -0,0 +1,224 @@
+import json
+import logging
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import TYPE_CHECKING
+
+import numpy as np
+from watchml.data import WorkoutRoute
+
+from .baseline_nns import AnnoyNNIndex
+from .embeddings import RouteEmbedding
+
+if TYPE_CHECKING:
+    from watchml.file import WatchReader
+
+logger = logging.getLogger(__name__)
+
+ROUTE_INDEX_META = "meta.json"
+ROUTE_INDEX_EMBEDDINGS = "embeddings.npy"
+ROUTE_INDEX_ANNOY = "index.ann"
+
+
+class RouteSimilarityIndex:
+    """A route similarity index that is kept in the cache and updated incrementally.
+
+    The embeddings of all routes (see ``RouteEmbedding``) are stored by workout
+    uuid in ``cache_path/route_index``, together with an Annoy index over the
+    routes that were present at the last rebuild. Routes added later are kept as
+    pending and searched exactly next to the Annoy index, so adding routes never
+    requires a rebuild. The Annoy index is only rebuilt once the share of pending
+    routes exceeds ``staleness``.
+
+    Parameters
+    ----------
+    cache_path : Path | str
+        The cache folder, the index is stored in its ``route_index`` folder.
+    embedding : RouteEmbedding | None, optional
+        How routes are embedded. By default the settings of the stored index are
+        used, a different embedding discards the stored index.
+    n_trees : int, optional
+        Number of trees of the Annoy index, by default 10
+    staleness : float, optional
+        Share of pending routes above which the Annoy index is rebuilt, by default
+        0.1
+    """
+
+    def __init__(
+        self,
+        cache_path: Path | str,
+        embedding: RouteEmbedding | None = None,
+        n_trees: int = 10,
+        staleness: float = 0.1,
+    ):
+        self.path = Path(cache_path) / "route_index"
+        self.n_trees = n_trees
+        self.staleness = staleness
+
+        self.uuids: List[str] = []
+        self.n_indexed = 0
+        self.index: AnnoyNNIndex | None = None
+        self._rebuilt = False
+        meta = self._load_meta()
+        stored_embedding = RouteEmbedding(**meta["embedding"]) if meta else None
+        if embedding is None:
+            embedding = stored_embedding or RouteEmbedding()
+        self.embedding = embedding
+        self.embeddings = np.empty((0, self.embedding.dimension), dtype=np.float32)
+
+        if meta and self.embedding == stored_embedding:
+            self.uuids = meta["uuids"]
+            self.n_indexed = meta["n_indexed"]
+            self.embeddings = np.load(self.path / ROUTE_INDEX_EMBEDDINGS)
+            if self.n_indexed > 0:
+                self.index = AnnoyNNIndex.load(self.path / ROUTE_INDEX_ANNOY)
+        self._positions: Dict[str, int] = {u: i for i, u in enumerate(self.uuids)}
+
+    def _load_meta(self) -> dict | None:
+        if not (self.path / ROUTE_INDEX_META).exists():
+            return None
+        with open(self.path / ROUTE_INDEX_META, "r") as f:
+            return json.load(f)
+
+    def __len__(self) -> int:
+        return len(self.uuids)
+
+    def __contains__(self, uuid: str) -> bool:
+        return uuid in self._positions
+
+    @property
+    def n_pending(self) -> int:
+        return len(self.uuids) - self.n_indexed
+
+    @property
+    def is_stale(self) -> bool:
+        return self.n_pending > self.staleness * len(self.uuids)
+
+    def add(self, routes: List[WorkoutRoute]) -> int:
+        """
+        Adds routes that are not in the index yet as pending routes.
+
+        Returns
+        -------
+        int
+            Number of routes that were added.
+        """
+        routes = [route for route in routes if route.uuid not in self]
+        if not routes:
+            return 0
+        self.embeddings = np.concatenate(
+            [self.embeddings, self.embedding.embed_many(routes)]
+        )
+        for route in routes:
+            self._positions[route.uuid] = len(self.uuids)
+            self.uuids.append(route.uuid)
+        return len(routes)
+
+    def remove(self, uuids: List[str]):
+        """
+        Removes routes from the index.
+
+        Annoy indexes are immutable, so removing a route that is part of the Annoy
+        index turns all routes into pending routes until the next rebuild.
+        """
+        positions = sorted(self._positions[uuid] for uuid in uuids if uuid in self)
+        if not positions:
+            return
+        keep = np.ones(len(self.uuids), dtype=bool)
+        keep[positions] = False
+        if positions[0] < self.n_indexed:
+            self.n_indexed = 0
+            self.index = None
+        self.embeddings = self.embeddings[keep]
+        self.uuids = [uuid for uuid, k in zip(self.uuids, keep) if k]
+        self._positions = {uuid: i for i, uuid in enumerate(self.uuids)}
+
+    def update(self, reader: "WatchReader") -> int:
+        """
+        Adds the routes of the cache that are not indexed yet and saves the index.
+
+        Only the routes of new workouts are read, routes of workouts that are no
+        longer cached are removed and the Annoy index is rebuilt if it became
+        stale.
+
+        Returns
+        -------
+        int
+            Number of routes that were added.
+        """
+        routes_meta = reader.routes_meta()
+        if "workout_uuid" not in routes_meta:  # no workout has a route
+            routes_meta = routes_meta.assign(workout_uuid=[], path=[])
+        self.remove(sorted(set(self.uuids) - set(routes_meta["workout_uuid"])))
+
+        routes = []
+        for row in routes_meta.itertuples():
+            if row.workout_uuid in self:
+                continue
+            try:
+                route_df = reader.route(row.workout_uuid)
+            except FileNotFoundError:
+                logger.warning(f"Route of workout {row.workout_uuid} not found")
+                continue
+            routes.append(WorkoutRoute(route_df, row.workout_uuid, row.path))
+
+        added = self.add(routes)
+        if self.is_stale:
+            self.rebuild()
+        self.save()
+        return added
+
+    def rebuild(self):
+        """Rebuilds the Annoy index over all routes, no route is pending afterwards."""
+        from annoy import AnnoyIndex
+
+        logger.info(f"Rebuilding route index over {len(self)} routes")
+        index = AnnoyIndex(self.embedding.dimension, metric="euclidean")
+        for i, vector in enumerate(self.embeddings):
+            index.add_item(i, vector.tolist())
+        index.build(self.n_trees)
+        self.index = AnnoyNNIndex(index, embedding=self.embedding)
+        self.n_indexed = len(self.uuids)
+        self._rebuilt = True
+
+    def save(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        if self._rebuilt:
+            self.index.save(self.path / ROUTE_INDEX_ANNOY)
+            self._rebuilt = False
+        np.save(self.path / ROUTE_INDEX_EMBEDDINGS, self.embeddings)
+        with open(self.path / ROUTE_INDEX_META, "w") as f:
+            json.dump(
+                {
+                    "embedding": asdict(self.embedding),
+                    "n_indexed": self.n_indexed,
+                    "uuids": self.uuids,
+                },
+                f,
+            )
+
+    def nns_by_vector(self, vector: np.ndarray, n: int = 3) -> List[str]:
+        """Uuids of the ``n`` routes closest to an embedding, closest first."""
+        positions, distances = [], []
+        if self.index is not None:
+            positions, distances = self.index.index.get_nns_by_vector(
+                vector.tolist(), n, include_distances=True
+            )
+        pending = self.embeddings[self.n_indexed :]
+        positions = np.concatenate(
+            [positions, np.arange(self.n_indexed, len(self.uuids))]
+        ).astype(np.int64)
+        distances = np.concatenate(
+            [distances, np.sqrt(((pending - vector) ** 2).sum(axis=1))]
+        )
+        closest = positions[np.argsort(distances, kind="stable")[:n]]
+        return [self.uuids[position] for position in closest]
+
+    def nns(self, uuid: str, n: int = 3) -> List[str]:
+        """Uuids of the ``n`` routes most similar to an indexed route (itself included)."""
+        return self.nns_by_vector(self.embeddings[self._positions[uuid]], n=n)
+
+    def nns_by_track(self, track: WorkoutRoute, n: int = 3) -> List[str]:
+        return self.nns_by_vector(self.embedding.embed(track), n=n)
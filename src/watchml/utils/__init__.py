@@ -1,2 +1,4 @@
 from .constants import *
+from .features import *
+from .geo import *
 from .utils import *
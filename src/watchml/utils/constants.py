@@ -32,3 +32,30 @@ HK_WORKOUT_DISTANCE_MAP = {
 }
 
 HK_WORKOUT_DISTANCE_KEYS = list(HK_WORKOUT_DISTANCE_MAP.keys())
+
+HK_DATE_FORMAT = "%Y-%m-%d %H:%M:%S %z"
+
+HK_DATE_COLUMNS = [
+    "creationDate",
+    "startDate",
+    "endDate",
+    "date",
+    "time",
+    "export_date",
+]
+
+# 1 for the winter months, 0 for the summer months
+MONTH_TIME_OF_YEAR_MAPPING = {
+    1: 1,
+    2: 1,
+    3: 0,
+    4: 0,
+    5: 0,
+    6: 0,
+    7: 0,
+    8: 0,
+    9: 0,
+    10: 0,
+    11: 1,
+    12: 1,
+}
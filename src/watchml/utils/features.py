@@ -0,0 +1,199 @@
+from typing import Dict
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from .constants import MONTH_TIME_OF_YEAR_MAPPING
+
+DATE_FEATURES = [
+    "timeOfYear",
+    "year",
+    "month",
+    "weekday",
+    "weekend",
+    "hour",
+    "localDate",
+]
+
+_TIME_OF_YEAR = np.array(
+    [0] + [MONTH_TIME_OF_YEAR_MAPPING[month] for month in range(1, 13)], dtype=np.int8
+)
+_LOCAL_DATE_FORMATS = {
+    len("2023-01-01"): "%Y-%m-%d",
+    len("2023-01-01 10:00:00"): "%Y-%m-%d %H:%M:%S",
+}
+
+
+def parse_local_dates(
+    dates: pd.Series | np.ndarray, tz: str | None = None
+) -> np.ndarray:
+    """
+    Parses dates to their local wall-clock time.
+
+    HealthKit dates ("2023-01-01 23:30:00 +0100") are parsed with an explicit
+    format from their first 19 characters, ignoring the offset, so that a record
+    at 23:30 local time keeps its local hour and date. Dates without a time
+    ("2023-01-01", e.g. dateComponents) are parsed as midnight. Already parsed
+    dates keep the wall-clock time of their timezone.
+
+    Parameters
+    ----------
+    dates : pd.Series | np.ndarray
+        Date strings or parsed dates.
+    tz : str | None, optional
+        Timezone (e.g. "Europe/Berlin") to convert dates with an offset or a
+        timezone to before taking their wall-clock time. Needed for the dates of
+        ``WatchReader``, which are UTC. By default dates keep their own offset.
+
+    Returns
+    -------
+    np.ndarray
+        ``datetime64[s]`` array, missing dates are NaT.
+    """
+    dates = pd.Series(dates)
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        if dates.dt.tz is not None:
+            if tz is not None:
+                dates = dates.dt.tz_convert(tz)
+            dates = dates.dt.tz_localize(None)
+        return dates.to_numpy(dtype="datetime64[s]")
+
+    # Exports repeat dates a lot (dateComponents, samples of the same minute), so
+    # only the distinct values are parsed. Truncating to 19 characters drops the
+    # offset of HealthKit dates and keeps the local time.
+    codes, uniques = pd.factorize(dates)
+    local = np.asarray(uniques, dtype="U19")
+    lengths = np.unique(np.char.str_len(local))
+    date_format = "ISO8601"
+    if len(lengths) == 1 and lengths[0] in _LOCAL_DATE_FORMATS:
+        date_format = _LOCAL_DATE_FORMATS[lengths[0]]
+    parsed = pd.to_datetime(local, format=date_format).to_numpy(dtype="datetime64[s]")
+    if tz is not None:
+        # HealthKit dates with an offset, dates without one are already local
+        lengths = np.char.str_len(np.asarray(uniques, dtype=str))
+        has_offset = lengths == len("2023-01-01 10:00:00 +0100")
+        if has_offset.any():
+            parsed[has_offset] = (
+                pd.to_datetime(
+                    uniques[has_offset], format="%Y-%m-%d %H:%M:%S %z", utc=True
+                )
+                .tz_convert(tz)
+                .tz_localize(None)
+                .to_numpy(dtype="datetime64[s]")
+            )
+    # missing dates have code -1 and pick the NaT at the end
+    return np.append(parsed, np.datetime64("NaT", "s"))[codes]
+
+
+def _with_missing(values: np.ndarray, missing: np.ndarray) -> np.ndarray:
+    if not missing.any():
+        return values
+    values = values.astype(np.float64)
+    values[missing] = np.nan
+    return values
+
+
+def date_features(
+    dates: pd.Series | np.ndarray,
+    features: List[str] | None = None,
+    tz: str | None = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Calendar features of dates, computed with array arithmetic on the local time.
+
+    Parameters
+    ----------
+    dates : pd.Series | np.ndarray
+        HealthKit date strings or parsed dates, see ``parse_local_dates``.
+    features : List[str] | None, optional
+        Features to compute, by default all of ``DATE_FEATURES``:
+
+        - timeOfYear: 1 for winter (November to February), 0 for summer
+        - year, month (1 to 12)
+        - weekday: 0 for Monday to 6 for Sunday
+        - weekend: 1 for Saturday and Sunday, 0 otherwise
+        - hour: local hour of the day (0 to 23)
+        - localDate: the local calendar day as ``datetime64``
+    tz : str | None, optional
+        Timezone the local time is taken in, see ``parse_local_dates``
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        One array per feature. Integer features are small integers, or floats
+        with NaN if some dates are missing.
+    """
+    features = features if features is not None else DATE_FEATURES
+    unknown = set(features) - set(DATE_FEATURES)
+    if unknown:
+        raise ValueError(f"Unknown date features {sorted(unknown)}")
+
+    local = parse_local_dates(dates, tz=tz)
+    missing = np.isnat(local)
+    days = local.astype("datetime64[D]")
+    # NaT becomes the smallest integer, the results for it are masked below
+    day_numbers = days.astype(np.int64)
+    months = local.astype("datetime64[M]").astype(np.int64)
+    month = (months % 12 + 1).astype(np.int8)
+    # 1970-01-01 was a Thursday
+    weekday = ((day_numbers + 3) % 7).astype(np.int8)
+
+    values = {}
+    for feature in features:
+        if feature == "timeOfYear":
+            values[feature] = _TIME_OF_YEAR[month]
+        elif feature == "year":
+            values[feature] = (months // 12 + 1970).astype(np.int16)
+        elif feature == "month":
+            values[feature] = month
+        elif feature == "weekday":
+            values[feature] = weekday
+        elif feature == "weekend":
+            values[feature] = (weekday >= 5).astype(np.int8)
+        elif feature == "hour":
+            seconds = (local - days).astype(np.int64)
+            values[feature] = (seconds // 3600).astype(np.int8)
+        elif feature == "localDate":
+            values[feature] = days
+            continue
+        values[feature] = _with_missing(values[feature], missing)
+    return values
+
+
+def add_date_features(
+    df: pd.DataFrame,
+    date_column_name: str = "startDate",
+    features: List[str] | None = None,
+    inplace: bool = False,
+    tz: str | None = None,
+) -> pd.DataFrame:
+    """
+    Adds calendar features of a date column as new columns, see ``date_features``.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+
+    date_column_name : str, optional
+        The column to compute the features of, by default "startDate"
+    features : List[str] | None, optional
+        Features to add, by default all of ``DATE_FEATURES``
+    inplace : bool, optional
+        Add the columns to ``df`` itself instead of a new DataFrame. Without it
+        the data of ``df`` is not copied either, the new DataFrame shares it.
+    tz : str | None, optional
+        Timezone the local time is taken in, e.g. for the UTC dates of
+        ``WatchReader``, see ``parse_local_dates``
+
+    Returns
+    -------
+    pd.DataFrame
+        The DataFrame with the feature columns.
+    """
+    values = date_features(df[date_column_name], features, tz=tz)
+    if not inplace:
+        return df.assign(**values)
+    for feature, feature_values in values.items():
+        df[feature] = feature_values
+    return df
@@ -0,0 +1,117 @@
+from typing import Tuple
+
+import numpy as np
+
+# Meters per degree of latitude
+METERS_PER_DEGREE = 111_320.0
+
+
+def project_to_meters(
+    lon: np.ndarray, lat: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Projects coordinates to meters with an equirectangular projection.
+
+    The projection is centered on the mean latitude, which is accurate enough for
+    the extent of a single workout.
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    x = lon * np.cos(np.radians(np.nanmean(lat))) * METERS_PER_DEGREE
+    y = lat * METERS_PER_DEGREE
+    return x, y
+
+
+def path_length(lon: np.ndarray, lat: np.ndarray) -> float:
+    """Length of a track in meters, points with missing coordinates are skipped."""
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    valid = ~(np.isnan(lon) | np.isnan(lat))
+    if valid.sum() < 2:
+        return 0.0
+    x, y = project_to_meters(lon[valid], lat[valid])
+    return float(np.hypot(np.diff(x), np.diff(y)).sum())
+
+
+def _segment_distances(
+    x: np.ndarray, y: np.ndarray, first: int, last: int
+) -> np.ndarray:
+    """Distances of the points between ``first`` and ``last`` to the segment between them."""
+    px, py = x[first + 1 : last], y[first + 1 : last]
+    dx, dy = x[last] - x[first], y[last] - y[first]
+    length = dx * dx + dy * dy
+    if length == 0:
+        return np.hypot(px - x[first], py - y[first])
+    t = np.clip(((px - x[first]) * dx + (py - y[first]) * dy) / length, 0, 1)
+    return np.hypot(px - (x[first] + t * dx), py - (y[first] + t * dy))
+
+
+def simplification_tolerances(lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+    """
+    The largest Douglas-Peucker tolerance in meters at which each point is kept.
+
+    Douglas-Peucker is run once down to every point, recording the distance at
+    which each point splits its segment, capped by the distance of the point that
+    created the segment. Simplifying with any tolerance then means keeping the
+    points whose value is larger than the tolerance, which gives exactly the
+    Douglas-Peucker result for that tolerance.
+
+    Parameters
+    ----------
+    lon : np.ndarray
+        Longitudes of the track.
+    lat : np.ndarray
+        Latitudes of the track.
+
+    Returns
+    -------
+    np.ndarray
+        One tolerance per point, ``inf`` for the first and last valid point and 0
+        for points with missing coordinates.
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    tolerances = np.zeros(len(lon))
+    valid = np.flatnonzero(~(np.isnan(lon) | np.isnan(lat)))
+    if len(valid) == 0:
+        return tolerances
+
+    x, y = project_to_meters(lon[valid], lat[valid])
+    valid_tolerances = np.zeros(len(valid))
+    valid_tolerances[[0, -1]] = np.inf
+    segments = [(0, len(valid) - 1, np.inf)]
+    while segments:
+        first, last, parent = segments.pop()
+        if last - first < 2:
+            continue
+        distances = _segment_distances(x, y, first, last)
+        split = first + 1 + int(np.argmax(distances))
+        tolerance = min(distances[split - first - 1], parent)
+        valid_tolerances[split] = tolerance
+        segments.append((first, split, tolerance))
+        segments.append((split, last, tolerance))
+
+    tolerances[valid] = valid_tolerances
+    return tolerances
+
+
+def simplify_polyline(lon: np.ndarray, lat: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Simplifies a track with Douglas-Peucker.
+
+    Parameters
+    ----------
+    lon : np.ndarray
+        Longitudes of the track.
+    lat : np.ndarray
+        Latitudes of the track.
+    tolerance : float
+        Largest distance in meters a removed point may have from the simplified
+        track.
+
+    Returns
+    -------
+    np.ndarray
+        Positions of the points that are kept.
+    """
+    return np.flatnonzero(simplification_tolerances(lon, lat) > tolerance)
@@ -1,56 +1,61 @@
+import numpy as np
 import pandas as pd
 
-skip_slow_tests = True
-
+from .constants import MONTH_TIME_OF_YEAR_MAPPING  # used to be defined here
+from .features import date_features
 
-MONTH_TIME_OF_YEAR_MAPPING = {
-    1: 1,
-    2: 1,
-    3: 0,
-    4: 0,
-    5: 0,
-    6: 0,
-    7: 0,
-    8: 0,
-    9: 0,
-    10: 0,
-    11: 1,
-    12: 1,
-}
+skip_slow_tests = True
 
 
 def add_date_components_to(
-    df: pd.DataFrame, date_column_name: str = "dateComponents"
+    df: pd.DataFrame,
+    date_column_name: str = "dateComponents",
+    inplace: bool = False,
+    tz: str | None = None,
+    compact: bool = False,
 ) -> pd.DataFrame:
     """Uses the date_column_name to create new columns for year, month, weekday, weekend and timeOfYear.
     Weekday is encoded as 0 for Monday, 1 for Tuesday, etc.
     Weekend is encoded as 0 for weekdays and 1 for weekends.
     TimeOfYear is encoded as 1 for winter and 0 for summer.
 
+    The features are computed on the local date, see ``add_date_features``.
+
     Parameters
     ----------
     df : pd.DataFrame
 
     date_column_name : str, optional
         The column name to use to extract the date values, by default "dateComponents"
+    inplace : bool, optional
+        Add the columns to df itself, by default False
+    tz : str | None, optional
+        Timezone the local date is taken in, by default the offset of the dates
+    compact : bool, optional
+        Keep the small integer types of ``date_features`` instead of int64, by
+        default False
 
     Returns
     -------
     pd.DataFrame
         The original dataframe with the new columns added.
     """
-
-    df = df.copy()
-    date_column = df[date_column_name]
-    date_column = pd.to_datetime(date_column)
-    df["timeOfYear"] = date_column.dt.month.map(
-        lambda month: MONTH_TIME_OF_YEAR_MAPPING[month]
+    values = date_features(
+        df[date_column_name],
+        features=["timeOfYear", "year", "month", "weekday", "weekend"],
+        tz=tz,
     )
-    df["year"] = date_column.dt.year
-    df["month"] = date_column.dt.month
-    df["weekday"] = date_column.dt.day_of_week
-    df["weekend"] = df["weekday"].map(lambda weekday: 0 if weekday not in [5, 6] else 1)
-
+    if not compact:
+        values = {
+            feature: feature_values.astype(np.int64)
+            if np.issubdtype(feature_values.dtype, np.integer)
+            else feature_values
+            for feature, feature_values in values.items()
+        }
+    if not inplace:
+        return df.assign(**values)
+    for feature, feature_values in values.items():
+        df[feature] = feature_values
     return df
 
 
@@ -1 +1,3 @@
+from .heatmap import *
+from .thumbnails import *
 from .workout_animation import *
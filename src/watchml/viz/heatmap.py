@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Iterable
+from typing import List
+from typing import Tuple
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from watchml.data import WorkoutRoute
+    from watchml.file import WatchReader
+
+HEATMAP_STATISTICS = ["count", "sum", "mean"]
+# degrees added on both sides of bounds that span no longitude or latitude, ~50 m
+BOUNDS_PADDING = 0.0005
+
+
+class RouteHeatmap:
+    """A fixed-size 2-D histogram of route points.
+
+    Points are added one route at a time, so only the counts (and the sum of the
+    weights) per cell are kept in memory, never the routes themselves. Points are
+    binned with ``np.bincount`` in batches of at least as many points as the grid
+    has cells, so building the heatmap is linear in the number of points.
+
+    Cells are square in meters: the longer side of the bounds gets ``width``
+    cells and the shorter one follows from the aspect of the bounds at their mean
+    latitude. Row 0 is the northern edge.
+    """
+
+    def __init__(
+        self,
+        bounds: Tuple[float, float, float, float],
+        width: int = 1024,
+        height: int | None = None,
+    ):
+        """
+        Parameters
+        ----------
+        bounds : Tuple[float, float, float, float]
+            (min_lon, min_lat, max_lon, max_lat) of the area. Points outside are
+            ignored. Bounds that span no longitude or latitude (a single point or
+            a route going due north) are padded by ``BOUNDS_PADDING`` degrees.
+        width : int, optional
+            Number of cells from west to east if ``height`` is given, otherwise
+            the number of cells along the longer side of the bounds, by default
+            1024
+        height : int | None, optional
+            Number of cells from south to north, by default derived so that
+            cells are square
+        """
+        min_lon, min_lat, max_lon, max_lat = bounds = _padded_bounds(bounds)
+        if height is None:
+            lon_extent = (max_lon - min_lon) * np.cos(
+                np.radians((min_lat + max_lat) / 2)
+            )
+            lat_extent = max_lat - min_lat
+            if lat_extent > lon_extent:
+                width, height = max(1, round(width * lon_extent / lat_extent)), width
+            else:
+                height = max(1, round(width * lat_extent / lon_extent))
+        self.bounds = bounds
+        self.width = width
+        self.height = height
+        self._counts = np.zeros(height * width, dtype=np.int64)
+        self._weights = np.zeros(height * width, dtype=np.float64)
+        self._pending: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._n_pending = 0
+        self.n_points = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"RouteHeatmap(bounds={self.bounds}, shape={self.shape}, "
+            f"points={self.n_points})"
+        )
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.height, self.width
+
+    @property
+    def counts(self) -> np.ndarray:
+        """Number of points per cell, flattened row by row."""
+        self._flush()
+        return self._counts
+
+    @property
+    def weights(self) -> np.ndarray:
+        """Sum of the weights per cell, flattened row by row."""
+        self._flush()
+        return self._weights
+
+    def _flush(self):
+        if not self._pending:
+            return
+        cells = np.concatenate([cells for cells, _ in self._pending])
+        weights = np.concatenate([weights for _, weights in self._pending])
+        n_cells = self.height * self.width
+        self._counts += np.bincount(cells, minlength=n_cells)
+        self._weights += np.bincount(cells, weights, minlength=n_cells)
+        self._pending = []
+        self._n_pending = 0
+
+    def add(
+        self, lon: np.ndarray, lat: np.ndarray, weights: np.ndarray | None = None
+    ) -> int:
+        """
+        Bins points into the heatmap.
+
+        Points with missing coordinates or weights and points outside the bounds
+        are skipped.
+
+        Returns
+        -------
+        int
+            Number of points that were binned.
+        """
+        min_lon, min_lat, max_lon, max_lat = self.bounds
+        lon = np.asarray(lon, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        col = np.floor((lon - min_lon) / (max_lon - min_lon) * self.width)
+        row = np.floor((max_lat - lat) / (max_lat - min_lat) * self.height)
+        # points on the eastern and southern edge belong to the last cell
+        col[lon == max_lon] = self.width - 1
+        row[lat == min_lat] = self.height - 1
+        # NaN coordinates fail both comparisons
+        inside = (col >= 0) & (col < self.width) & (row >= 0) & (row < self.height)
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)
+            inside &= ~np.isnan(weights)
+
+        cells = row[inside].astype(np.int64) * self.width + col[inside].astype(np.int64)
+        weights = weights[inside] if weights is not None else np.zeros(len(cells))
+        self._pending.append((cells, weights))
+        self._n_pending += len(cells)
+        self.n_points += len(cells)
+        # a bincount costs as much as the grid has cells, so points are only
+        # binned once at least that many are pending
+        if self._n_pending >= self.height * self.width:
+            self._flush()
+        return len(cells)
+
+    def add_route(self, route: WorkoutRoute, weight: str | None = None) -> int:
+        """Bins the points of a route, weighted by one of its columns if given."""
+        route_df = route.route_df
+        weights = route_df[weight] if weight is not None else None
+        return self.add(route_df["lon"], route_df["lat"], weights)
+
+    def add_routes(self, routes: Iterable[WorkoutRoute], weight: str | None = None):
+        for route in routes:
+            self.add_route(route, weight=weight)
+        return self
+
+    def values(self, statistic: str = "count") -> np.ndarray:
+        """
+        The heatmap as a (height, width) array.
+
+        Parameters
+        ----------
+        statistic : str, optional
+            ``"count"`` for the number of points per cell, ``"sum"`` for the sum
+            of the weights and ``"mean"`` for the mean weight (NaN for empty
+            cells), by default "count"
+        """
+        if statistic == "count":
+            values = self.counts
+        elif statistic == "sum":
+            values = self.weights
+        elif statistic == "mean":
+            with np.errstate(invalid="ignore", divide="ignore"):
+                values = np.where(self.counts > 0, self.weights / self.counts, np.nan)
+        else:
+            raise ValueError(
+                f"Unknown statistic {statistic}, use one of {HEATMAP_STATISTICS}"
+            )
+        return values.reshape(self.shape)
+
+    def save(
+        self,
+        path: Path | str,
+        statistic: str = "count",
+        cmap: str = "inferno",
+        log: bool | None = None,
+    ) -> Path:
+        """
+        Writes the heatmap as an array (``.npy``) or an image (e.g. ``.png``).
+
+        Images have one pixel per cell. Empty cells are transparent.
+
+        Parameters
+        ----------
+        path : Path | str
+            Output file.
+        statistic : str, optional
+            See ``values``, by default "count"
+        cmap : str, optional
+            Matplotlib colormap of the image, by default "inferno"
+        log : bool | None, optional
+            Color the image on a log scale, by default for counts and sums
+        """
+        path = Path(path)
+        values = self.values(statistic)
+        if path.suffix == ".npy":
+            np.save(path, values)
+            return path
+
+        from matplotlib import colormaps
+        from PIL import Image
+
+        log = log if log is not None else statistic != "mean"
+        filled = self.counts.reshape(self.shape) > 0
+        scaled = np.log1p(np.maximum(values, 0)) if log else values.astype(float)
+        scaled = np.where(filled, scaled, 0)
+        if filled.any():
+            low, high = scaled[filled].min(), scaled[filled].max()
+            scaled = (scaled - low) / (high - low) if high > low else filled * 1.0
+        rgba = colormaps[cmap](scaled, bytes=True)
+        rgba[~filled] = 0
+        Image.fromarray(rgba).save(path)
+        return path
+
+    @staticmethod
+    def from_reader(
+        reader: WatchReader,
+        bounds: Tuple[float, float, float, float] | None = None,
+        width: int = 1024,
+        weight: str | None = None,
+    ) -> RouteHeatmap:
+        """
+        Builds the heatmap of every route in the cache, reading one route at a time.
+
+        Parameters
+        ----------
+        reader : WatchReader
+            Reader of the cache.
+        bounds : Tuple[float, float, float, float] | None, optional
+            (min_lon, min_lat, max_lon, max_lat) of the area, by default the
+            bounds of all routes. They are taken from the route summaries in
+            routes_meta, or found with a first pass over the routes if the cache
+            has none.
+        width : int, optional
+            See ``RouteHeatmap``, by default 1024
+        weight : str | None, optional
+            Route column to weight the points with, e.g. "speed" or "elevation",
+            by default None
+        """
+        start = time.perf_counter()
+        # routes that failed to parse have no points to bin
+        routes_meta = reader.routes_meta(written=True)
+        uuids = (
+            list(routes_meta["workout_uuid"]) if "workout_uuid" in routes_meta else []
+        )
+        if not uuids:
+            raise ValueError("There are no routes in the cache")
+
+        columns = ["lon", "lat"] + ([weight] if weight is not None else [])
+        if bounds is None:
+            bounds = _summary_bounds(routes_meta)
+        if bounds is None:
+            bounds = _scan_bounds(reader, uuids)
+
+        heatmap = RouteHeatmap(bounds, width=width)
+        for uuid in uuids:
+            route_df = reader.route(uuid, columns=columns)
+            heatmap.add(
+                route_df["lon"],
+                route_df["lat"],
+                route_df[weight] if weight is not None else None,
+            )
+
+        print(
+            f"[Route Heatmap]\tBinned {heatmap.n_points} points of {len(uuids)} "
+            f"routes in {time.perf_counter() - start:.1f}s"
+        )
+        return heatmap
+
+
+def _padded_bounds(
+    bounds: Tuple[float, float, float, float]
+) -> Tuple[float, float, float, float]:
+    min_lon, min_lat, max_lon, max_lat = (float(b) for b in bounds)
+    if not (max_lon >= min_lon and max_lat >= min_lat):
+        raise ValueError(f"Bounds {bounds} do not span an area")
+    if max_lon == min_lon:
+        min_lon, max_lon = min_lon - BOUNDS_PADDING, max_lon + BOUNDS_PADDING
+    if max_lat == min_lat:
+        min_lat, max_lat = min_lat - BOUNDS_PADDING, max_lat + BOUNDS_PADDING
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def _summary_bounds(routes_meta) -> Tuple[float, float, float, float] | None:
+    keys = ["min_lon", "min_lat", "max_lon", "max_lat"]
+    if any(key not in routes_meta for key in keys):
+        return None
+    # routes without points have no bounds and are skipped by min and max
+    bounds = (
+        routes_meta["min_lon"].min(),
+        routes_meta["min_lat"].min(),
+        routes_meta["max_lon"].max(),
+        routes_meta["max_lat"].max(),
+    )
+    return None if np.isnan(bounds).any() else bounds
+
+
+def _scan_bounds(reader: WatchReader, uuids) -> Tuple[float, float, float, float]:
+    bounds = [np.inf, np.inf, -np.inf, -np.inf]
+    for uuid in uuids:
+        route_df = reader.route(uuid, columns=["lon", "lat"])
+        if route_df[["lon", "lat"]].notna().any(axis=None):
+            bounds[0] = min(bounds[0], route_df["lon"].min())
+            bounds[1] = min(bounds[1], route_df["lat"].min())
+            bounds[2] = max(bounds[2], route_df["lon"].max())
+            bounds[3] = max(bounds[3], route_df["lat"].max())
+    return tuple(bounds)
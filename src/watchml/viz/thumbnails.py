@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Tuple
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from watchml.data import ECG
+    from watchml.data import WorkoutRoute
+
+THUMBNAIL_MANIFEST = "thumbnails.json"
+# thumbnails per worker whose points are held in memory at once
+THUMBNAIL_BATCH_SIZE = 64
+
+
+@dataclass
+class ThumbnailConfig:
+    """Config for the thumbnails
+
+    Parameters
+    ----------
+    fig_size : Tuple[float, float]
+        Size of a thumbnail in inches (width, height)
+    dpi : int
+        Resolution of the thumbnails
+    max_points : int | None
+        Routes and ECGs with more points are thinned out by keeping every n-th
+        point, ``None`` plots every point
+    tolerance : float | None
+        Douglas-Peucker tolerance in meters the routes are simplified with before
+        plotting. Slower than ``max_points`` but keeps the shape more faithfully.
+    line_width : float
+        Width of the plotted line
+    """
+
+    fig_size: Tuple[float, float] = (3, 3)
+    dpi: int = 100
+    max_points: int | None = 1000
+    tolerance: float | None = None
+    line_width: float = 1.0
+
+
+@dataclass
+class _Thumbnail:
+    path: Path
+    title: str
+    x: np.ndarray
+    y: np.ndarray
+
+
+@dataclass
+class _ThumbnailJob:
+    """A chunk of thumbnails rendered by one worker, see ``_render_thumbnails``."""
+
+    kind: str
+    config: ThumbnailConfig
+    thumbnails: List[_Thumbnail]
+
+
+def _axis_labels(kind: str) -> Tuple[str, str]:
+    if kind == "elevation":
+        return "Minutes", "Elevation (m)"
+    if kind == "ecg":
+        return "Seconds", "µV"
+    return "", ""
+
+
+def _setup_axes(ax, kind: str, config: ThumbnailConfig):
+    (line,) = ax.plot([], [], linewidth=config.line_width)
+    if kind == "route":
+        ax.set_aspect("equal", adjustable="datalim")
+        ax.set_axis_off()
+    else:
+        x_label, y_label = _axis_labels(kind)
+        ax.set_xlabel(x_label)
+        ax.set_ylabel(y_label)
+    return line
+
+
+def _draw(ax, line, thumbnail: _Thumbnail):
+    line.set_data(thumbnail.x, thumbnail.y)
+    ax.relim()
+    ax.autoscale_view()
+    ax.set_title(thumbnail.title, fontsize="small")
+
+
+def _is_clipped(fig, ax) -> bool:
+    """Whether the labels of the last drawn thumbnail reach outside the figure."""
+    bbox = ax.get_tightbbox(fig.canvas.get_renderer())
+    return (
+        bbox.x0 < 0
+        or bbox.y0 < 0
+        or bbox.x1 > fig.bbox.width
+        or bbox.y1 > fig.bbox.height
+    )
+
+
+def _render_thumbnails(job: _ThumbnailJob) -> int:
+    """Renders thumbnails without pyplot, reusing a single figure and line."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=job.config.fig_size, layout="tight")
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    line = _setup_axes(ax, job.kind, job.config)
+    for thumbnail in job.thumbnails:
+        _draw(ax, line, thumbnail)
+        fig.savefig(thumbnail.path, dpi=job.config.dpi)
+        # The tight layout is as expensive as drawing, so the margins of the last
+        # layout are kept until a thumbnail's title or tick labels don't fit them.
+        if fig.get_layout_engine() is None and _is_clipped(fig, ax):
+            fig.set_layout_engine("tight")
+            fig.savefig(thumbnail.path, dpi=job.config.dpi)
+        fig.set_layout_engine(None)
+    fig.clear()
+    return len(job.thumbnails)
+
+
+def _route_thumbnail(
+    route: WorkoutRoute, kind: str, path: Path, config: ThumbnailConfig
+) -> _Thumbnail:
+    import pandas as pd
+    from watchml.utils.geo import project_to_meters
+    from watchml.utils.geo import simplify_polyline
+
+    route_df = route.route_df
+    if config.tolerance is not None:
+        route_df = route_df.iloc[
+            simplify_polyline(route_df["lon"], route_df["lat"], config.tolerance)
+        ]
+    route_df = route_df.iloc[_stride(len(route_df), config.max_points)]
+    title = str(route.uuid)
+    if "time" in route_df and len(route_df):
+        title = str(pd.Timestamp(route_df["time"].min()).date())
+
+    if kind == "elevation":
+        times = pd.to_datetime(route_df["time"])
+        minutes = (times - times.min()).dt.total_seconds().to_numpy() / 60
+        return _Thumbnail(path, title, minutes, route_df["elevation"].to_numpy())
+
+    x, y = project_to_meters(route_df["lon"], route_df["lat"])
+    return _Thumbnail(path, title, x, y)
+
+
+def _stride(n_points: int, max_points: int | None) -> slice:
+    if max_points is None or n_points <= max_points:
+        return slice(None)
+    return slice(None, None, -(-n_points // max_points))
+
+
+def _ecg_thumbnail(ecg: ECG, path: Path, config: ThumbnailConfig) -> _Thumbnail:
+    sample_rate = str(ecg.meta_data.get("Sample Rate", "")).split(" ")[0]
+    try:
+        sample_rate = float(sample_rate)
+    except ValueError:
+        sample_rate = 1.0
+    rows = _stride(len(ecg.values), config.max_points)
+    seconds = np.arange(len(ecg.values))[rows] / sample_rate
+    return _Thumbnail(path, ecg.name, seconds, np.asarray(ecg.values[rows]))
+
+
+def _route_signature(route: WorkoutRoute) -> str:
+    # both come from the route summary for lazy routes, without reading points
+    return f"{route.n_points}:{route.bounds}"
+
+
+def _ecg_signature(ecg: ECG) -> str:
+    return f"{len(ecg.values)}:{ecg.date}"
+
+
+class ThumbnailRenderer:
+
+    config: ThumbnailConfig = ThumbnailConfig()
+
+    def __init__(self, config: ThumbnailConfig = None):
+        self.config = config if config else ThumbnailConfig()
+
+    def set_config(self, config: ThumbnailConfig):
+        self.config = config
+
+    def _signature(self, kind: str, source_signature: str) -> str:
+        return json.dumps(
+            {"kind": kind, "source": source_signature, **asdict(self.config)}
+        )
+
+    def _render_batch(
+        self,
+        kind: str,
+        thumbnails: List[_Thumbnail],
+        workers: int,
+        executor: ProcessPoolExecutor | None,
+    ) -> int:
+        if not thumbnails:
+            return 0
+        n_chunks = max(1, min(len(thumbnails), workers))
+        chunk_size = -(-len(thumbnails) // n_chunks)
+        jobs = [
+            _ThumbnailJob(kind, self.config, thumbnails[i : i + chunk_size])
+            for i in range(0, len(thumbnails), chunk_size)
+        ]
+        if executor is None or len(jobs) <= 1:
+            return sum(map(_render_thumbnails, jobs))
+        return sum(executor.map(_render_thumbnails, jobs))
+
+    def _render(
+        self,
+        kind: str,
+        items: Iterable,
+        output_path: Path | str,
+        name,
+        source_signature,
+        thumbnail,
+        workers: int | None,
+        overwrite: bool,
+    ) -> List[Path]:
+        start = time.perf_counter()
+        output_path = Path(output_path)
+        output_path.mkdir(parents=True, exist_ok=True)
+        workers = workers if workers is not None else os.cpu_count() or 1
+
+        manifest_path = output_path / THUMBNAIL_MANIFEST
+        manifest: Dict[str, str] = {}
+        if manifest_path.exists():
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        paths, pending, signatures, n_rendered = [], [], {}, 0
+        try:
+            for item in items:
+                path = output_path / f"{name(item)}_{kind}.png"
+                signature = self._signature(kind, source_signature(item))
+                paths.append(path)
+                if (
+                    not overwrite
+                    and path.exists()
+                    and manifest.get(path.name) == signature
+                ):
+                    continue
+                # routes are only read here, so skipped ones never load their points
+                pending.append(thumbnail(item, path))
+                signatures[path.name] = signature
+                if len(pending) >= THUMBNAIL_BATCH_SIZE * workers:
+                    n_rendered += self._render_batch(kind, pending, workers, executor)
+                    manifest.update(signatures)
+                    pending, signatures = [], {}
+            n_rendered += self._render_batch(kind, pending, workers, executor)
+            manifest.update(signatures)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            with open(manifest_path, "w") as f:
+                json.dump(manifest, f, indent=1)
+
+        print(
+            f"[Thumbnails]\tRendered {n_rendered} {kind} thumbnails in "
+            f"{time.perf_counter() - start:.1f}s, "
+            f"{len(paths) - n_rendered} were up to date"
+        )
+        return paths
+
+    def routes(
+        self,
+        routes: Iterable[WorkoutRoute],
+        output_path: Path | str,
+        kind: str = "route",
+        workers: int | None = None,
+        overwrite: bool = False,
+    ) -> List[Path]:
+        """
+        Writes a thumbnail of every route to ``output_path/<uuid>_<kind>.png``.
+
+        Thumbnails whose route and config did not change since they were written
+        are skipped (see ``thumbnails.json`` in the output folder). The others are
+        split across processes that each reuse one figure.
+
+        Parameters
+        ----------
+        routes : Iterable[WorkoutRoute]
+            Routes to render, lazy routes (see ``WatchReader.routes``) only read
+            their points if the thumbnail has to be rendered.
+        output_path : Path | str
+            Folder the thumbnails are written to.
+        kind : str, optional
+            ``"route"`` for the shape of the route or ``"elevation"`` for the
+            elevation over time, by default "route"
+        workers : int | None, optional
+            Number of worker processes. ``None`` uses all cpus and ``1`` renders in
+            the current process, by default None
+        overwrite : bool, optional
+            Render every thumbnail even if it is up to date, by default False
+
+        Returns
+        -------
+        List[Path]
+            Paths of the thumbnails in the order of the routes.
+        """
+        if kind not in ["route", "elevation"]:
+            raise ValueError(f"Unknown route thumbnail kind {kind}")
+        return self._render(
+            kind,
+            routes,
+            output_path,
+            name=lambda route: route.uuid,
+            source_signature=_route_signature,
+            thumbnail=lambda route, path: _route_thumbnail(
+                route, kind, path, self.config
+            ),
+            workers=workers,
+            overwrite=overwrite,
+        )
+
+    def ecgs(
+        self,
+        ecgs: Iterable[ECG],
+        output_path: Path | str,
+        workers: int | None = None,
+        overwrite: bool = False,
+    ) -> List[Path]:
+        """
+        Writes a thumbnail of every ECG to ``output_path/<name>_ecg.png``.
+
+        See ``routes`` for the parameters.
+        """
+        return self._render(
+            "ecg",
+            ecgs,
+            output_path,
+            name=lambda ecg: ecg.name,
+            source_signature=_ecg_signature,
+            thumbnail=lambda ecg, path: _ecg_thumbnail(ecg, path, self.config),
+            workers=workers,
+            overwrite=overwrite,
+        )
+
+    def small_multiples(
+        self,
+        routes: Iterable[WorkoutRoute],
+        path: Path | str,
+        kind: str = "route",
+        columns: int = 6,
+    ) -> Path:
+        """
+        Draws many routes as a grid of small plots into a single image.
+
+        Parameters
+        ----------
+        routes : Iterable[WorkoutRoute]
+            Routes to draw.
+        path : Path | str
+            Image file to write.
+        kind : str, optional
+            ``"route"`` or ``"elevation"``, by default "route"
+        columns : int, optional
+            Number of plots per row, by default 6
+        """
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        if kind not in ["route", "elevation"]:
+            raise ValueError(f"Unknown route thumbnail kind {kind}")
+        path = Path(path)
+        routes = list(routes)
+        if not routes:
+            raise ValueError("No routes to draw")
+        rows = -(-len(routes) // columns)
+        columns = min(columns, len(routes))
+        width, height = self.config.fig_size
+
+        fig = Figure(figsize=(width * columns, height * rows), layout="tight")
+        FigureCanvasAgg(fig)
+        axes = fig.subplots(rows, columns, squeeze=False).flatten()
+        for ax, route in zip(axes, routes):
+            line = _setup_axes(ax, kind, self.config)
+            _draw(ax, line, _route_thumbnail(route, kind, path, self.config))
+        for ax in axes[len(routes) :]:
+            ax.set_axis_off()
+        fig.savefig(path, dpi=self.config.dpi)
+        fig.clear()
+        return path
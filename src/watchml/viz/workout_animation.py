@@ -1,11 +1,23 @@
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import tempfile
+import time
 from abc import ABC
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
 from typing import Tuple
+from typing import TYPE_CHECKING
 
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
-from matplotlib import animation
-from mpl_toolkits.mplot3d.art3d import Line3DCollection
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from matplotlib import animation
 
 
 class AnimationConfig(ABC):
@@ -45,10 +57,21 @@ class WorkoutAnimationConfig(AnimationConfig):
         resolution: float = 0.08,
         color_on="elevation",
         rotate=True,
+        tolerance: float | None = None,
     ) -> None:
+        """Config for the workout animation
+
+        Parameters
+        ----------
+        tolerance : float | None, optional
+            If given, the route is simplified with Douglas-Peucker with this
+            tolerance in meters instead of keeping every n-th point according to
+            the resolution, by default None
+        """
         super().__init__(interval, fig_size, resolution)
         self.color_on = color_on
         self.rotate = rotate
+        self.tolerance = tolerance
 
     def set_color_on(self, color_on: str):
         self.color_on = color_on
@@ -56,6 +79,117 @@ class WorkoutAnimationConfig(AnimationConfig):
     def set_rotate(self, rotate: bool):
         self.rotate = rotate
 
+    def set_tolerance(self, tolerance: float | None):
+        self.tolerance = tolerance
+
+
+@dataclass
+class RenderStats:
+    frames: int
+    seconds: float
+
+    @property
+    def frames_per_second(self) -> float:
+        return self.frames / self.seconds if self.seconds > 0 else float("inf")
+
+
+@dataclass
+class _FrameJob:
+    """A chunk of frames rendered by one worker, see ``_render_frames``."""
+
+    segments: np.ndarray
+    colors: np.ndarray
+    limits: Tuple[Tuple[float, float], ...]
+    title: str
+    label: str
+    fig_size: Tuple[int, int]
+    dpi: int
+    rotate: bool
+    frames_path: Path
+    # (frame number, number of segments shown in the frame)
+    frames: List[Tuple[int, int]]
+
+
+def frame_schedule(
+    n_segments: int, fps: float, duration: float | None = None
+) -> List[int]:
+    """
+    Number of segments shown in each frame.
+
+    One frame per segment, unless that exceeds ``duration * fps`` frames. Then the
+    segments are spread evenly over the capped number of frames.
+    """
+    n_frames = n_segments
+    if duration is not None:
+        n_frames = max(1, min(n_segments, int(duration * fps)))
+    return [round((i + 1) * n_segments / n_frames) for i in range(n_frames)]
+
+
+def _render_frames(job: _FrameJob) -> int:
+    """Renders frames to png files without pyplot, reusing a single figure."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from mpl_toolkits.mplot3d.art3d import Line3DCollection
+
+    fig = Figure(figsize=job.fig_size)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111, projection="3d")
+    lc = Line3DCollection(job.segments[:1])
+    ax.add_collection3d(lc)
+    (x_min, x_max), (y_min, y_max), (z_min, z_max) = job.limits
+    ax.set_xlim(x_min, x_max)
+    ax.set_ylim(y_min, y_max)
+    ax.set_zlim(z_min, z_max)
+    ax.set_xlabel("Longitude")
+    ax.set_ylabel("Latitude")
+    ax.set_zlabel("Elevation")
+    ax.text2D(0.05, 0.95, "Color:" + job.label, transform=ax.transAxes)
+    ax.set_title(job.title)
+
+    for frame, n_segments in job.frames:
+        # slices are views, the segments and colors are never copied
+        lc.set_segments(job.segments[:n_segments])
+        lc.set_color(job.colors[:n_segments])
+        ax.view_init(10, n_segments / 5 if job.rotate else 0)
+        fig.savefig(job.frames_path / f"frame_{frame:06d}.png", dpi=job.dpi)
+    return len(job.frames)
+
+
+def _stitch_frames(frames_path: Path, n_frames: int, path: Path, fps: float):
+    frame_files = [frames_path / f"frame_{i:06d}.png" for i in range(n_frames)]
+    if path.suffix == ".gif":
+        from PIL import Image
+
+        images = [Image.open(file) for file in frame_files]
+        images[0].save(
+            path,
+            save_all=True,
+            append_images=images[1:],
+            duration=1000 / fps,
+            loop=0,
+        )
+        return
+
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError(f"ffmpeg is needed to write {path.suffix} files")
+    subprocess.run(
+        [
+            ffmpeg,
+            "-y",
+            "-loglevel",
+            "error",
+            "-framerate",
+            str(fps),
+            "-i",
+            str(frames_path / "frame_%06d.png"),
+            "-pix_fmt",
+            "yuv420p",
+            str(path),
+        ],
+        check=True,
+    )
+
 
 class WorkoutAnimation:
 
@@ -91,6 +225,8 @@ class WorkoutAnimation:
         return segments
 
     def __data_for_plotting(self) -> Tuple[pd.DataFrame]:
+        import pandas as pd
+
         title = pd.to_datetime(self.data["time"].iloc[0]).date()
         strip = int(1 / self.config.resolution)
         # x, y = self.__project_lonlat_to_xy(self.data["lon"], self.data["lat"])
@@ -98,11 +234,30 @@ class WorkoutAnimation:
         elevation = self.data["elevation"]
         s = self.data[self.config.color_on]
 
-        x, y, elevation, s = (x[::strip], y[::strip], elevation[::strip], s[::strip])
+        if self.config.tolerance is not None:
+            from watchml.utils.geo import simplify_polyline
+
+            rows = simplify_polyline(x.to_numpy(), y.to_numpy(), self.config.tolerance)
+            x, y, elevation, s = (
+                x.iloc[rows],
+                y.iloc[rows],
+                elevation.iloc[rows],
+                s.iloc[rows],
+            )
+        else:
+            x, y, elevation, s = (
+                x[::strip],
+                y[::strip],
+                elevation[::strip],
+                s[::strip],
+            )
 
         return x, y, elevation, s, title
 
     def plot_route(self):
+        import matplotlib.pyplot as plt
+        from mpl_toolkits.mplot3d.art3d import Line3DCollection
+
         x, y, elevation, s, title = self.__data_for_plotting()
 
         fig = plt.figure(figsize=self.config.fig_size)
@@ -127,7 +282,100 @@ class WorkoutAnimation:
 
         return fig, ax, lc, segments
 
+    def render(
+        self,
+        path: str | Path,
+        fps: float | None = None,
+        duration: float | None = None,
+        workers: int | None = None,
+        dpi: int = 100,
+    ) -> RenderStats:
+        """
+        Renders the animation headlessly, splitting the frames across processes.
+
+        Every worker renders a contiguous chunk of frames to png files with its own
+        figure. Segment colors are computed once up front. The frames are then
+        stitched in order.
+
+        Parameters
+        ----------
+        path : str | Path
+            Output file. ``.gif`` files are written with Pillow, other video
+            formats (e.g. ``.mp4``) with ffmpeg. A path without suffix is a folder
+            that receives the png frames.
+        fps : float | None, optional
+            Frames per second, by default ``1000 / interval`` of the config
+        duration : float | None, optional
+            Maximum length of the animation in seconds. Longer routes show several
+            segments per frame. By default every segment gets a frame.
+        workers : int | None, optional
+            Number of worker processes. ``None`` uses all cpus and ``1`` renders in
+            the current process, by default None
+        dpi : int, optional
+            Resolution of the frames, by default 100
+
+        Returns
+        -------
+        RenderStats
+            Number of frames and time it took to render them.
+        """
+        from matplotlib import colormaps
+        from matplotlib.colors import Normalize
+
+        start = time.perf_counter()
+        path = Path(path)
+        fps = fps if fps is not None else 1000 / self.config.interval
+        workers = workers if workers is not None else os.cpu_count() or 1
+
+        x, y, elevation, s, title = self.__data_for_plotting()
+        segments = self.__calculate_segments(x, y, elevation)
+        colors = colormaps["viridis"](Normalize(s.min(), s.max())(s.to_numpy()))
+        frames = list(enumerate(frame_schedule(len(segments), fps, duration)))
+        if not frames:
+            raise ValueError("A route needs at least two points to be rendered")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            frames_path = path if not path.suffix else Path(tmp)
+            frames_path.mkdir(parents=True, exist_ok=True)
+            n_chunks = max(1, min(len(frames), workers))
+            chunk_size = -(-len(frames) // n_chunks)
+            jobs = [
+                _FrameJob(
+                    segments=segments,
+                    colors=colors[: len(segments)],
+                    limits=(
+                        (x.min(), x.max()),
+                        (y.min(), y.max()),
+                        (elevation.min() - 30, elevation.max() + 30),
+                    ),
+                    title=str(title),
+                    label=self.config.color_on,
+                    fig_size=self.config.fig_size,
+                    dpi=dpi,
+                    rotate=self.config.rotate,
+                    frames_path=frames_path,
+                    frames=frames[i : i + chunk_size],
+                )
+                for i in range(0, len(frames), chunk_size)
+            ]
+            if workers <= 1 or len(jobs) <= 1:
+                list(map(_render_frames, jobs))
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(_render_frames, jobs))
+
+            if path.suffix:
+                _stitch_frames(frames_path, len(frames), path, fps)
+
+        stats = RenderStats(frames=len(frames), seconds=time.perf_counter() - start)
+        print(
+            f"[Workout Animation]\tRendered {stats.frames} frames in "
+            f"{stats.seconds:.1f}s ({stats.frames_per_second:.1f} frames/s)"
+        )
+        return stats
+
     def animate(self) -> animation.FuncAnimation:
+        from matplotlib import animation
 
         print("[Workout Animation]\tAnimating workout route...")
 
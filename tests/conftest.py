@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+from watchml.data import WorkoutRoute
+
+EXPORT_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE HealthData [
+<!ELEMENT HealthData (ExportDate,Me,(Record|Workout|ActivitySummary)*)>
+<!ATTLIST HealthData locale CDATA #REQUIRED>
+]>
+<HealthData locale="de_DE">
+ <ExportDate value="2023-01-03 10:00:00 +0100"/>
+ <Me HKCharacteristicTypeIdentifierDateOfBirth="1990-01-01" HKCharacteristicTypeIdentifierBiologicalSex="HKBiologicalSexMale" HKCharacteristicTypeIdentifierBloodType="HKBloodTypeNotSet" HKCharacteristicTypeIdentifierFitzpatrickSkinType="HKFitzpatrickSkinTypeNotSet" HKCharacteristicTypeIdentifierCardioFitnessMedicationsUse="None"/>
+ <Record type="HKQuantityTypeIdentifierHeartRate" sourceName="Watch" sourceVersion="9.1" device="Apple Watch" unit="count/min" creationDate="2023-01-01 10:00:05 +0100" startDate="2023-01-01 10:00:00 +0100" endDate="2023-01-01 10:00:00 +0100" value="62">
+  <MetadataEntry key="HKMetadataKeyHeartRateMotionContext" value="0"/>
+ </Record>
+ <Record type="HKQuantityTypeIdentifierHeartRate" sourceName="Watch" sourceVersion="9.1" device="Apple Watch" unit="count/min" creationDate="2023-01-02 10:00:05 +0100" startDate="2023-01-02 10:00:00 +0100" endDate="2023-01-02 10:00:00 +0100" value="71"/>
+ <Record type="HKQuantityTypeIdentifierStepCount" sourceName="iPhone" sourceVersion="16.1" unit="count" creationDate="2023-01-01 11:00:00 +0100" startDate="2023-01-01 10:30:00 +0100" endDate="2023-01-01 11:00:00 +0100" value="120"/>
+ <Workout workoutActivityType="HKWorkoutActivityTypeCycling" duration="10" durationUnit="min" sourceName="Watch" sourceVersion="9.1" creationDate="2023-01-02 12:10:00 +0100" startDate="2023-01-02 12:00:00 +0100" endDate="2023-01-02 12:10:00 +0100">
+  <WorkoutEvent type="HKWorkoutEventTypeSegment" date="2023-01-02 12:00:00 +0100" duration="5" durationUnit="min"/>
+  <WorkoutStatistics type="HKQuantityTypeIdentifierDistanceCycling" startDate="2023-01-02 12:00:00 +0100" endDate="2023-01-02 12:10:00 +0100" sum="3.2" unit="km"/>
+  <WorkoutMetadataEntry key="HKIndoorWorkout" value="0"/>
+  <WorkoutRoute sourceName="Watch" sourceVersion="9.1" creationDate="2023-01-02 12:10:00 +0100" startDate="2023-01-02 12:00:00 +0100" endDate="2023-01-02 12:10:00 +0100">
+   <FileReference path="/workout-routes/route_2023-01-02_12.10pm.gpx"/>
+  </WorkoutRoute>
+ </Workout>
+ <ActivitySummary dateComponents="2023-01-01" activeEnergyBurned="400" activeEnergyBurnedGoal="500" activeEnergyBurnedUnit="Cal"/>
+ <ActivitySummary dateComponents="2023-01-02" activeEnergyBurned="520" activeEnergyBurnedGoal="500" activeEnergyBurnedUnit="Cal"/>
+</HealthData>
+"""
+
+GPX_POINT = """   <trkpt lon="{lon}" lat="{lat}"><ele>{ele}</ele><time>{time}</time><extensions><speed>{speed}</speed><course>90.0</course><hAcc>1.5</hAcc><vAcc>1.0</vAcc></extensions></trkpt>
+"""
+
+GPX = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="Apple Health Export" xmlns="http://www.topografix.com/GPX/1/1">
+ <trk>
+  <name>Route 2023-01-02 12:10pm</name>
+  <trkseg>
+{points}  </trkseg>
+ </trk>
+</gpx>
+"""
+
+
+def gpx_for(n_points: int, lon: float = 8.0, lat: float = 49.0) -> str:
+    points = "".join(
+        GPX_POINT.format(
+            lon=lon + i * 0.0001,
+            lat=lat + i * 0.0001,
+            ele=100 + i,
+            time=f"2023-01-02T11:{i // 60:02d}:{i % 60:02d}Z",
+            speed=3.0 + i % 3,
+        )
+        for i in range(n_points)
+    )
+    return GPX.format(points=points)
+
+
+def make_track(lon, lat, uuid="track"):
+    return WorkoutRoute(
+        pd.DataFrame({"lon": lon, "lat": lat}), uuid=uuid, gpx_path=f"{uuid}.gpx"
+    )
+
+
+@pytest.fixture
+def export_path(tmp_path):
+    """A minimal Apple Health export folder with one workout route."""
+    data_path = tmp_path / "apple_health_export"
+    (data_path / "workout-routes").mkdir(parents=True)
+    (data_path / "Export.xml").write_text(EXPORT_XML)
+    (data_path / "workout-routes" / "route_2023-01-02_12.10pm.gpx").write_text(
+        gpx_for(5)
+    )
+    return data_path
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from watchml.file import RecordBuckets
+
+
+def utc(*dates):
+    return pd.Series(pd.to_datetime(list(dates))).dt.tz_localize("UTC")
+
+
+def test_intervals_are_split_proportionally():
+    buckets = RecordBuckets("1h")
+    buckets.add(
+        utc("2023-01-01 10:30", "2023-01-01 11:15", "2023-01-01 13:10"),
+        utc("2023-01-01 12:00", "2023-01-01 11:15", None),
+        [90, 5, 7],
+    )
+    df = buckets.to_frame()
+
+    assert df.index.tolist() == list(
+        pd.date_range("2023-01-01 10:00", periods=4, freq="h", tz="UTC")
+    )
+    assert df["sum"].tolist() == pytest.approx([30, 65, 0, 7])
+    assert df["sum"].sum() == pytest.approx(102)
+    assert df["count"].tolist() == [1, 2, 0, 1]
+    assert df["mean"].tolist()[:2] == [90, 47.5]
+    assert np.isnan(df["mean"].iloc[2])
+    assert df["min"].tolist()[:2] == [90, 5]
+    assert df["max"].tolist()[:2] == [90, 90]
+
+    assert len(buckets.to_frame(fill=False)) == 3
+    with pytest.raises(ValueError):
+        buckets.to_frame(["median"])
+
+
+def test_chunks_are_merged():
+    starts = utc(*pd.date_range("2023-01-01", periods=10, freq="30min"))
+    chunked = RecordBuckets("1h")
+    for i in range(0, 10, 3):
+        chunked.add(starts[i : i + 3], None, np.arange(i, min(i + 3, 10)))
+    whole = RecordBuckets("1h")
+    whole.add(starts, None, np.arange(10))
+    pd.testing.assert_frame_equal(chunked.to_frame(), whole.to_frame())
+    assert chunked.to_frame()["count"].tolist() == [2] * 5
+
+
+def test_local_days():
+    buckets = RecordBuckets("1D", tz="Europe/Berlin")
+    buckets.add(utc("2023-01-01 23:30"), None, ["3"])
+    df = buckets.to_frame(["sum"])
+    assert df.index.tolist() == [pd.Timestamp("2023-01-02")]
+    assert df["sum"].tolist() == [3]
+
+
+def test_invalid_records_are_skipped():
+    buckets = RecordBuckets("1min")
+    assert buckets.add(utc("2023-01-01", None), None, ["HKCategoryValue", 1]) == 0
+    assert buckets.to_frame().empty
@@ -2,6 +2,7 @@ import os
 
 import pandas as pd
 from watchml.file.file import FileSystemManager
+from watchml.file.formats import CacheFormat
 
 
 def test_scaffold_paths(tmp_path):
@@ -24,3 +25,17 @@ def test_delete_files_in(tmp_path):
     FileSystemManager.to_processed(tmp_path, df, "test")
     FileSystemManager.delete_files_in(tmp_path)
     assert not os.path.exists(path)
+
+
+def test_read_processed_parquet(tmp_path):
+    df = pd.DataFrame(
+        {"value": ["1.5", "2"], "startDate": ["2023-01-01 10:00:00 +0100"] * 2}
+    )
+    FileSystemManager.to_processed(tmp_path, df, "test", CacheFormat.PARQUET)
+    assert os.path.exists(tmp_path / "test.parquet")
+
+    read_df = FileSystemManager.read_processed(
+        tmp_path, "test", CacheFormat.PARQUET, columns=["value"]
+    )
+    assert list(read_df.columns) == ["value"]
+    assert read_df["value"].tolist() == [1.5, 2.0]
@@ -0,0 +1,48 @@
+import pandas as pd
+from watchml.file.formats import compact_record_dtypes
+from watchml.file.formats import format_hk_dates
+from watchml.file.formats import format_hk_values
+
+
+def test_compact_record_dtypes():
+    record_df = pd.DataFrame(
+        {
+            "type": ["HKQuantityTypeIdentifierHeartRate"] * 2,
+            "unit": ["count/min"] * 2,
+            "value": ["62", "71.5"],
+            "sourceName": ["Watch"] * 2,
+            "startDate": ["2023-01-01 10:00:00 +0100", "2023-07-01 10:00:00 +0200"],
+        }
+    )
+    compact_df = compact_record_dtypes(record_df)
+
+    assert record_df["value"].tolist() == ["62", "71.5"]
+    assert compact_df["value"].tolist() == [62.0, 71.5]
+    assert compact_df["type"].dtype == "category"
+    assert compact_df["sourceName"].dtype == "category"
+    assert str(compact_df["startDate"].dt.tz) == "UTC"
+    assert compact_df["startDate"][1] == pd.Timestamp("2023-07-01 08:00", tz="UTC")
+
+
+def test_compact_record_dtypes_category_values():
+    record_df = pd.DataFrame(
+        {"value": ["HKCategoryValueSleepAnalysisAsleepCore", "1", None]}
+    )
+    compact_record_dtypes(record_df, inplace=True)
+    assert record_df["value"].dtype == "category"
+
+
+def test_format_hk_dates_keeps_offsets():
+    dates = pd.Series(["2023-01-01 10:00:00 +0100", None, "2023-07-01 10:00:00 -0700"])
+    compact_df = compact_record_dtypes(
+        pd.DataFrame({"startDate": dates}), keep_offsets=True
+    )
+    assert (
+        format_hk_dates(
+            compact_df["startDate"], compact_df["startDateOffset"]
+        ).tolist()[::2]
+        == dates.tolist()[::2]
+    )
+    assert format_hk_dates(compact_df["startDate"])[0] == "2023-01-01 09:00:00 +0000"
+    values = format_hk_values(pd.Series([62.0, 0.1, None]))
+    assert values[:2].tolist() == ["62", "0.1"] and pd.isna(values[2])
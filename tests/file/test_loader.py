@@ -10,3 +10,18 @@ def test_load_export_root():
     wl = WatchLoader(data_path=Path("tests") / "sample_data")
     root = wl.load_export_root()
     assert root.tag == "HealthData"
+
+
+def test_iter_export_elements(export_path):
+    wl = WatchLoader(data_path=export_path)
+    elements = wl.iter_export_elements()
+    root = next(elements)
+    assert root.tag == "HealthData"
+    assert root.attrib["locale"] == "de_DE"
+
+    tags = [elem.tag for elem in elements]
+    assert tags.count("Record") == 3
+    assert tags.count("Workout") == 1
+    assert tags.count("ActivitySummary") == 2
+    # elements are detached from the root once consumed
+    assert len(root) == 0
@@ -1,3 +1,10 @@
+import os
+
+import pytest
+from watchml.file import CacheFormat
+from watchml.file import WatchManager
+from watchml.file import WatchReader
+
 # def test_delete_old_data():
 #     wm = WatchManager(
 #         data_path=Path("tests") / "sample_data",
@@ -14,3 +21,94 @@
 #     )
 #     wm.update_cache_info()
 #     assert (Path("tests") / "sample_data/cache/cache.json").exists()
+
+
+NEW_RECORD = """ <Record type="HKQuantityTypeIdentifierHeartRate" sourceName="Watch" sourceVersion="9.1" device="Apple Watch" unit="count/min" creationDate="2023-01-03 09:00:05 +0100" startDate="2023-01-03 09:00:00 +0100" endDate="2023-01-03 09:00:00 +0100" value="80"/>
+</HealthData>"""
+
+
+@pytest.mark.parametrize("cache_format", [CacheFormat.CSV, CacheFormat.PARQUET])
+def test_reload_data_incremental(export_path, tmp_path, cache_format):
+    cache_path = tmp_path / "cache"
+    wm = WatchManager(
+        data_path=export_path, cache_path=cache_path, cache_format=cache_format
+    )
+    wm.reload_data()
+    state = wm.load_cache_state()
+    assert "HKQuantityTypeIdentifierHeartRate" in state.record_high_water_marks
+    assert len(state.workout_fingerprints) == 1
+
+    export_xml = (export_path / "Export.xml").read_text()
+    (export_path / "Export.xml").write_text(
+        export_xml.replace("</HealthData>", NEW_RECORD)
+    )
+    wm.reload_data()
+
+    reader = WatchReader(data_path=export_path, cache_path=cache_path)
+    heart_rate = reader.record("HKQuantityTypeIdentifierHeartRate")
+    assert heart_rate["value"].tolist() == [62, 71, 80]
+    assert len(reader.record("HKQuantityTypeIdentifierStepCount")) == 1
+    # the known workout keeps its uuid and its route isn't written again
+    assert reader.workouts()["uuid"].tolist() == list(
+        state.workout_fingerprints.values()
+    )
+    assert len(os.listdir(cache_path / "routes")) == 1
+
+    wm.reload_data(incremental=False)
+    assert len(reader.record("HKQuantityTypeIdentifierHeartRate")) == 3
+
+
+def test_reload_data_retries_failed_routes(export_path, tmp_path):
+    cache_path = tmp_path / "cache"
+    gpx_path = export_path / "workout-routes" / "route_2023-01-02_12.10pm.gpx"
+    gpx = gpx_path.read_text()
+    gpx_path.write_text("not a gpx file")
+    wm = WatchManager(data_path=export_path, cache_path=cache_path)
+    wm.reload_data()
+    assert wm.load_cache_state().workout_fingerprints == {}
+    assert os.listdir(cache_path / "routes") == []
+
+    gpx_path.write_text(gpx)
+    wm.reload_data()
+    assert len(wm.load_cache_state().workout_fingerprints) == 1
+    assert len(os.listdir(cache_path / "routes")) == 1
+
+
+def test_reload_data_keeps_records_created_in_the_mark_second(export_path, tmp_path):
+    cache_path = tmp_path / "cache"
+    wm = WatchManager(data_path=export_path, cache_path=cache_path)
+    wm.reload_data()
+
+    # created in the same second as the latest cached heart rate record
+    export_xml = (export_path / "Export.xml").read_text()
+    (export_path / "Export.xml").write_text(
+        export_xml.replace(
+            "</HealthData>",
+            NEW_RECORD.replace("2023-01-03 09:00:05", "2023-01-02 10:00:05"),
+        )
+    )
+    wm.reload_data()
+    wm.reload_data()
+
+    reader = WatchReader(data_path=export_path, cache_path=cache_path)
+    heart_rate = reader.record("HKQuantityTypeIdentifierHeartRate")
+    assert heart_rate["value"].tolist() == [62, 71, 80]
+
+
+def test_reload_data_removes_deleted_workouts(export_path, tmp_path):
+    cache_path = tmp_path / "cache"
+    wm = WatchManager(data_path=export_path, cache_path=cache_path)
+    wm.reload_data()
+    assert len(os.listdir(cache_path / "routes")) == 1
+
+    export_xml = (export_path / "Export.xml").read_text()
+    start = export_xml.index(" <Workout ")
+    end = export_xml.index("</Workout>\n") + len("</Workout>\n")
+    (export_path / "Export.xml").write_text(export_xml[:start] + export_xml[end:])
+    wm.reload_data()
+
+    assert wm.load_cache_state().workout_fingerprints == {}
+    for folder in ["routes", "workout_statistics", "workout_metadata_entries"]:
+        assert os.listdir(cache_path / folder) == []
+    for level in (cache_path / "route_pyramid").iterdir():
+        assert os.listdir(level) == []
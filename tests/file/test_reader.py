@@ -0,0 +1,277 @@
+import numpy as np
+import pandas as pd
+import pytest
+from watchml.data import WorkoutRoute
+from watchml.file import CacheFormat
+from watchml.file import ECGCache
+from watchml.file import ECGReader
+from watchml.file import RouteCache
+from watchml.file import WatchManager
+from watchml.file import WatchReader
+from watchml.file.writer import RecordChunkWriter
+
+
+def test_parquet_cache(export_path, tmp_path):
+    cache_path = tmp_path / "cache"
+    WatchManager(
+        data_path=export_path, cache_path=cache_path, cache_format=CacheFormat.PARQUET
+    ).reload_data()
+
+    reader = WatchReader(data_path=export_path, cache_path=cache_path)
+    assert reader.cache_format == CacheFormat.PARQUET
+
+    heart_rate = reader.record("HKQuantityTypeIdentifierHeartRate")
+    assert heart_rate["value"].tolist() == [62.0, 71.0]
+    assert pd.api.types.is_datetime64_any_dtype(heart_rate["startDate"])
+
+    steps = reader.record("HKQuantityTypeIdentifierStepCount", columns=["value"])
+    assert list(steps.columns) == ["value"]
+
+    route = reader.route(reader.routes_meta()["workout_uuid"][0])
+    assert pd.api.types.is_datetime64_any_dtype(route["time"])
+    assert len(reader.workout_events()) == 1
+
+
+@pytest.mark.parametrize("cache_format", [CacheFormat.CSV, CacheFormat.PARQUET])
+def test_query(tmp_path, cache_format):
+    cache_path = tmp_path / "cache"
+    WatchManager(
+        data_path=tmp_path, cache_path=cache_path, cache_format=cache_format
+    ).update_cache_info()
+    days = pd.date_range("2022-12-01", "2023-01-31", freq="D")
+    record_df = pd.DataFrame(
+        {
+            "type": "HKQuantityTypeIdentifierHeartRate",
+            "value": [str(i) for i in range(len(days))],
+            "sourceName": ["Watch", "iPhone"] * (len(days) // 2),
+            "device": ["<<HKDevice>, name:Apple Watch>", None] * (len(days) // 2),
+            "startDate": days.strftime("%Y-%m-%d 12:00:00 +0100"),
+        }
+    )
+    record_df["creationDate"] = record_df["startDate"]
+    # blocks of 10 days, written out of order
+    record_writer = RecordChunkWriter(cache_path, cache_format=cache_format)
+    for i in reversed(range(0, len(record_df), 10)):
+        record_writer.write(record_df.iloc[i : i + 10])
+    record_writer.close()
+
+    reader = WatchReader(data_path=tmp_path, cache_path=cache_path)
+    week = reader.query(
+        "HKQuantityTypeIdentifierHeartRate",
+        start="2022-12-29",
+        end="2023-01-05",
+        columns=["value"],
+    )
+    assert week["value"].tolist() == list(range(28, 35))
+    assert list(week.columns) == ["value"]
+
+    watch = reader.query(
+        "HKQuantityTypeIdentifierHeartRate", start="2023-01-01", devices=["Watch"]
+    )
+    assert (watch["sourceName"] == "Watch").all()
+    assert len(watch) == 15
+    assert reader.query("HKQuantityTypeIdentifierHeartRate", end="2022-01-01").empty
+
+
+@pytest.mark.parametrize("cache_format", [CacheFormat.CSV, CacheFormat.PARQUET])
+def test_query_keeps_categories_across_years(tmp_path, cache_format):
+    cache_path = tmp_path / "cache"
+    WatchManager(
+        data_path=tmp_path, cache_path=cache_path, cache_format=cache_format
+    ).update_cache_info()
+    days = pd.date_range("2022-12-30", "2023-01-02", freq="D")
+    record_df = pd.DataFrame(
+        {
+            "type": "HKQuantityTypeIdentifierHeartRate",
+            "value": "60",
+            "sourceName": ["Watch", "Watch", "iPhone", "iPhone"],
+            "sourceVersion": "9.1",
+            "device": ["<<HKDevice>, name:Apple Watch>", None, None, None],
+            "startDate": days.strftime("%Y-%m-%d 12:00:00 +0000"),
+        }
+    )
+    record_df["creationDate"] = record_df["startDate"]
+    record_writer = RecordChunkWriter(cache_path, cache_format=cache_format)
+    record_writer.write(record_df)
+    record_writer.close()
+
+    reader = WatchReader(data_path=tmp_path, cache_path=cache_path)
+    records = reader.query("HKQuantityTypeIdentifierHeartRate")
+    assert reader.record_years("HKQuantityTypeIdentifierHeartRate") == [2022, 2023]
+    for column in ["type", "sourceName", "sourceVersion", "device"]:
+        assert records[column].dtype == "category"
+    assert records["sourceName"].tolist() == ["Watch", "Watch", "iPhone", "iPhone"]
+
+
+@pytest.mark.parametrize("cache_format", [CacheFormat.CSV, CacheFormat.PARQUET])
+def test_resample(tmp_path, cache_format):
+    cache_path = tmp_path / "cache"
+    WatchManager(
+        data_path=tmp_path, cache_path=cache_path, cache_format=cache_format
+    ).update_cache_info()
+    starts = pd.date_range("2022-12-31 22:00", periods=48, freq="30min")
+    record_df = pd.DataFrame(
+        {
+            "type": "HKQuantityTypeIdentifierStepCount",
+            "value": "60",
+            "sourceName": "Watch",
+            "startDate": starts.strftime("%Y-%m-%d %H:%M:%S +0000"),
+            # every record spans 45 minutes
+            "endDate": (starts + pd.Timedelta("45min")).strftime(
+                "%Y-%m-%d %H:%M:%S +0000"
+            ),
+        }
+    )
+    record_df["creationDate"] = record_df["startDate"]
+    record_writer = RecordChunkWriter(cache_path, cache_format=cache_format)
+    for i in range(0, len(record_df), 8):
+        record_writer.write(record_df.iloc[i : i + 8])
+    record_writer.close()
+    reader = WatchReader(data_path=tmp_path, cache_path=cache_path)
+
+    chunks = list(
+        reader.iter_query(
+            "HKQuantityTypeIdentifierStepCount", columns=["value"], chunk_rows=16
+        )
+    )
+    # the first write spans new year, its 2023 block has 4 rows
+    assert [len(chunk) for chunk in chunks] == [4, 20, 16, 8]
+
+    hourly = reader.resample(
+        "HKQuantityTypeIdentifierStepCount", "1h", chunk_rows=16, start="2023-01-01"
+    )
+    assert hourly.index[0] == pd.Timestamp("2023-01-01", tz="UTC")
+    assert hourly["sum"].sum() == pytest.approx(44 * 60)
+    # a third of the record at 00:30, the record at 01:00 and two thirds of the
+    # record at 01:30
+    assert hourly["sum"].iloc[1] == pytest.approx(20 + 60 + 40)
+    assert hourly["count"].iloc[1] == 3
+    assert hourly["mean"].iloc[1] == 60
+
+    daily = reader.resample(
+        "HKQuantityTypeIdentifierStepCount", "1D", statistics=["sum"]
+    )
+    # the record at 23:30 ends at 00:15 and adds a third of its steps to new year
+    assert daily["sum"].tolist() == pytest.approx([4 * 60 - 20, 44 * 60 + 20])
+
+
+ECG_CSV = """Name,Marc Julian Schwarz
+Date of Birth,01.01.2000
+Recorded Date,2023-01-02 12:00:00 +0100
+Classification,Sinus Rhythm
+Symptoms,
+Software Version,1.90
+Device,"Watch6,1"
+Sample Rate,512 hertz
+,
+Lead,Lead I
+Unit,µV
+,
+{samples}
+"""
+
+
+@pytest.mark.parametrize(
+    "samples, sample_rate",
+    [("-12.5\n0\n3.25", "512 hertz"), ('"-12,5"\n"0"\n"3,25"', "256 hertz")],
+)
+def test_read_ecg(samples, sample_rate):
+    ecg = ECG_CSV.format(samples=samples).replace("512 hertz", sample_rate)
+    values, meta_data = ECGReader.read_ecg(ecg)
+    assert values.dtype == np.float32
+    assert values.tolist() == [-12.5, 0.0, 3.25]
+    assert meta_data["Sample Rate"] == sample_rate
+    assert meta_data["Device"] == "Watch6,1"
+    assert meta_data["Unit"] == "µV"
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_read_ecgs_from_dir(tmp_path, workers):
+    for i in range(3):
+        path = tmp_path / f"ecg_2023-01-0{i + 1}.csv"
+        path.write_text(ECG_CSV.format(samples=f"{i}\n{i + 1}"), encoding="utf-8")
+    (tmp_path / "notes.txt").write_text("not an ecg")
+
+    ecgs = ECGReader.read_ecgs_from_dir(tmp_path, workers=workers)
+    assert [ecg.date for ecg in ecgs] == ["2023-01-01", "2023-01-02", "2023-01-03"]
+    assert ecgs[2].values.tolist() == [2.0, 3.0]
+    assert ecgs[0].to_json()["values"] == [0.0, 1.0]
+
+
+def test_ecg_cache(export_path, tmp_path):
+    ecg_path = export_path / "electrocardiograms"
+    ecg_path.mkdir()
+    for i, samples in enumerate(["1\n2\n3", "-4,5\n6"]):
+        path = ecg_path / f"ecg_2023-01-0{i + 1}.csv"
+        path.write_text(ECG_CSV.format(samples=samples), encoding="utf-8")
+
+    cache_path = tmp_path / "cache"
+    WatchManager(data_path=export_path, cache_path=cache_path).reload_data()
+    assert (cache_path / "ecgs" / "values.npy").exists()
+
+    # the ECGs are read from the cache, not from the csv files
+    for file in ecg_path.iterdir():
+        file.unlink()
+    ecgs = WatchReader(data_path=export_path, cache_path=cache_path).ecgs()
+    assert [ecg.name for ecg in ecgs] == ["ecg_2023-01-01", "ecg_2023-01-02"]
+    assert ecgs[1].values.tolist() == [-4.5, 6.0]
+    assert ecgs[1]["Sample Rate"] == "512 hertz"
+
+    cache = ECGCache(cache_path / "ecgs")
+    assert cache[-1].values.tolist() == [-4.5, 6.0]
+    with pytest.raises(IndexError):
+        cache[2]
+
+
+def test_lazy_routes(export_path, tmp_path):
+    cache_path = tmp_path / "cache"
+    WatchManager(data_path=export_path, cache_path=cache_path).reload_data()
+    reader = WatchReader(data_path=export_path, cache_path=cache_path)
+
+    (route,) = reader.routes()
+    assert route.start_time == pd.Timestamp("2023-01-02 11:00:00", tz="UTC")
+    assert route.end_time == pd.Timestamp("2023-01-02 11:00:04", tz="UTC")
+    assert route.bounds == pytest.approx((8.0, 49.0, 8.0004, 49.0004))
+    assert route.n_points == 5
+    assert route.distance == pytest.approx(53.26, abs=0.01)
+    assert not route.is_loaded
+
+    assert route.lon.tolist() == pytest.approx([8.0, 8.0001, 8.0002, 8.0003, 8.0004])
+    assert route.is_loaded
+    assert route.distance == pytest.approx(WorkoutRoute.distance.fget(route))
+
+
+def test_lazy_routes_skip_failed_routes(export_path, tmp_path):
+    cache_path = tmp_path / "cache"
+    (export_path / "workout-routes" / "route_2023-01-02_12.10pm.gpx").write_text("")
+    WatchManager(data_path=export_path, cache_path=cache_path).reload_data()
+    reader = WatchReader(data_path=export_path, cache_path=cache_path)
+
+    assert len(reader.routes_meta()) == 1
+    assert reader.routes_meta(written=True).empty
+    assert reader.routes() == []
+    with pytest.raises(ValueError):
+        reader.route_heatmap()
+
+
+def test_route_cache():
+    loads = []
+    cache = RouteCache(lambda uuid: loads.append(uuid) or uuid, max_routes=2)
+    for uuid in ["a", "b", "a", "c", "a", "b"]:
+        assert cache.get(uuid) == uuid
+    assert loads == ["a", "b", "c", "b"]
+    assert len(cache) == 2 and "a" in cache and "c" not in cache
+
+
+def test_cache_info_is_read_once(tmp_path):
+    cache_path = tmp_path / "cache"
+    WatchManager(data_path=tmp_path, cache_path=cache_path).update_cache_info()
+    reader = WatchReader(data_path=tmp_path, cache_path=cache_path)
+    assert reader.cache_format == CacheFormat.CSV
+
+    WatchManager(
+        data_path=tmp_path, cache_path=cache_path, cache_format=CacheFormat.PARQUET
+    ).update_cache_info()
+    assert reader.cache_format == CacheFormat.CSV
+    reader.refresh()
+    assert reader.cache_format == CacheFormat.PARQUET
@@ -0,0 +1,95 @@
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import gpx_for
+from watchml.file import WatchManager
+from watchml.file import WatchReader
+from watchml.file.routes import parse_route
+from watchml.file.routes import route_pyramid_path
+from watchml.file.routes import ROUTE_PYRAMID_TOLERANCES
+from watchml.file.routes import write_route_files
+
+
+def test_write_route_files(tmp_path):
+    routes_path = tmp_path / "routes"
+    routes_path.mkdir()
+    jobs = []
+    for i in range(4):
+        gpx_path = tmp_path / f"route_{i}.gpx"
+        gpx_path.write_text(gpx_for(3 + i) if i != 2 else "<gpx><trk>")
+        jobs.append((gpx_path, f"workout-{i}"))
+
+    results = write_route_files(jobs, routes_path=routes_path, workers=2)
+
+    assert [result.workout_uuid for result in results] == [
+        f"workout-{i}" for i in range(4)
+    ]
+    assert [result.points for result in results] == [3, 4, 0, 6]
+    assert not results[2].ok
+    assert "ParseError" in results[2].error
+    assert sorted(p.name for p in routes_path.iterdir()) == [
+        "workout-0.csv",
+        "workout-1.csv",
+        "workout-3.csv",
+    ]
+
+
+def test_write_route_files_reports_summary_errors(tmp_path, monkeypatch):
+    def failing_summary(route_df):
+        raise ValueError("no summary")
+
+    monkeypatch.setattr("watchml.file.routes.route_summary", failing_summary)
+    gpx_path = tmp_path / "route.gpx"
+    gpx_path.write_text(gpx_for(3))
+    (result,) = write_route_files(
+        [(gpx_path, "workout")], routes_path=tmp_path, workers=1
+    )
+    assert result.error == "ValueError: no summary"
+    assert not (tmp_path / "workout.csv").exists()
+
+
+def test_parse_route_without_extensions():
+    route_root = ET.fromstring(
+        """<gpx xmlns="http://www.topografix.com/GPX/1/1"><trk><trkseg>
+        <trkpt lon="8.5" lat="49.1"><ele>100.5</ele><time>2023-01-02T11:00:00Z</time></trkpt>
+        <trkpt lon="8.6" lat="49.2"><ele>101</ele><time>2023-01-02T11:00:01Z</time>
+        <extensions><speed>3.5</speed><course>90</course><hAcc>1</hAcc><vAcc>2</vAcc></extensions></trkpt>
+        </trkseg></trk></gpx>"""
+    )
+    route_df = parse_route(route_root)
+
+    assert list(route_df.columns) == [
+        "lon",
+        "lat",
+        "time",
+        "elevation",
+        "speed",
+        "course",
+        "hAcc",
+        "vAcc",
+    ]
+    assert route_df["lon"].tolist() == [8.5, 8.6]
+    assert np.isnan(route_df["speed"][0])
+    assert route_df["speed"][1] == 3.5
+    assert route_df["time"][1] == pd.Timestamp("2023-01-02 11:00:01", tz="UTC")
+
+
+def test_route_pyramid(export_path, tmp_path):
+    cache_path = tmp_path / "cache"
+    WatchManager(data_path=export_path, cache_path=cache_path).reload_data()
+    reader = WatchReader(data_path=export_path, cache_path=cache_path)
+    uuid = reader.routes_meta()["workout_uuid"][0]
+
+    # the fixture route is a straight line, every level keeps only its ends
+    for tolerance in ROUTE_PYRAMID_TOLERANCES:
+        level = reader._read(
+            uuid, path=route_pyramid_path(cache_path / "route_pyramid", tolerance)
+        )
+        assert level["lon"].tolist() == pytest.approx([8.0, 8.0004])
+    route = reader.route(uuid, columns=["time"], tolerance=5)
+    assert list(route.columns) == ["time"]
+    assert len(route) == 2
+    assert len(reader.route(uuid, tolerance=0.01)) == 2
+    assert len(reader.route(uuid)) == 5
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from watchml.file import CacheFormat
+from watchml.file import route_cells
+from watchml.file import WatchManager
+from watchml.file import WatchReader
+
+
+def test_route_cells():
+    lon = np.array([0.005, 0.006, 0.015, np.nan, 0.016, 0.004])
+    cells = route_cells(lon, np.full(6, 0.001), cell_size=0.01)
+    assert cells.to_numpy().tolist() == [
+        [0, 0, 0, 2],
+        [1, 0, 2, 3],
+        [1, 0, 4, 5],
+        [0, 0, 5, 6],
+    ]
+    assert len(route_cells(np.array([]), np.array([]))) == 0
+
+
+@pytest.mark.parametrize("cache_format", [CacheFormat.CSV, CacheFormat.PARQUET])
+def test_route_queries(export_path, tmp_path, cache_format):
+    cache_path = tmp_path / "cache"
+    wm = WatchManager(
+        data_path=export_path, cache_path=cache_path, cache_format=cache_format
+    )
+    wm.reload_data()
+    reader = WatchReader(data_path=export_path, cache_path=cache_path)
+    uuid = reader.routes_meta()["workout_uuid"][0]
+    assert reader.route_grid().workout_uuids == [uuid]
+
+    routes = reader.routes_in_bbox(8.00005, 49.00005, 8.00025, 49.00025)
+    assert list(routes) == [uuid]
+    assert routes[uuid]["lon"].tolist() == pytest.approx([8.0001, 8.0002])
+    assert reader.routes_in_bbox(9, 50, 9.1, 50.1) == {}
+
+    routes = reader.routes_near(8.0, 49.0, radius=20, columns=["time"])
+    assert list(routes[uuid].columns) == ["lon", "lat", "time"]
+    assert len(routes[uuid]) == 2
+
+    # a full rebuild assigns new uuids, the old ones are dropped from the grid
+    wm.reload_data(incremental=False)
+    assert reader.route_grid().workout_uuids == [
+        reader.routes_meta()["workout_uuid"][0]
+    ]
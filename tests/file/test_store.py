@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+from watchml.file import WatchManager
+from watchml.file import WatchReader
+
+
+def test_record_store(export_path, tmp_path):
+    cache_path = tmp_path / "cache"
+    WatchManager(data_path=export_path, cache_path=cache_path).reload_data(
+        record_store=True
+    )
+    store = WatchReader(data_path=export_path, cache_path=cache_path).record_store()
+
+    assert store.record_types == [
+        "HKQuantityTypeIdentifierHeartRate",
+        "HKQuantityTypeIdentifierStepCount",
+    ]
+    heart_rate = store["HKQuantityTypeIdentifierHeartRate"]
+    assert len(heart_rate) == 2
+    assert isinstance(heart_rate.array("value"), np.memmap)
+
+    first = heart_rate[:1]
+    assert first["value"].tolist() == [62.0]
+    assert first["sourceName"].dtype == "category"
+    assert first["startDate"][0] == pd.Timestamp("2023-01-01 09:00", tz="UTC")
+
+    second_day = heart_rate.between(start="2023-01-02", columns=["value"])
+    assert second_day["value"].tolist() == [71.0]
+    assert store["HKQuantityTypeIdentifierStepCount"].to_pandas()["device"].isna().all()
@@ -1,6 +1,12 @@
 from pathlib import Path
 
+import pandas as pd
+from watchml.file import CacheFormat
+from watchml.file import WatchLoader
+from watchml.file import WatchManager
+from watchml.file import WatchReader
 from watchml.file import WatchWriter
+from watchml.file.writer import RecordChunkWriter
 
 ww = WatchWriter(
     data_path=Path("tests") / "sample_data",
@@ -19,3 +25,98 @@ def test_scaffold_folder_structure():
 # def test_write_record_files():
 #     ww.scaffold_folder_structure()
 #     ww.write_record_files(record_df=None)
+
+
+def test_write_all_streaming(export_path, tmp_path):
+    cache_path = tmp_path / "cache"
+    writer = WatchWriter(data_path=export_path, cache_path=cache_path)
+    writer.scaffold_folder_structure()
+    writer.write_all_streaming(
+        WatchLoader(data_path=export_path).iter_export_elements(), chunk_size=1
+    )
+
+    heart_rate = pd.read_csv(
+        cache_path
+        / "records"
+        / "type=HKQuantityTypeIdentifierHeartRate"
+        / "year=2023"
+        / "part-00000.csv"
+    )
+    assert heart_rate["value"].tolist() == [62, 71]
+    assert len(pd.read_csv(cache_path / "activity_summary.csv")) == 2
+    assert pd.read_csv(cache_path / "metadata.csv")["locale"][0] == "de_DE"
+
+    routes_meta = pd.read_csv(cache_path / "routes_meta.csv")
+    route = pd.read_csv(cache_path / "routes" / f"{routes_meta['workout_uuid'][0]}.csv")
+    assert len(route) == 5
+
+
+def test_write_record_files(tmp_path):
+    cache_path = tmp_path / "cache"
+    writer = WatchWriter(data_path=tmp_path, cache_path=cache_path)
+    writer.scaffold_folder_structure()
+    record_df = pd.DataFrame(
+        {
+            "type": ["A", "B", "A", "A"],
+            "value": ["1", "2", "3", "4"],
+            "creationDate": [
+                "2021-12-31 23:00:00 +0100",
+                "2022-01-01 10:00:00 +0100",
+                "2022-01-01 10:00:00 +0100",
+                "2022-06-01 10:00:00 +0200",
+            ],
+        }
+    )
+    record_df["startDate"] = record_df["creationDate"]
+    writer.write_record_files(record_df)
+
+    reader = WatchReader(data_path=tmp_path, cache_path=cache_path)
+    assert reader.record_types == ["A", "B"]
+    assert reader.record_years("A") == [2021, 2022]
+    assert reader.record("A")["value"].tolist() == [1, 3, 4]
+    assert reader.record("A", years=[2022])["value"].tolist() == [3, 4]
+    assert reader.record("B", years=[2021]).empty
+
+
+def test_record_chunk_writer_limits_open_files(tmp_path):
+    cache_path = tmp_path / "cache"
+    WatchManager(
+        data_path=tmp_path, cache_path=cache_path, cache_format=CacheFormat.PARQUET
+    ).update_cache_info()
+    record_writer = RecordChunkWriter(
+        cache_path, cache_format=CacheFormat.PARQUET, max_open_files=2
+    )
+    for day in range(1, 4):
+        for record_type in ["A", "B", "C"]:
+            record_writer.write(
+                pd.DataFrame(
+                    {
+                        "type": [record_type],
+                        "value": [str(day)],
+                        "startDate": [f"2022-01-0{day} 10:00:00 +0000"],
+                    }
+                )
+            )
+            assert len(record_writer.parquet_writers) <= 2
+    record_writer.close()
+    assert record_writer.parquet_writers == {}
+
+    reader = WatchReader(data_path=tmp_path, cache_path=cache_path)
+    assert reader.record("A")["value"].tolist() == [1, 2, 3]
+    assert reader.query("B", start="2022-01-02")["value"].tolist() == [2, 3]
+
+
+def test_write_all_matches_streaming(export_path, tmp_path):
+    def record_files(cache_path):
+        return {
+            path.relative_to(cache_path): path.read_text()
+            for path in sorted((cache_path / "records").rglob("*.csv"))
+        }
+
+    WatchManager(data_path=export_path, cache_path=tmp_path / "streaming").reload_data()
+    WatchManager(data_path=export_path, cache_path=tmp_path / "tree").reload_data(
+        streaming=False
+    )
+    streaming = record_files(tmp_path / "streaming")
+    assert streaming and streaming == record_files(tmp_path / "tree")
+    assert "2023-01-01 10:00:00 +0100" in "".join(streaming.values())
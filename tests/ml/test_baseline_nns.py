@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from conftest import make_track
+from watchml.ml import AnnoyNN
+from watchml.ml import AnnoyNNIndex
+from watchml.ml import BaselineNN
+from watchml.ml import Distances
+from watchml.ml import resample_polyline
+from watchml.ml import RouteEmbedding
+
+
+def test_resample_polyline():
+    points = resample_polyline(
+        np.array([0.0, 0.0, np.nan, 0.0]), np.array([0.0, 1.0, 5.0, 3.0]), 4
+    )
+    np.testing.assert_allclose(points, [[0, 0], [0, 1], [0, 2], [0, 3]])
+    assert np.isnan(resample_polyline(np.array([]), np.array([]), 3)).all()
+    np.testing.assert_allclose(resample_polyline([1.0], [2.0], 2), [[1, 2], [1, 2]])
+
+
+@pytest.mark.parametrize(
+    "dist", [Distances.euclidean_series, Distances.manhatten_series]
+)
+def test_build_index_matches_pairwise_loop(dist):
+    rng = np.random.default_rng(0)
+    tracks = [
+        make_track(
+            8 + rng.normal(0, 1e-3, n).cumsum(), 49 + rng.normal(0, 1e-3, n).cumsum()
+        )
+        for n in rng.integers(5, 50, 9)
+    ]
+    nn = BaselineNN(tracks, n_points=16)
+
+    index = nn.build_index(dist, block_size=4)
+    expected = [
+        [nn.track_dist(track1, track2, dist) for track2 in tracks] for track1 in tracks
+    ]
+    np.testing.assert_allclose(index.dists, expected, atol=1e-12)
+    assert index.nns(3, n=1) == [3]
+
+
+@pytest.mark.parametrize("condensed", [False, True])
+def test_nns(condensed):
+    tracks = [make_track([8.0, 8.0 + x], [49.0, 49.0]) for x in [0, 5, 1, 4, 2.2]]
+    nn = BaselineNN(tracks, n_points=8)
+    index = nn.build_index(condensed=condensed, block_size=2)
+    assert index.condensed == condensed
+    assert index.n_tracks == 5
+
+    assert index.nns(0, n=3) == [0, 2, 4]
+    assert index.nns(1, n=10) == [1, 3, 4, 2, 0]
+    np.testing.assert_array_equal(
+        index.nns_many(n=2, batch_size=2), [[0, 2], [1, 3], [2, 0], [3, 1], [4, 2]]
+    )
+    np.testing.assert_allclose(
+        index.rows(np.arange(5)), nn.build_index(block_size=2).dists
+    )
+
+
+def test_route_embedding():
+    track = make_track([8.0, 8.0, 8.0], [49.0, 49.01, 49.02])
+    embedding = RouteEmbedding(n_points=3, n_elevation=2)
+    vector = embedding.embed(track)
+    assert vector.shape == (embedding.dimension,)
+    assert vector[-3] == pytest.approx(2 * 1.1132, rel=1e-3)  # length in km
+    assert (vector[-2:] == 0).all()  # no elevation
+    assert (embedding.embed(make_track([], [])) == 0).all()
+
+
+def test_annoy_nn_save_load(tmp_path):
+    pytest.importorskip("annoy")
+    tracks = [make_track([8.0, 8.0 + x], [49.0, 49.0]) for x in [0, 0.05, 0.01, 0.04]]
+    index = AnnoyNN(tracks, embedding=RouteEmbedding(n_points=4)).build_index()
+    assert index.nns(0, n=2) == [0, 2]
+
+    index.save(tmp_path / "routes.ann")
+    loaded = AnnoyNNIndex.load(tmp_path / "routes.ann")
+    assert loaded.embedding.n_points == 4
+    assert loaded.nns(1, n=2) == [1, 3]
+    assert loaded.nns_by_track(make_track([8.0, 8.011], [49.0, 49.0]), n=1) == [2]
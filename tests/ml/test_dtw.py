@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from conftest import make_track
+from watchml.ml import BaselineNN
+from watchml.ml import Distances
+from watchml.ml import DTWDistance
+
+
+def dtw_reference(x, y, band):
+    n = len(x)
+    dists = np.full((n + 1, n + 1), np.inf)
+    dists[0, 0] = 0
+    for i in range(1, n + 1):
+        for j in range(1, n + 1):
+            if abs(i - j) <= band:
+                cost = ((x[i - 1] - y[j - 1]) ** 2).sum()
+                dists[i, j] = cost + min(
+                    dists[i - 1, j - 1], dists[i - 1, j], dists[i, j - 1]
+                )
+    return dists[n, n]
+
+
+@pytest.fixture
+def tracks():
+    return np.random.default_rng(0).normal(size=(20, 12, 2)).cumsum(axis=1)
+
+
+@pytest.mark.parametrize("window", [0, 0.2, 1])
+def test_dtw(tracks, window):
+    dtw = DTWDistance(window=window)
+    dists = dtw.batch(tracks[0], tracks)
+    expected = [dtw_reference(tracks[0], y, dtw.band(12)) for y in tracks]
+    np.testing.assert_allclose(dists, expected)
+    assert (dtw.lb_keogh(tracks[0], tracks) <= dists + 1e-9).all()
+    if window == 0:
+        flat = tracks.reshape(20, -1)
+        np.testing.assert_allclose(
+            dists, Distances.euclidean_matrix(flat[:1], flat)[0], atol=1e-9
+        )
+
+
+def test_knn_prunes_without_changing_neighbours(tracks):
+    dtw = DTWDistance(window=0.2)
+    exact = dtw.batch(tracks[3], tracks)
+    pruned = dtw.knn(tracks[3], tracks, k=3, batch_size=2)
+    assert np.isinf(pruned).any()
+    np.testing.assert_array_equal(np.argsort(pruned)[:3], np.argsort(exact)[:3])
+
+
+def test_baseline_nn_dtw(tracks):
+    tracks = [make_track(8 + t[:, 0] / 1e3, 49 + t[:, 1] / 1e3) for t in tracks]
+    nn = BaselineNN(tracks, n_points=16)
+    dtw = DTWDistance(window=0.2)
+
+    full = nn.build_index(dtw)
+    assert full.dists[0, 2] == pytest.approx(nn.track_dist(tracks[0], tracks[2], dtw))
+    np.testing.assert_array_equal(
+        nn.build_index(dtw, k=4).nns_many(n=4), full.nns_many(n=4)
+    )
+    np.testing.assert_allclose(
+        nn.build_index(dtw, condensed=True).rows(np.arange(20)), full.dists
+    )
+    with pytest.raises(ValueError):
+        nn.build_index(dtw, condensed=True, k=4)
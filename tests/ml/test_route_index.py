@@ -0,0 +1,62 @@
+import pytest
+from conftest import make_track
+from watchml.file import WatchManager
+from watchml.file import WatchReader
+from watchml.ml import RouteEmbedding
+from watchml.ml import RouteSimilarityIndex
+
+pytest.importorskip("annoy")
+
+
+def tracks_at(offsets, prefix="track"):
+    return [
+        make_track([8.0, 8.0 + x], [49.0, 49.0], uuid=f"{prefix}-{x}") for x in offsets
+    ]
+
+
+def test_add_rebuild_and_reload(tmp_path):
+    index = RouteSimilarityIndex(tmp_path, staleness=0.5)
+    assert index.add(tracks_at([0, 0.05, 0.01, 0.04])) == 4
+    assert index.is_stale
+    index.rebuild()
+    index.save()
+    assert index.n_pending == 0
+
+    # a new route is searched exactly without rebuilding the annoy index
+    index = RouteSimilarityIndex(tmp_path, staleness=0.5)
+    assert index.add(tracks_at([0.011, 0.01])) == 1
+    assert not index.is_stale
+    assert index.n_pending == 1
+    assert index.nns("track-0.01", n=3) == ["track-0.01", "track-0.011", "track-0"]
+    index.save()
+
+    index = RouteSimilarityIndex(tmp_path)
+    assert len(index) == 5
+    assert index.n_pending == 1
+    assert index.nns_by_track(make_track([8.0, 8.045], [49.0, 49.0]), n=2) == [
+        "track-0.04",
+        "track-0.05",
+    ]
+
+    index.remove(["track-0.05"])
+    assert len(index) == 4
+    assert index.index is None and index.is_stale
+    assert index.nns("track-0.04", n=2) == ["track-0.04", "track-0.011"]
+
+    # a different embedding discards the stored index
+    assert len(RouteSimilarityIndex(tmp_path, embedding=RouteEmbedding(8))) == 0
+
+
+def test_update_from_cache(export_path, tmp_path):
+    cache_path = tmp_path / "cache"
+    WatchManager(data_path=export_path, cache_path=cache_path).reload_data(
+        route_index=True
+    )
+
+    reader = WatchReader(data_path=export_path, cache_path=cache_path)
+    index = reader.route_index()
+    uuid = reader.routes_meta()["workout_uuid"][0]
+    assert index.uuids == [uuid]
+    assert index.n_pending == 0
+    assert index.nns(uuid, n=1) == [uuid]
+    assert index.update(reader) == 0
@@ -0,0 +1,67 @@
+import json
+import subprocess
+import sys
+
+IMPORT_TIME_BUDGET = 0.25
+
+
+def _import_in_subprocess(module: str, statement: str = "") -> dict:
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        f"{statement}\n"
+        "seconds = time.perf_counter() - start\n"
+        "print(json.dumps({'seconds': seconds, 'modules': list(sys.modules)}))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def test_import_watchml_is_lazy():
+    result = _import_in_subprocess("watchml")
+    for heavy in ["pandas", "matplotlib", "annoy", "mpl_toolkits"]:
+        assert heavy not in result["modules"]
+    assert result["seconds"] < IMPORT_TIME_BUDGET
+
+
+def test_import_file_without_plotting():
+    result = _import_in_subprocess("watchml.file")
+    for heavy in ["matplotlib", "annoy"]:
+        assert heavy not in result["modules"]
+
+
+def test_unknown_attribute_is_lazy():
+    result = _import_in_subprocess("watchml", "assert not hasattr(watchml, 'nope')")
+    for heavy in ["pandas", "matplotlib", "annoy"]:
+        assert heavy not in result["modules"]
+
+
+def test_star_import_exports_subpackages():
+    namespace = {}
+    exec("from watchml import *", namespace)
+    for name in ["WatchManager", "WatchReader", "ECG", "RouteHeatmap", "file"]:
+        assert name in namespace
+
+
+def test_exports_resolve():
+    import importlib
+    import types
+
+    import watchml
+
+    for subpackage, names in watchml._EXPORTS.items():
+        module = importlib.import_module(f"watchml.{subpackage}")
+        for name in names:
+            assert hasattr(module, name), f"{name} is not in watchml.{subpackage}"
+        # every class and function of the subpackage is exported
+        for name, value in vars(module).items():
+            if (
+                not name.startswith("_")
+                and isinstance(value, (type, types.FunctionType))
+                and value.__module__.startswith("watchml.")
+            ):
+                assert name in watchml.__all__, f"watchml.{subpackage}.{name}"
+    assert watchml.WatchReader is importlib.import_module("watchml.file").WatchReader
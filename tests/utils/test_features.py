@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+from watchml.utils import add_date_components_to
+from watchml.utils import add_date_features
+from watchml.utils import date_features
+from watchml.utils import parse_local_dates
+
+
+def test_parse_local_dates_keeps_local_time():
+    dates = pd.Series(["2023-01-01 23:30:00 +0100", "2023-07-01 00:15:00 -0700", None])
+    np.testing.assert_array_equal(
+        parse_local_dates(dates),
+        np.array(["2023-01-01T23:30:00", "2023-07-01T00:15:00", "NaT"], "M8[s]"),
+    )
+    np.testing.assert_array_equal(
+        parse_local_dates(pd.Series(["2023-01-01", "2023-01-02 10:00:00 +0100"])),
+        np.array(["2023-01-01T00:00:00", "2023-01-02T10:00:00"], "M8[s]"),
+    )
+    parsed = pd.Series(pd.to_datetime(["2023-01-01 23:30:00+01:00"]))
+    assert parse_local_dates(parsed)[0] == np.datetime64("2023-01-01T23:30:00")
+
+
+def test_date_features_match_pandas():
+    dates = pd.Series(pd.date_range("1969-12-25", "2024-03-01", freq="37h"))
+    strings = dates.dt.strftime("%Y-%m-%d %H:%M:%S +0200")
+    features = date_features(strings)
+
+    np.testing.assert_array_equal(features["year"], dates.dt.year)
+    np.testing.assert_array_equal(features["month"], dates.dt.month)
+    np.testing.assert_array_equal(features["weekday"], dates.dt.day_of_week)
+    np.testing.assert_array_equal(features["weekend"], dates.dt.day_of_week >= 5)
+    np.testing.assert_array_equal(features["hour"], dates.dt.hour)
+    np.testing.assert_array_equal(
+        features["timeOfYear"], dates.dt.month.isin([11, 12, 1, 2])
+    )
+    np.testing.assert_array_equal(
+        features["localDate"], dates.dt.normalize().to_numpy("M8[D]")
+    )
+
+
+def test_missing_dates():
+    features = date_features(pd.Series(["2023-01-07", None]), ["weekend", "month"])
+    assert features["weekend"][0] == 1 and np.isnan(features["weekend"][1])
+    assert features["month"][0] == 1
+
+    with pytest.raises(ValueError):
+        date_features(pd.Series(["2023-01-07"]), ["season"])
+
+
+def test_add_date_features_inplace():
+    df = pd.DataFrame({"startDate": ["2023-01-07 10:00:00 +0100"], "value": [1.0]})
+    copy = add_date_features(df, features=["hour"])
+    assert "hour" in copy and "hour" not in df
+
+    assert add_date_features(df, features=["hour"], inplace=True) is df
+    assert df["hour"].tolist() == [10]
+
+
+def test_add_date_components_to():
+    from watchml.utils.utils import MONTH_TIME_OF_YEAR_MAPPING
+
+    assert MONTH_TIME_OF_YEAR_MAPPING[12] == 1
+    df = pd.DataFrame({"dateComponents": ["2023-01-07", "2023-06-05"]})
+    assert add_date_components_to(df, compact=True)["year"].dtype == np.int16
+    df = add_date_components_to(df)
+    assert (df.dtypes.iloc[1:] == np.int64).all()
+    assert df[
+        ["timeOfYear", "year", "month", "weekday", "weekend"]
+    ].values.tolist() == [
+        [1, 2023, 1, 5, 1],
+        [0, 2023, 6, 0, 0],
+    ]
+
+
+def test_date_features_in_timezone():
+    utc = pd.Series(pd.to_datetime(["2023-01-01 23:30:00", None], utc=True))
+    features = date_features(utc, ["hour", "localDate"], tz="Europe/Berlin")
+    assert features["hour"][0] == 0 and np.isnan(features["hour"][1])
+    assert features["localDate"][0] == np.datetime64("2023-01-02")
+
+    strings = pd.Series(["2023-01-01 23:30:00 +0000", "2023-01-01", None])
+    np.testing.assert_array_equal(
+        parse_local_dates(strings, tz="Europe/Berlin"),
+        np.array(["2023-01-02T00:30:00", "2023-01-01T00:00:00", "NaT"], "M8[s]"),
+    )
+    df = add_date_features(
+        pd.DataFrame({"startDate": utc}), features=["weekday"], tz="Europe/Berlin"
+    )
+    assert df["weekday"][0] == 0
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from watchml.utils.geo import project_to_meters
+from watchml.utils.geo import simplification_tolerances
+from watchml.utils.geo import simplify_polyline
+
+
+def douglas_peucker(x, y, tolerance, first, last):
+    """Recursive reference implementation with segment distances."""
+    if last - first < 2:
+        return [first, last]
+    dx, dy = x[last] - x[first], y[last] - y[first]
+    distances = []
+    for i in range(first + 1, last):
+        t = ((x[i] - x[first]) * dx + (y[i] - y[first]) * dy) / (dx * dx + dy * dy)
+        t = min(max(t, 0), 1)
+        distances.append(np.hypot(x[i] - x[first] - t * dx, y[i] - y[first] - t * dy))
+    split = first + 1 + int(np.argmax(distances))
+    if max(distances) <= tolerance:
+        return [first, last]
+    left = douglas_peucker(x, y, tolerance, first, split)
+    return left[:-1] + douglas_peucker(x, y, tolerance, split, last)
+
+
+@pytest.mark.parametrize("tolerance", [0.5, 3, 20])
+def test_simplify_polyline_matches_douglas_peucker(tolerance):
+    rng = np.random.default_rng(1)
+    lon = 8 + rng.normal(0, 5e-5, 200).cumsum()
+    lat = 49 + rng.normal(0, 5e-5, 200).cumsum()
+    x, y = project_to_meters(lon, lat)
+    expected = douglas_peucker(x, y, tolerance, 0, 199)
+    assert simplify_polyline(lon, lat, tolerance).tolist() == expected
+
+
+def test_simplification_tolerances():
+    lon = np.array([8.0, 8.0001, np.nan, 8.0002, 8.0003])
+    lat = np.array([49.0, 49.0, 49.0, 49.001, 49.0])
+    tolerances = simplification_tolerances(lon, lat)
+    assert np.isinf(tolerances[[0, 4]]).all()
+    assert tolerances[2] == 0
+    # the peak is kept up to its distance of about 111 m from the baseline
+    assert tolerances[3] == pytest.approx(111.3, abs=0.5)
+    assert simplify_polyline(lon, lat, 200).tolist() == [0, 4]
+    assert simplification_tolerances(np.array([]), np.array([])).size == 0
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from watchml.file import WatchManager
+from watchml.file import WatchReader
+from watchml.viz import RouteHeatmap
+
+
+def test_add_bins_points():
+    heatmap = RouteHeatmap((0, 0, 4, 2), width=4, height=2)
+    binned = heatmap.add(
+        lon=[0.5, 0.5, 3.9, 4.0, 5.0, np.nan],
+        lat=[1.5, 1.5, 0.1, 0.0, 1.0, 1.0],
+        weights=[1, 3, 5, 7, 9, 11],
+    )
+    assert binned == 4
+    np.testing.assert_array_equal(heatmap.values(), [[2, 0, 0, 0], [0, 0, 0, 2]])
+    np.testing.assert_array_equal(heatmap.values("sum"), [[4, 0, 0, 0], [0, 0, 0, 12]])
+    assert heatmap.values("mean")[0, 0] == 2
+    assert np.isnan(heatmap.values("mean")[0, 1])
+
+    with pytest.raises(ValueError):
+        heatmap.values("median")
+
+
+def test_square_cells():
+    heatmap = RouteHeatmap((8.0, 49.0, 8.2, 49.1), width=100)
+    assert heatmap.shape == (round(50 / np.cos(np.radians(49.05))), 100)
+    # the longer side gets the width, also for narrow areas
+    heatmap = RouteHeatmap((8.0, 49.0, 8.001, 49.1), width=100)
+    assert heatmap.shape == (100, 1)
+
+
+def test_degenerate_bounds_are_padded():
+    heatmap = RouteHeatmap((8.0, 49.0, 8.0, 49.0), width=10)
+    assert heatmap.add([8.0], [49.0]) == 1
+    assert heatmap.height == 10 and heatmap.width == round(10 * np.cos(np.radians(49)))
+
+    heatmap = RouteHeatmap((8.0, 49.0, 8.0, 49.1), width=10)
+    assert heatmap.add([8.0, 8.0], [49.0, 49.1]) == 2
+    assert heatmap.width < heatmap.height == 10
+
+    with pytest.raises(ValueError):
+        RouteHeatmap((8.1, 49.0, 8.0, 49.1))
+
+
+def test_route_heatmap_from_cache(export_path, tmp_path):
+    cache_path = tmp_path / "cache"
+    WatchManager(data_path=export_path, cache_path=cache_path).reload_data()
+    reader = WatchReader(data_path=export_path, cache_path=cache_path)
+
+    heatmap = reader.route_heatmap(width=4, weight="speed")
+    assert heatmap.bounds == pytest.approx((8.0, 49.0, 8.0004, 49.0004))
+    assert heatmap.values().sum() == 5
+    assert heatmap.values("sum").sum() == pytest.approx(3 + 4 + 5 + 3 + 4)
+
+    array = np.load(heatmap.save(tmp_path / "heatmap.npy"))
+    np.testing.assert_array_equal(array, heatmap.values())
+
+    from PIL import Image
+
+    with Image.open(heatmap.save(tmp_path / "heatmap.png")) as image:
+        assert image.size == (heatmap.width, heatmap.height)
+        alpha = np.asarray(image)[..., 3]
+    np.testing.assert_array_equal(alpha > 0, heatmap.values() > 0)
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+from watchml.data import ECG
+from watchml.data import WorkoutRoute
+from watchml.viz import ThumbnailConfig
+from watchml.viz import ThumbnailRenderer
+
+
+def make_route(uuid, n_points=50):
+    route_df = pd.DataFrame(
+        {
+            "lon": 8 + np.linspace(0, 0.01, n_points),
+            "lat": 49 + np.sin(np.linspace(0, 3, n_points)) / 100,
+            "elevation": 100 + np.arange(n_points, dtype=float),
+            "time": pd.date_range("2023-01-02 11:00", periods=n_points, freq="s"),
+        }
+    )
+    return WorkoutRoute(route_df, uuid=uuid, gpx_path="")
+
+
+@pytest.fixture
+def renderer():
+    return ThumbnailRenderer(ThumbnailConfig(fig_size=(1, 1), dpi=30))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_route_thumbnails(tmp_path, renderer, workers):
+    routes = [make_route(f"route-{i}") for i in range(3)]
+    times = routes[0].route_df["time"].copy()
+
+    paths = renderer.routes(routes, tmp_path, workers=workers)
+    assert [p.name for p in paths] == [f"route-{i}_route.png" for i in range(3)]
+    assert all(p.exists() for p in paths)
+
+    elevation = renderer.routes(routes, tmp_path, kind="elevation", workers=workers)
+    assert all(p.exists() for p in elevation)
+    pd.testing.assert_series_equal(routes[0].route_df["time"], times)
+
+
+def test_up_to_date_thumbnails_are_skipped(tmp_path, renderer, capsys):
+    routes = [make_route("a"), make_route("b")]
+    renderer.routes(routes, tmp_path, workers=1)
+    mtime = (tmp_path / "a_route.png").stat().st_mtime_ns
+
+    routes[1] = make_route("b", n_points=60)
+    renderer.routes(routes, tmp_path, workers=1)
+    assert "Rendered 1 route thumbnails" in capsys.readouterr().out
+    assert (tmp_path / "a_route.png").stat().st_mtime_ns == mtime
+
+    renderer.set_config(ThumbnailConfig(fig_size=(1, 1), dpi=20))
+    renderer.routes(routes, tmp_path, workers=1)
+    assert "Rendered 2 route thumbnails" in capsys.readouterr().out
+
+
+def test_ecg_thumbnails_and_small_multiples(tmp_path, renderer):
+    ecg = ECG(np.sin(np.arange(1024)), {"Sample Rate": "512 hertz"}, "ecg_2023-01-02")
+    assert renderer.ecgs([ecg], tmp_path, workers=1) == [
+        tmp_path / "ecg_2023-01-02_ecg.png"
+    ]
+
+    path = renderer.small_multiples(
+        [make_route(str(i)) for i in range(5)], tmp_path / "routes.png", columns=2
+    )
+    from PIL import Image
+
+    with Image.open(path) as image:
+        assert image.size == (60, 90)
+
+
+def test_thumbnail_labels_are_not_clipped(tmp_path):
+    from PIL import Image
+
+    routes = [make_route("low"), make_route("high")]
+    # the tick labels of the second route are much wider, e.g. "−12000" vs "60"
+    routes[0].route_df["elevation"] = np.linspace(10, 59, 50)
+    routes[1].route_df["elevation"] = np.linspace(-5000, -12000, 50)
+    renderer = ThumbnailRenderer(ThumbnailConfig(dpi=50))
+    for path in renderer.routes(routes, tmp_path, kind="elevation", workers=1):
+        with Image.open(path) as image:
+            pixels = np.asarray(image.convert("L"))
+        # nothing is drawn on the borders of the image
+        for border in [pixels[0], pixels[-1], pixels[:, 0], pixels[:, -1]]:
+            assert (border == 255).all()
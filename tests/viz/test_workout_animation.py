@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+from watchml.viz import frame_schedule
+from watchml.viz import WorkoutAnimation
+from watchml.viz import WorkoutAnimationConfig
+
+
+def route_df(n_points):
+    return pd.DataFrame(
+        {
+            "lon": 8 + np.linspace(0, 0.01, n_points),
+            "lat": 49 + np.sin(np.linspace(0, 3, n_points)) / 100,
+            "elevation": 100 + np.arange(n_points, dtype=float),
+            "speed": np.arange(n_points) % 5,
+            "time": pd.date_range("2023-01-02 11:00", periods=n_points, freq="s"),
+        }
+    )
+
+
+def test_frame_schedule():
+    assert frame_schedule(4, fps=10) == [1, 2, 3, 4]
+    assert frame_schedule(100, fps=2, duration=2) == [25, 50, 75, 100]
+    assert frame_schedule(3, fps=30, duration=10) == [1, 2, 3]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_render(tmp_path, workers):
+    from PIL import Image
+
+    config = WorkoutAnimationConfig(fig_size=(3, 3), resolution=1, color_on="speed")
+    animation = WorkoutAnimation(route_df(40), config)
+    stats = animation.render(
+        tmp_path / "route.gif", fps=5, duration=1, workers=workers, dpi=30
+    )
+    assert stats.frames == 5
+    assert stats.frames_per_second > 0
+    with Image.open(tmp_path / "route.gif") as gif:
+        assert gif.n_frames == 5
+
+    animation.render(tmp_path / "frames", fps=2, duration=1, workers=workers, dpi=30)
+    assert sorted(p.name for p in (tmp_path / "frames").iterdir()) == [
+        "frame_000000.png",
+        "frame_000001.png",
+    ]